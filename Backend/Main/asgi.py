@@ -14,9 +14,12 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Main.settings')
 django_asgi_app = get_asgi_application()
 
 # Import channels components after Django is initialized
-from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-from api.routing import websocket_urlpatterns
+from channels.routing import ProtocolTypeRouter
+from api.eta import eta_engine
+from api.routing import websocket_application
+
+# Keep this server process's ETA model in step with other processes
+eta_engine.start()
 
 # ASGI application that routes by protocol type
 # - 'http': Standard HTTP requests go to Django
@@ -25,9 +28,6 @@ application = ProtocolTypeRouter({
     # Handle HTTP requests with Django
     'http': django_asgi_app,
     
-    # Handle WebSocket connections
-    # AuthMiddlewareStack adds user authentication to WebSocket connections
-    'websocket': AuthMiddlewareStack(
-        URLRouter(websocket_urlpatterns)
-    ),
+    # Handle WebSocket connections (session or ?token= auth, see api.routing)
+    'websocket': websocket_application,
 })
\ No newline at end of file
@@ -121,6 +121,12 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Resized menu photo widths in pixels (generate_menu_images builds each one
+# in the original format and as WebP)
+MENU_IMAGE_VARIANTS = {'thumb': 160, 'card': 480, 'full': 1200}
+# Attempts before a menu photo that keeps hitting storage errors is left without variants
+MENU_IMAGE_MAX_ATTEMPTS = 5
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -158,4 +164,70 @@ CHANNEL_LAYERS = {
         # For production, use Redis: 'channels_redis.core.RedisChannelLayer'
         'BACKEND': 'channels.layers.InMemoryChannelLayer'
     }
-}
\ No newline at end of file
+}
+
+# ETA engine settings (predicted ready times for orders)
+# Number of baristas/stations preparing orders in parallel
+ETA_BARISTA_STATIONS = int(os.environ.get('ETA_BARISTA_STATIONS', 2))
+# How often each process rebuilds its in-memory queue model from the database
+# (in a background thread - requests only read the model)
+ETA_RESYNC_SECONDS = 60
+
+# How long each process may serve menu prices from its in-memory index
+# (saving a MenuItem clears the index immediately in the same process)
+PRICE_INDEX_TTL_SECONDS = 30
+
+# How long each process may serve the loyalty offer list from memory
+# (the list is also rebuilt at each offer's valid_from / valid_until, and
+# saving a LoyaltyOffer clears it immediately in the same process)
+OFFER_CACHE_TTL_SECONDS = 60
+
+# How long each process may serve rendered menu lists from memory
+# (saving or deleting a MenuItem drops them immediately in the same process)
+MENU_CACHE_TTL_SECONDS = 30
+# Rendered menu lists kept per process (least recently used are evicted)
+MENU_CACHE_MAX_ENTRIES = 256
+# Public base URL of the API (e.g. https://api.coffeehop.example). Menu lists
+# contain absolute links, so only requests for this base are served from the
+# snapshot cache. Unset: every host gets its own snapshots.
+MENU_BASE_URL = os.environ.get('MENU_BASE_URL')
+
+# Idempotency-Key support for order placement and reorder
+# How long stored responses are kept for replay (purge_idempotency_keys removes them)
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+# Lease of the request working on a key - a retry after this takes it over
+IDEMPOTENCY_LEASE_SECONDS = 30
+# How long a duplicate waits for the first request's response before
+# giving up with 409 (the client then retries with the same key)
+IDEMPOTENCY_WAIT_SECONDS = 2
+
+# Order archival (see api.archive and the archive_orders command)
+# Finished orders older than this many days move to the archive tables
+ORDER_ARCHIVE_AFTER_DAYS = 7
+
+# Notification outbox (see api.outbox and the dispatch_outbox command)
+# Failed deliveries are retried with exponential backoff up to this many times
+OUTBOX_MAX_ATTEMPTS = 10
+
+# Device push delivery (see api.push and the send_push_notifications command)
+# Provider class - replace the stub with a real provider in production
+PUSH_PROVIDER = os.environ.get('PUSH_PROVIDER', 'api.push.StubPushProvider')
+# Parallel provider calls per worker
+PUSH_WORKERS = 4
+# Attempts before a push is given up on
+PUSH_MAX_ATTEMPTS = 5
+# Seconds a worker holds claimed pushes while sending - after this another worker may take them
+PUSH_LEASE_SECONDS = 60
+
+# Notification retention (see api.retention and the prune_notifications command)
+# Days to keep each notification type; types not listed use 'default'
+NOTIFICATION_RETENTION_DAYS = {
+    'PROMOTION': 30,
+    'default': 90,
+}
+
+# Redemption codes (see api.codes)
+# Secret for the code permutation - defaults to one derived from SECRET_KEY.
+# Changing it after codes were issued can re-issue an existing code
+# (the unique index then makes the allocator skip it).
+REDEMPTION_CODE_KEY = os.environ.get('REDEMPTION_CODE_KEY')
@@ -15,18 +15,41 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
 ]
 
+
+def serve_immutable(request, path, document_root=None):
+    """
+    Serve a content-hashed file (menu image variants) with a far-future
+    immutable Cache-Control - its URL changes whenever its bytes do.
+    """
+    response = serve(request, path, document_root=document_root)
+    patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    return response
+
+
 # In development mode, serve media files (uploaded images)
 # In production, use a web server like Nginx to serve media files
+# (give /media/menu_items/variants/ the same immutable Cache-Control there)
 if settings.DEBUG:
+    # Menu image variants are content-hashed - cacheable forever
+    urlpatterns += [
+        re_path(
+            r'^%smenu_items/variants/(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'),
+            serve_immutable,
+            {'document_root': settings.MEDIA_ROOT / 'menu_items' / 'variants'}
+        ),
+    ]
+    
     # Serve media files at /media/ URL
     urlpatterns += static(
         settings.MEDIA_URL,
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Main.settings')
 
 application = get_wsgi_application()
+
+# Keep this server process's ETA model in step with other processes
+from api.eta import eta_engine  # noqa: E402
+
+eta_engine.start()
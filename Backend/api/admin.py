@@ -3,21 +3,38 @@ Django admin configuration.
 Registers models with the admin interface for easy management.
 """
 
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
 from .models import *
 
 # ============================================================================
 # USER ADMIN
 # ============================================================================
 
+class BroadcastActionForm(ActionForm):
+    """Action bar with the promotion text for the broadcast action"""
+    title = forms.CharField(required=False, max_length=200, label='Promotion title')
+    message = forms.CharField(required=False, label='Promotion message')
+
+
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
     """
     Admin interface for User model.
     Extends Django's default UserAdmin with custom fields.
+    
+    Broadcast a promotion: filter the list (e.g. role = Customer), select
+    users (or "select all"), fill in title and message, and run
+    "Send promotion to selected users".
     """
     
+    action_form = BroadcastActionForm
+    actions = ['send_promotion']
+    
     # Fields to display in user list
     list_display = [
         'username', 'email', 'role', 'loyalty_points',
@@ -43,6 +60,50 @@ class UserAdmin(BaseUserAdmin):
             'fields': ('role', 'phone', 'notification_enabled')
         }),
     )
+    
+    def save_model(self, request, obj, form, change):
+        """
+        Save only the edited columns (never a full-row save, which would
+        write back counters read when the form was loaded).
+        Points edited in the admin are recorded as a ledger ADJUST entry
+        (see api.loyalty) instead of overwriting the balance.
+        """
+        if not change:
+            super().save_model(request, obj, form, change)
+            return
+        
+        # Save everything except the balance
+        other_fields = [
+            name for name in form.changed_data
+            if name not in User.COUNTER_FIELDS and name in {field.name for field in User._meta.concrete_fields}
+        ]
+        if other_fields:
+            obj.save(update_fields=other_fields)
+        
+        if 'loyalty_points' in form.changed_data:
+            from . import loyalty
+            
+            delta = obj.loyalty_points - form.initial['loyalty_points']
+            loyalty.adjust(obj.pk, delta, note=f'Admin adjustment by {request.user.username}')
+            obj.loyalty_points = loyalty.balance(obj.pk)
+    
+    @admin.action(description='Send promotion to selected users')
+    def send_promotion(self, request, queryset):
+        """Bulk PROMOTION notification to the selected users (see api.broadcast)"""
+        from .broadcast import broadcast_promotion
+        
+        title = request.POST.get('title', '').strip()
+        message = request.POST.get('message', '').strip()
+        if not title or not message:
+            self.message_user(request, 'Enter a promotion title and message', level=messages.ERROR)
+            return
+        
+        result = broadcast_promotion(queryset.filter(is_active=True), title, message)
+        self.message_user(
+            request,
+            f"Promotion sent to {result['sent']} users in {result['seconds']}s",
+            level=messages.SUCCESS
+        )
 
 
 # ============================================================================
@@ -163,18 +224,65 @@ class OrderAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         """
         Override save to handle status changes.
-        Award points when order is completed.
+        Status goes through apply_status_transition (the order transition
+        table) like the API, with the same notification and live events.
+        Other edited fields are saved on their own (never a full-row save,
+        which would write the status and release time loaded with the form
+        over a transition committed meanwhile).
         """
-        # Check if status changed
-        if change:
-            old_obj = Order.objects.get(pk=obj.pk)
-            if old_obj.status != obj.status:
-                # Status changed - notification will be sent by serializer
-                if obj.status == Order.OrderStatus.COMPLETED and not obj.completed_at:
-                    from django.utils import timezone
-                    obj.completed_at = timezone.now()
+        from .events import publish_order_status, publish_queue_event
+        from .outbox import enqueue_status_notifications
+        from .serializers import OrderStatusConflict, apply_status_transition
         
-        super().save_model(request, obj, form, change)
+        if not change:
+            super().save_model(request, obj, form, change)
+            return
+        
+        new_status = obj.status
+        old_status = form.initial.get('status', new_status)
+        
+        # Save only the edited columns, never the status
+        obj.status = old_status
+        other_fields = [
+            name for name in form.changed_data
+            if name != 'status' and name in {field.name for field in Order._meta.concrete_fields}
+        ]
+        if other_fields:
+            obj.save(update_fields=other_fields + ['updated_at'])
+        
+        status_changed = False
+        if new_status != old_status:
+            # Conditional status UPDATE against the status shown in the form
+            try:
+                apply_status_transition(obj, new_status, expected_status=old_status)
+            except (ValidationError, OrderStatusConflict) as error:
+                reason = error.detail['status'][0] if isinstance(error, ValidationError) else error.detail
+                self.message_user(
+                    request,
+                    f'Order #{obj.pk}: status not changed - {reason}',
+                    level=messages.ERROR
+                )
+            else:
+                status_changed = True
+                # Customer notification (admin saves run in a transaction)
+                enqueue_status_notifications([obj])
+                publish_order_status(obj)
+        
+        # Barista screens see the edit (or the order leaving the queue) after commit
+        if status_changed or other_fields:
+            publish_queue_event(obj)
+    
+    def delete_model(self, request, obj):
+        """Deleting an order cascades to its notifications - uncount them first"""
+        self.delete_queryset(request, Order.objects.filter(pk=obj.pk))
+    
+    def delete_queryset(self, request, queryset):
+        """Bulk delete action - uncount cascaded unread notifications"""
+        from .unread import notifications_removed
+        
+        with transaction.atomic():
+            notifications_removed(Notification.objects.filter(order__in=queryset))
+            queryset.delete()
 
 
 # ============================================================================
@@ -299,6 +407,52 @@ class NotificationAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    # Unread counters (User.unread_notification_count) move with every
+    # change below through api.unread, like the API paths
+    
+    def get_readonly_fields(self, request, obj=None):
+        """A sent notification can't be moved to another recipient"""
+        if obj is not None:
+            return self.readonly_fields + ['user']
+        return self.readonly_fields
+    
+    def save_model(self, request, obj, form, change):
+        """
+        New notifications are counted by the post_save signal.
+        Edits save only the changed columns; is_read goes through
+        api.unread so the recipient's counter follows it.
+        """
+        if not change:
+            super().save_model(request, obj, form, change)
+            return
+        
+        from . import unread
+        
+        other_fields = [
+            name for name in form.changed_data
+            if name != 'is_read' and name in {field.name for field in Notification._meta.concrete_fields}
+        ]
+        if other_fields:
+            obj.save(update_fields=other_fields)
+        
+        if 'is_read' in form.changed_data:
+            if obj.is_read:
+                unread.mark_read(obj)
+            else:
+                unread.mark_unread(obj)
+    
+    def delete_model(self, request, obj):
+        """Uncount the notification if it was unread, then delete it"""
+        self.delete_queryset(request, Notification.objects.filter(pk=obj.pk))
+    
+    def delete_queryset(self, request, queryset):
+        """Bulk delete action - uncount unread rows in the same transaction"""
+        from .unread import notifications_removed
+        
+        with transaction.atomic():
+            notifications_removed(queryset)
+            queryset.delete()
 
 
 # ============================================================================
@@ -341,6 +495,41 @@ class LoyaltyRedemptionAdmin(admin.ModelAdmin):
         return False
 
 
+# ============================================================================
+# ARCHIVED ORDER ADMIN
+# ============================================================================
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    """Read-only items of an archived order"""
+    model = ArchivedOrderItem
+    extra = 0
+    fields = ['menu_item', 'quantity', 'price', 'customizations']
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """
+    Read-only admin for archived orders.
+    Orders are moved here by the archive_orders command.
+    """
+    
+    list_display = ['id', 'customer', 'status', 'total_price', 'created_at', 'archived_at']
+    list_filter = ['status']
+    search_fields = ['customer__username', 'customer__email']
+    inlines = [ArchivedOrderItemInline]
+    ordering = ['-created_at']
+    
+    def has_add_permission(self, request):
+        """Archived orders are only created by the archive job"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        """Archived orders are read-only"""
+        return False
+
+
 # ============================================================================
 # ADMIN SITE CUSTOMIZATION
 # ============================================================================
@@ -0,0 +1,170 @@
+"""
+Hot/cold order archival.
+Finished orders (COMPLETED / CANCELLED) older than ORDER_ARCHIVE_AFTER_DAYS
+are moved with their items and notifications into the archive tables, so
+the queue, order lists and the admin only ever scan recent orders.
+
+A customer's order list and history read across both tables (see
+order_history), so archiving never hides an order from its owner.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    ArchivedNotification, ArchivedOrder, ArchivedOrderItem,
+    Notification, Order, OrderItem,
+)
+from .unread import notifications_removed
+
+# Statuses an order never leaves - safe to archive
+ARCHIVABLE_STATUSES = [Order.OrderStatus.COMPLETED, Order.OrderStatus.CANCELLED]
+
+# Columns copied from Order to ArchivedOrder
+ORDER_FIELDS = [
+    'id', 'customer_id', 'status', 'total_price', 'notes', 'scheduled_for',
+    'is_favourite', 'created_at', 'updated_at', 'completed_at',
+]
+
+
+def archivable_orders(cutoff):
+    """
+    Finished orders last changed before cutoff.
+    Orders still referenced from the hot tables stay put: favourite
+    templates would be deleted with them and redemptions would lose their link.
+    """
+    return Order.objects.filter(
+        status__in=ARCHIVABLE_STATUSES,
+        updated_at__lt=cutoff,
+        favouriteorder__isnull=True,
+        loyalty_redemptions__isnull=True,
+    )
+
+
+def _archive_batch(order_ids, cutoff):
+    """Copy one batch of orders into the archive and delete them (one transaction)"""
+    with transaction.atomic():
+        # Lock the batch and re-check it inside the transaction
+        orders = list(
+            archivable_orders(cutoff).filter(
+                pk__in=order_ids
+            ).select_for_update(of=('self',)).values(*ORDER_FIELDS)
+        )
+        ids = [order['id'] for order in orders]
+        if not ids:
+            return 0
+
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**order) for order in orders])
+
+        ArchivedOrderItem.objects.bulk_create([
+            ArchivedOrderItem(**item)
+            for item in OrderItem.objects.filter(order_id__in=ids).values(
+                'order_id', 'menu_item_id', 'quantity', 'price', 'customizations'
+            )
+        ])
+
+        ArchivedNotification.objects.bulk_create([
+            ArchivedNotification(**notification)
+            for notification in Notification.objects.filter(order_id__in=ids).values(
+                'user_id', 'notification_type', 'title', 'message',
+                'order_id', 'is_read', 'sent_at'
+            )
+        ])
+
+        # Children first, then the orders themselves
+        notifications_removed(Notification.objects.filter(order_id__in=ids))
+        Notification.objects.filter(order_id__in=ids).delete()
+        OrderItem.objects.filter(order_id__in=ids).delete()
+        Order.objects.filter(pk__in=ids).delete()
+
+    return len(ids)
+
+
+def archive_orders(older_than_days=None, batch_size=500, now=None):
+    """
+    Move finished orders older than older_than_days into the archive.
+    Works in batches of batch_size orders, each in its own transaction,
+    so locks stay short and a large backlog never builds one huge transaction.
+
+    Returns the number of orders archived.
+    """
+    if older_than_days is None:
+        older_than_days = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 7)
+    cutoff = (now or timezone.now()) - timedelta(days=older_than_days)
+
+    archived = 0
+    last_id = 0
+    while True:
+        # Walk forward by id so skipped orders are never revisited
+        batch = list(
+            archivable_orders(cutoff).filter(
+                pk__gt=last_id
+            ).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            break
+
+        archived += _archive_batch(batch, cutoff)
+        last_id = batch[-1]
+
+        if len(batch) < batch_size:
+            break
+
+    return archived
+
+
+def _history_tables(customer, status=None):
+    """The customer's orders in the hot and archive tables"""
+    tables = [
+        Order.objects.filter(customer=customer),
+        ArchivedOrder.objects.filter(customer=customer),
+    ]
+    if status:
+        tables = [queryset.filter(status=status) for queryset in tables]
+    return tables
+
+
+def order_history(customer, before=None, limit=20, status=None, summary=False):
+    """
+    Customer orders from the hot and archive tables, newest first.
+
+    before: (created_at, id) keyset position - only older orders are returned
+    limit: page size
+    status: only orders with this status
+    summary: annotate items_count / total_quantity instead of loading the
+             items (for OrderListSerializer)
+
+    Returns (orders, has_more). Orders are Order and ArchivedOrder instances
+    with customer (and items__menu_item unless summary) loaded. Each table
+    is read with a keyset scan on its (customer, -created_at) index, so
+    every page costs the same.
+    """
+    merged = []
+    for queryset in _history_tables(customer, status):
+        if before is not None:
+            created_at, order_id = before
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id)
+            )
+        queryset = queryset.select_related('customer')
+        if summary:
+            queryset = queryset.annotate(
+                items_count=Count('items'),
+                total_quantity=Coalesce(Sum('items__quantity'), 0)
+            )
+        else:
+            queryset = queryset.prefetch_related('items__menu_item')
+        merged += queryset.order_by('-created_at', '-id')[:limit + 1]
+
+    merged.sort(key=lambda order: (order.created_at, order.id), reverse=True)
+    return merged[:limit], len(merged) > limit
+
+
+def order_history_count(customer, status=None):
+    """Number of the customer's orders across both tables"""
+    return sum(queryset.count() for queryset in _history_tables(customer, status))
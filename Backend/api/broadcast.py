@@ -0,0 +1,79 @@
+"""
+Promotional broadcasts.
+Sends a PROMOTION notification to many users at once: user ids are
+streamed from the database and notifications are written with one
+bulk_create per batch, so memory stays flat and DB time grows linearly
+with the audience. Device pushes are left to the send_push_notifications
+worker (new notifications start as push PENDING).
+"""
+
+import time
+
+from .models import Notification, User
+from .unread import notifications_created
+
+
+def broadcast_audience(role=User.UserRole.CUSTOMER, only_enabled=False,
+                       min_points=None, joined_after=None):
+    """Active users matching the broadcast filters"""
+    users = User.objects.filter(is_active=True)
+    if role:
+        users = users.filter(role=role)
+    if only_enabled:
+        users = users.filter(notification_enabled=True)
+    if min_points is not None:
+        users = users.filter(loyalty_points__gte=min_points)
+    if joined_after is not None:
+        users = users.filter(date_joined__gte=joined_after)
+    return users
+
+
+def broadcast_promotion(users, title, message, batch_size=1000, progress=None):
+    """
+    Create a PROMOTION notification for every user in the users queryset.
+
+    users: queryset of recipients (e.g. from broadcast_audience)
+    batch_size: users read and notifications inserted per round trip
+    progress: optional callback(sent, elapsed_seconds) called after each batch
+
+    Returns {sent, seconds, per_second}.
+    """
+    started = time.monotonic()
+    sent = 0
+
+    def flush(user_ids):
+        """Insert one batch and bump the recipients' unread counters"""
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                user_id=user_id,
+                notification_type=Notification.NotificationType.PROMOTION,
+                title=title,
+                message=message
+            )
+            for user_id in user_ids
+        ])
+        # Same delta for everyone - one UPDATE per batch
+        notifications_created(notifications)
+        return len(notifications)
+
+    batch = []
+    # Stream ids only - never loads the whole audience into memory
+    for user_id in users.order_by().values_list('pk', flat=True).iterator(chunk_size=batch_size):
+        batch.append(user_id)
+        if len(batch) >= batch_size:
+            sent += flush(batch)
+            batch = []
+            if progress:
+                progress(sent, time.monotonic() - started)
+
+    if batch:
+        sent += flush(batch)
+        if progress:
+            progress(sent, time.monotonic() - started)
+
+    seconds = time.monotonic() - started
+    return {
+        'sent': sent,
+        'seconds': round(seconds, 3),
+        'per_second': round(sent / seconds) if seconds else sent,
+    }
@@ -0,0 +1,140 @@
+"""
+Collision-free redemption codes.
+Each code is a sequence number pushed through a keyed permutation
+(a Feistel network over 36^8 values) and written as 8 characters of
+A-Z0-9. Distinct numbers always give distinct codes, so no exists()
+check is needed, and without the key the codes can't be guessed from
+one another.
+
+Sequence numbers are reserved from the database in blocks (CodeSequence),
+so most codes cost no query at all. Only committed reservations are shared
+between requests: a block reserved inside the caller's transaction is used
+for that code, and the rest of it is handed to other requests once the
+transaction commits (transaction.on_commit). If it rolls back, the
+reservation is undone in the database and the block is simply dropped, so
+no number is ever handed out twice.
+
+The unique index stays as a safety net for codes issued before the
+allocator (see LoyaltyRedemption.save).
+"""
+
+import hashlib
+import hmac
+import string
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import CodeSequence
+
+# Code alphabet and length (same format as before: 8 x A-Z0-9)
+ALPHABET = string.digits + string.ascii_uppercase
+CODE_LENGTH = 8
+
+# Each Feistel half holds 4 characters
+HALF = len(ALPHABET) ** (CODE_LENGTH // 2)
+
+
+class CodeAllocator:
+    """
+    Hands out unique codes for one named sequence.
+
+    key: secret for the permutation (defaults to one derived from SECRET_KEY)
+    block_size: sequence numbers reserved per database round trip
+    """
+
+    rounds = 6
+
+    def __init__(self, name, key=None, block_size=100):
+        self.name = name
+        self.key = key
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    # ------------------------------------------------------------------
+    # Permutation
+    # ------------------------------------------------------------------
+
+    def _key(self):
+        """Permutation key - REDEMPTION_CODE_KEY, or derived from SECRET_KEY"""
+        if self.key is None:
+            secret = getattr(settings, 'REDEMPTION_CODE_KEY', None) or settings.SECRET_KEY
+            self.key = hmac.new(secret.encode(), self.name.encode(), hashlib.sha256).digest()
+        return self.key
+
+    def _round(self, index, value):
+        """Feistel round function: keyed hash of one half"""
+        digest = hmac.new(self._key(), f'{index}:{value}'.encode(), hashlib.sha256).digest()
+        return int.from_bytes(digest[:8], 'big') % HALF
+
+    def permute(self, number):
+        """Map a sequence number to a unique number below 36^8"""
+        left, right = divmod(number, HALF)
+        for index in range(self.rounds):
+            left, right = right, (left + self._round(index, right)) % HALF
+        return left * HALF + right
+
+    @staticmethod
+    def encode(number):
+        """Fixed-width base-36 representation"""
+        chars = []
+        for _ in range(CODE_LENGTH):
+            number, digit = divmod(number, len(ALPHABET))
+            chars.append(ALPHABET[digit])
+        return ''.join(reversed(chars))
+
+    # ------------------------------------------------------------------
+    # Sequence
+    # ------------------------------------------------------------------
+
+    def _reserve_block(self):
+        """Reserve the next block of sequence numbers (one UPDATE + one SELECT)"""
+        with transaction.atomic():
+            CodeSequence.objects.get_or_create(name=self.name)
+            CodeSequence.objects.filter(name=self.name).update(value=F('value') + self.block_size)
+            end = CodeSequence.objects.filter(name=self.name).values_list('value', flat=True).get()
+        return end - self.block_size, end
+
+    def _share_block(self, start, end):
+        """Committed reservation - let other requests use the rest of it"""
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = start, end
+
+    def next_number(self):
+        """Next unused sequence number"""
+        with self._lock:
+            if self._next < self._end:
+                number = self._next
+                self._next += 1
+                return number
+
+        if not transaction.get_connection().in_atomic_block:
+            # Autocommit - the reservation is committed straight away
+            start, end = self._reserve_block()
+            self._share_block(start + 1, end)
+            return start
+
+        # Inside the caller's transaction the reservation commits (or rolls
+        # back) with it - share the rest of the block only once it commits.
+        # The CodeSequence row stays locked until then, once per block.
+        start, end = self._reserve_block()
+        transaction.on_commit(lambda: self._share_block(start + 1, end))
+        return start
+
+    def discard_block(self):
+        """Drop the rest of the current block (after a clash) - the next code reserves a fresh one"""
+        with self._lock:
+            self._next = self._end = 0
+
+    def allocate(self):
+        """Next unique code"""
+        return self.encode(self.permute(self.next_number()))
+
+
+# Process-wide allocator for LoyaltyRedemption codes
+redemption_codes = CodeAllocator('redemption_code')
@@ -0,0 +1,143 @@
+"""
+WebSocket consumers for real-time features.
+Each consumer handles one type of live connection from the mobile app.
+"""
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .events import QUEUE_GROUP, order_group, queue_orders, to_wire, user_group
+from .models import Order, User
+from .serializers import OrderSerializer
+
+
+# ============================================================================
+# BARISTA QUEUE CONSUMER
+# ============================================================================
+
+class OrderQueueConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Live order queue for barista screens.
+    URL: ws://localhost:8000/ws/orders/queue/
+
+    On connect the client receives one snapshot of the queue:
+        {"event": "snapshot", "orders": [...]}
+    After that only per-order deltas are pushed:
+        {"event": "insert", "order": {...}}
+        {"event": "update", "order": {...}}
+        {"event": "remove", "order_id": 42}
+
+    Deltas are idempotent so clients can apply them on top of the snapshot
+    even if one arrives while the snapshot is being built.
+    """
+
+    async def connect(self):
+        """Only baristas and admins may watch the queue"""
+        user = self.scope.get('user')
+        if not (
+            user and
+            user.is_authenticated and
+            user.role in [User.UserRole.BARISTA, User.UserRole.ADMIN]
+        ):
+            await self.close()
+            return
+
+        # Join the group before reading the snapshot so no delta is missed
+        await self.channel_layer.group_add(QUEUE_GROUP, self.channel_name)
+        await self.accept()
+
+        orders = await self.get_queue_snapshot()
+        await self.send_json({'event': 'snapshot', 'orders': orders})
+
+    async def disconnect(self, close_code):
+        """Leave the queue group"""
+        await self.channel_layer.group_discard(QUEUE_GROUP, self.channel_name)
+
+    async def queue_event(self, event):
+        """Forward a queue delta published by api.events to the client"""
+        await self.send_json(event['message'])
+
+    @database_sync_to_async
+    def get_queue_snapshot(self):
+        """Serialize the current queue (same contents as GET /api/orders/queue/)"""
+        orders = queue_orders().select_related('customer').prefetch_related('items__menu_item')
+        return to_wire(OrderSerializer(orders, many=True).data)
+
+
+# ============================================================================
+# ORDER STATUS CONSUMER
+# ============================================================================
+
+class OrderStatusConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Live status updates for a single order.
+    URL: ws://localhost:8000/ws/orders/<order_id>/
+
+    Only the customer who placed the order and staff may connect.
+    Each status change is pushed as a compact event:
+        {"event": "status", "order_id": 42, "status": "READY",
+         "updated_at": "...", "completed_at": null}
+    """
+
+    async def connect(self):
+        """Check access to the order, then join its channel group"""
+        self.order_id = int(self.scope['url_route']['kwargs']['order_id'])
+        self.group_name = order_group(self.order_id)
+
+        user = self.scope.get('user')
+        if not (user and user.is_authenticated and await self.can_view_order(user)):
+            await self.close()
+            return
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        """Leave the order group"""
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def order_status(self, event):
+        """Forward a status event published by api.events to the client"""
+        await self.send_json(event['message'])
+
+    @database_sync_to_async
+    def can_view_order(self, user):
+        """Owner of the order, baristas and admins can follow it"""
+        if user.is_staff or user.role in [User.UserRole.BARISTA, User.UserRole.ADMIN]:
+            return Order.objects.filter(id=self.order_id).exists()
+        return Order.objects.filter(id=self.order_id, customer=user).exists()
+
+
+# ============================================================================
+# NOTIFICATION CONSUMER
+# ============================================================================
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Live notifications for the connected user.
+    URL: ws://localhost:8000/ws/notifications/
+
+    Every notification delivered by the outbox dispatcher is pushed as:
+        {"event": "notification", "id": 7, "notification_type": "ORDER_READY",
+         "title": "...", "message": "...", "order_id": 42, "sent_at": "..."}
+    """
+
+    async def connect(self):
+        """Join the user's channel group"""
+        user = self.scope.get('user')
+        if not (user and user.is_authenticated):
+            await self.close()
+            return
+
+        self.group_name = user_group(user.pk)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        """Leave the user's group"""
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def notification_created(self, event):
+        """Forward a notification published by api.events to the client"""
+        await self.send_json(event['message'])
@@ -0,0 +1,292 @@
+"""
+Preparation-time-aware ETA engine.
+Keeps an in-memory model of the barista queue and simulates it over a
+configurable number of parallel stations to predict when each order
+will be ready.
+
+The model is updated incrementally from queue events (order created,
+status changed, released) instead of being rebuilt from the database on
+every request. It is loaded once, on first use in each process. Server
+processes call eta_engine.start() (see Main.asgi / Main.wsgi) to resync it
+every ETA_RESYNC_SECONDS in a background thread, picking up changes made
+by other processes; reads never query for the model.
+
+Reads (estimate, estimate_many, quote) never change the model. Orders it
+doesn't know yet (placed by another process since the last resync) are
+estimated together against one copy.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import MenuItem, Order
+
+logger = logging.getLogger(__name__)
+
+
+class EtaEngine:
+    """
+    In-memory queue simulation.
+
+    Each queued order is tracked as:
+    - status: RECEIVED or PREPARING
+    - minutes: total preparation time (preparation_time x quantity)
+    - due: when it should be made (scheduled_for, otherwise created_at)
+    - started_at: when preparation started (PREPARING only)
+    - scheduled_for / release_at: for scheduled orders
+
+    Predictions are recomputed lazily, only after the model changed.
+    """
+
+    def __init__(self, stations=None, resync_seconds=None):
+        self.stations = stations or getattr(settings, 'ETA_BARISTA_STATIONS', 2)
+        self.resync_seconds = resync_seconds or getattr(settings, 'ETA_RESYNC_SECONDS', 60)
+        self._lock = threading.Lock()
+        self._orders = {}
+        self._etas = None
+        self._etas_at = None
+        self._loaded_at = None
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Model maintenance
+    # ------------------------------------------------------------------
+
+    def load(self):
+        """(Re)build the model from the database in one aggregate query"""
+        from .events import QUEUE_STATUSES
+
+        rows = Order.objects.filter(
+            status__in=QUEUE_STATUSES
+        ).annotate(
+            minutes=Sum(F('items__menu_item__preparation_time') * F('items__quantity'))
+        ).values(
+            'id', 'status', 'minutes', 'created_at', 'updated_at',
+            'scheduled_for', 'release_at'
+        )
+
+        orders = {row['id']: self._entry(row, row['minutes'] or 0) for row in rows}
+        with self._lock:
+            self._orders = orders
+            self._etas = None
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        """Load on first use (once per process)"""
+        if self._loaded_at is None:
+            self.load()
+
+    def reset(self):
+        """Forget the model; the next read loads it again (e.g. between tests)"""
+        with self._lock:
+            self._orders = {}
+            self._etas = None
+            self._etas_at = None
+            self._loaded_at = None
+
+    def start(self):
+        """
+        Start the background resync thread (once per process).
+        Called explicitly by server entry points, never from a request.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._resync_loop, name='eta-resync', daemon=True)
+        self._thread.start()
+
+    def _resync_loop(self):
+        """Reload the model every resync_seconds, off the request path"""
+        while True:
+            time.sleep(self.resync_seconds)
+            try:
+                self.load()
+            except Exception:
+                logger.exception('ETA model resync failed')
+            finally:
+                # This thread's own connection - don't keep it open while sleeping
+                connection.close()
+
+    @staticmethod
+    def _entry(order, minutes):
+        """Model entry for an order (model instance or values() row)"""
+        get = order.get if isinstance(order, dict) else lambda name: getattr(order, name)
+        return {
+            'status': get('status'),
+            'minutes': minutes,
+            'due': get('scheduled_for') or get('created_at'),
+            'started_at': get('updated_at'),
+            'scheduled_for': get('scheduled_for'),
+            'release_at': get('release_at'),
+        }
+
+    def order_changed(self, order):
+        """
+        Apply one order change to the model.
+        Called after commit for every queue event (see api.events).
+        Ignored until the model is loaded (the load picks the order up).
+        """
+        from .events import QUEUE_STATUSES
+
+        if self._loaded_at is None:
+            return
+
+        if order.status not in QUEUE_STATUSES:
+            with self._lock:
+                if self._orders.pop(order.pk, None) is not None:
+                    self._etas = None
+            return
+
+        with self._lock:
+            existing = self._orders.get(order.pk)
+
+        # Preparation time only needs the items once per order
+        if existing is not None:
+            minutes = existing['minutes']
+        else:
+            minutes = order.preparation_minutes()
+
+        entry = self._entry(order, minutes)
+        if existing is not None and existing['status'] == entry['status']:
+            # Preparation started when the status changed, not on later edits
+            entry['started_at'] = existing['started_at']
+
+        with self._lock:
+            self._orders[order.pk] = entry
+            self._etas = None
+
+    # ------------------------------------------------------------------
+    # Simulation
+    # ------------------------------------------------------------------
+
+    def _simulate(self, now, orders, extra_minutes=None):
+        """
+        Simulate the queue over parallel stations.
+        Returns ({order_id: ready_at}, ready_at of an extra order appended at the end).
+        """
+        etas = {}
+        stations = [now] * self.stations
+        heapq.heapify(stations)
+
+        # Orders in preparation occupy a station until they finish
+        preparing = sorted(
+            (entry['started_at'], order_id, entry)
+            for order_id, entry in orders.items()
+            if entry['status'] == Order.OrderStatus.PREPARING
+        )
+        for started_at, order_id, entry in preparing:
+            free_at = heapq.heappop(stations)
+            finish = max(free_at, started_at + timedelta(minutes=entry['minutes']))
+            etas[order_id] = finish
+            heapq.heappush(stations, finish)
+
+        # Received orders are picked up in due order by the next free station
+        received = sorted(
+            (entry['due'], order_id, entry)
+            for order_id, entry in orders.items()
+            if entry['status'] == Order.OrderStatus.RECEIVED
+        )
+        for due, order_id, entry in received:
+            if entry['release_at'] and entry['release_at'] > now:
+                # Held scheduled order - planned to be ready at pickup time
+                etas[order_id] = entry['scheduled_for']
+                continue
+
+            free_at = heapq.heappop(stations)
+            finish = free_at + timedelta(minutes=entry['minutes'])
+            heapq.heappush(stations, finish)
+            etas[order_id] = max(finish, entry['scheduled_for'] or finish)
+
+        extra = None
+        if extra_minutes is not None:
+            extra = stations[0] + timedelta(minutes=extra_minutes)
+
+        return etas, extra
+
+    def _current_etas(self):
+        """Cached predictions, recomputed only after changes (or once a minute)"""
+        self._ensure_loaded()
+        now = timezone.now()
+        with self._lock:
+            stale = self._etas_at is None or now - self._etas_at > timedelta(minutes=1)
+            if self._etas is None or stale:
+                self._etas, _ = self._simulate(now, self._orders)
+                self._etas_at = now
+            return self._etas
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def estimate(self, order):
+        """Predicted ready time for an order (None once it has left the queue)"""
+        return self.estimate_many([order]).get(order.pk)
+
+    def estimate_many(self, orders):
+        """
+        Predicted ready times for several orders: {order_id: ready_at}.
+        Orders that have left the queue are omitted. Read-only: orders the
+        model doesn't know yet (placed by another process since the last
+        resync) are added to one copy of the model and simulated together.
+        """
+        from .events import QUEUE_STATUSES
+
+        queued = [order for order in orders if order.status in QUEUE_STATUSES]
+        if not queued:
+            return {}
+
+        etas = self._current_etas()
+        unknown = [order for order in queued if order.pk not in etas]
+        if unknown:
+            with self._lock:
+                model = dict(self._orders)
+            for order in unknown:
+                model[order.pk] = self._entry(order, order.preparation_minutes())
+            etas, _ = self._simulate(timezone.now(), model)
+
+        return {order.pk: etas.get(order.pk) for order in queued}
+
+    def quote(self, minutes, scheduled_for=None):
+        """
+        Predict when a new order would be ready if placed now.
+        minutes: total preparation time of the basket
+        """
+        self._ensure_loaded()
+        now = timezone.now()
+        with self._lock:
+            orders = dict(self._orders)
+
+        _, ready_at = self._simulate(now, orders, extra_minutes=minutes)
+        if scheduled_for and scheduled_for > ready_at:
+            ready_at = scheduled_for
+
+        return {
+            'estimated_ready_at': ready_at,
+            'wait_minutes': max(0, round((ready_at - now).total_seconds() / 60)),
+            'orders_ahead': sum(
+                1 for entry in orders.values()
+                if not (entry['release_at'] and entry['release_at'] > now)
+            ),
+            'stations': self.stations,
+        }
+
+    def basket_minutes(self, items):
+        """Total preparation time for [{menu_item, quantity}] (one query)"""
+        menu_items = MenuItem.objects.in_bulk([item['menu_item'] for item in items])
+        return sum(
+            menu_items[item['menu_item']].preparation_time * item['quantity']
+            for item in items
+            if item['menu_item'] in menu_items
+        )
+
+
+# Process-wide engine used by views, serializers and queue events
+eta_engine = EtaEngine()
@@ -0,0 +1,186 @@
+"""
+Real-time event publishing for WebSocket consumers.
+Pushes small per-order messages to channel groups so clients
+don't need to re-fetch whole payloads to stay up to date.
+"""
+
+import json
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from .eta import eta_engine
+from .models import Order
+from .serializers import OrderSerializer
+
+# Channel group joined by every connected barista queue screen
+QUEUE_GROUP = 'order_queue'
+
+# Statuses shown in the barista queue
+QUEUE_STATUSES = [Order.OrderStatus.RECEIVED, Order.OrderStatus.PREPARING]
+
+
+def queue_orders():
+    """
+    Orders currently in the barista queue.
+    Scheduled orders that are not yet due (see Order.schedule_release) are held back.
+    Orders ordered by when they are due: scheduled time, otherwise when placed.
+    """
+    now = timezone.now()
+    return Order.objects.filter(
+        status__in=QUEUE_STATUSES
+    ).filter(
+        Q(release_at__isnull=True) | Q(release_at__lte=now)
+    ).order_by(Coalesce('scheduled_for', 'created_at'), 'id')
+
+
+def in_queue(order):
+    """Whether a single order belongs in the barista queue"""
+    return order.status in QUEUE_STATUSES and not order.is_held()
+
+
+def order_group(order_id):
+    """Channel group joined by everyone following a single order"""
+    return f'order_{order_id}'
+
+
+def user_group(user_id):
+    """Channel group joined by all of a user's notification sockets"""
+    return f'user_{user_id}'
+
+
+def to_wire(data):
+    """
+    Convert serializer output to plain JSON types.
+    Serializer data can contain Decimals (e.g. line totals), which
+    neither json.dumps nor the Redis channel layer can encode.
+    """
+    return json.loads(json.dumps(data, cls=JSONEncoder))
+
+
+def _group_send(group, message):
+    """Send a message to a channel group (no-op if no channel layer is configured)"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    async_to_sync(channel_layer.group_send)(group, message)
+
+
+def publish_queue_event(order, created=False, removed=False):
+    """
+    Push a single queue delta to all barista screens.
+    Sent after the surrounding transaction commits so clients never
+    see an order that was rolled back.
+
+    Event types:
+    - insert: order entered the queue (new order)
+    - update: order still in the queue but changed (e.g. RECEIVED → PREPARING)
+    - remove: order left the queue (READY, COMPLETED, CANCELLED or deleted)
+    
+    New scheduled orders that are held back send nothing; the release
+    job publishes their insert when they are due.
+    """
+    # Capture the id now - a deleted order loses its pk after delete()
+    order_id = order.pk
+
+    # Keep the in-memory ETA model in step with the queue
+    if not removed:
+        transaction.on_commit(lambda: eta_engine.order_changed(order), robust=True)
+
+    if created and not in_queue(order):
+        return
+
+    if removed or not in_queue(order):
+        message = {'event': 'remove', 'order_id': order_id}
+    else:
+        message = {
+            'event': 'insert' if created else 'update',
+            'order': to_wire(OrderSerializer(order).data),
+        }
+
+    transaction.on_commit(
+        lambda: _group_send(QUEUE_GROUP, {'type': 'queue.event', 'message': message})
+    )
+
+
+def publish_queue_events(orders, created=False):
+    """
+    Push queue deltas for several changed orders (e.g. a bulk status update).
+    Same events as publish_queue_event, but built after commit from one
+    prefetched query instead of one OrderSerializer per order inside the
+    transaction.
+
+    created: the orders just entered the queue (e.g. released scheduled
+    orders) - sent as inserts, and orders not in the queue send nothing.
+    """
+    order_ids = [order.pk for order in orders]
+    if not order_ids:
+        return
+
+    for order in orders:
+        transaction.on_commit(lambda order=order: eta_engine.order_changed(order), robust=True)
+
+    def send():
+        current = Order.objects.select_related('customer').prefetch_related(
+            'items__menu_item'
+        ).in_bulk(order_ids)
+        staying = [order for order in current.values() if in_queue(order)]
+        serialized = {
+            data['id']: data for data in to_wire(OrderSerializer(staying, many=True).data)
+        }
+
+        for order_id in order_ids:
+            if order_id in serialized:
+                message = {'event': 'insert' if created else 'update', 'order': serialized[order_id]}
+            elif created:
+                continue
+            else:
+                message = {'event': 'remove', 'order_id': order_id}
+            _group_send(QUEUE_GROUP, {'type': 'queue.event', 'message': message})
+
+    transaction.on_commit(send)
+
+
+def publish_order_status(order):
+    """
+    Push a compact status event to everyone following this order.
+    Much smaller than the full OrderSerializer payload - the client
+    only needs to know the new status and when it changed.
+    """
+    message = {
+        'event': 'status',
+        'order_id': order.pk,
+        'status': order.status,
+        'updated_at': order.updated_at.isoformat() if order.updated_at else None,
+        'completed_at': order.completed_at.isoformat() if order.completed_at else None,
+    }
+
+    transaction.on_commit(
+        lambda: _group_send(order_group(message['order_id']), {'type': 'order.status', 'message': message})
+    )
+
+
+def publish_notification(notification):
+    """
+    Push a newly created notification to its recipient's sockets.
+    Called by the outbox dispatcher (see api.outbox) after the
+    notification row is written.
+    """
+    message = {
+        'event': 'notification',
+        'id': notification.pk,
+        'notification_type': notification.notification_type,
+        'title': notification.title,
+        'message': notification.message,
+        'order_id': notification.order_id,
+        'sent_at': notification.sent_at.isoformat() if notification.sent_at else None,
+    }
+
+    transaction.on_commit(
+        lambda: _group_send(user_group(notification.user_id), {'type': 'notification.created', 'message': message})
+    )
@@ -0,0 +1,214 @@
+"""
+Idempotency-Key support for non-idempotent endpoints.
+A request sent again with the same key (e.g. a mobile retry after a
+dropped connection) gets the original response back instead of being
+executed a second time.
+
+The first request claims the key by inserting an IdempotencyKey row
+(unique per user and key) with a short lease. The view and the stored
+response are then written in one transaction, which only commits while
+the claim is still ours - so the order and its key's completion land
+together or not at all.
+
+A duplicate that arrives while the claim is in progress polls the key
+for a short, bounded time (IDEMPOTENCY_WAIT_SECONDS) and replays the
+first response once it is stored. If the first request is still running
+after that, the duplicate gets 409 and the client should retry later
+with the same key. If the original request died, its lease runs out and
+the next retry takes the key over.
+"""
+
+import hashlib
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .events import to_wire
+from .models import IdempotencyKey
+
+# Header clients send (Django exposes it as request.headers['Idempotency-Key'])
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+# How often a duplicate re-reads a key that is still in progress
+WAIT_POLL_SECONDS = 0.1
+
+
+def _fingerprint(request):
+    """Hash of method, path and body - the same key must mean the same request"""
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.get_full_path().encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _lease():
+    """Lease end for a claim made now"""
+    return timezone.now() + timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LEASE_SECONDS', 30))
+
+
+def _claim(user, key, fingerprint):
+    """
+    Try to claim a key for this request.
+    Returns (record, claimed). Expired keys are replaced, and an unfinished
+    claim whose lease ran out is taken over (conditional UPDATE, so only
+    one retry wins).
+    """
+    ttl = timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+    now = timezone.now()
+
+    # Drop an expired key so it can be reused
+    IdempotencyKey.objects.filter(user=user, key=key, expires_at__lte=now).delete()
+
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user=user,
+                key=key,
+                fingerprint=fingerprint,
+                locked_until=_lease(),
+                expires_at=now + ttl
+            )
+        return record, True
+    except IntegrityError:
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is None:
+            # Released between our INSERT and SELECT - try again
+            return _claim(user, key, fingerprint)
+
+    stale = (
+        not record.is_complete() and
+        record.fingerprint == fingerprint and
+        (record.locked_until is None or record.locked_until <= now)
+    )
+    if stale:
+        lease = _lease()
+        if IdempotencyKey.objects.filter(
+            pk=record.pk, status_code__isnull=True, locked_until=record.locked_until
+        ).update(locked_until=lease):
+            record.locked_until = lease
+            return record, True
+    return record, False
+
+
+def _wait_for_completion(record):
+    """
+    Poll an in-progress key for up to IDEMPOTENCY_WAIT_SECONDS.
+    Returns the completed record, or None if it is still running or was
+    released (the caller then tries to claim it again).
+    """
+    wait = getattr(settings, 'IDEMPOTENCY_WAIT_SECONDS', 2)
+    for _ in range(int(wait / WAIT_POLL_SECONDS)):
+        time.sleep(WAIT_POLL_SECONDS)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+        if record is None or record.is_complete():
+            return record
+    return None
+
+
+def _release(record):
+    """Give up our claim so the client can retry (unless someone took it over)"""
+    IdempotencyKey.objects.filter(
+        pk=record.pk, status_code__isnull=True, locked_until=record.locked_until
+    ).delete()
+
+
+class _LostClaim(Exception):
+    """Our lease ran out and another request took the key over"""
+
+
+def idempotent(view_method):
+    """
+    Decorator for ViewSet methods that create things.
+    Without an Idempotency-Key header the view runs as usual.
+
+    With a key:
+    - first request: runs the view and stores its response in one transaction
+    - replay: returns the stored response (Idempotent-Replayed: true),
+      without touching any other table
+    - duplicate while the first is still running: waits up to
+      IDEMPOTENCY_WAIT_SECONDS and replays its response, else 409
+      (retry later with the same key)
+    - retry after the first request died (lease expired): takes the key over
+    - same key with a different request: 422
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+
+        if len(key) > 100:
+            return Response(
+                {'error': 'Idempotency-Key must be at most 100 characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = _fingerprint(request)
+        record, claimed = _claim(request.user, key, fingerprint)
+
+        if not claimed and record.fingerprint == fingerprint and not record.is_complete():
+            # The first request is still running - wait briefly for its response
+            completed = _wait_for_completion(record)
+            if completed is not None:
+                record = completed
+            else:
+                # Still running, released or its lease ran out - try once more
+                record, claimed = _claim(request.user, key, fingerprint)
+
+        if not claimed:
+            if record.fingerprint != fingerprint:
+                return Response(
+                    {'error': 'Idempotency-Key was already used for a different request'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if not record.is_complete():
+                return Response(
+                    {'error': 'A request with this Idempotency-Key is still in progress'},
+                    status=status.HTTP_409_CONFLICT
+                )
+
+            return Response(
+                record.response_body,
+                status=record.status_code,
+                headers={'Idempotent-Replayed': 'true'}
+            )
+
+        try:
+            with transaction.atomic():
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code >= 500:
+                    # Don't keep server errors - undo and let the client retry
+                    transaction.set_rollback(True)
+                else:
+                    # Completes the key only if the claim is still ours;
+                    # otherwise everything the view wrote is rolled back
+                    if not IdempotencyKey.objects.filter(
+                        pk=record.pk, status_code__isnull=True, locked_until=record.locked_until
+                    ).update(
+                        status_code=response.status_code,
+                        response_body=to_wire(response.data),
+                        locked_until=None
+                    ):
+                        raise _LostClaim()
+        except _LostClaim:
+            return Response(
+                {'error': 'A request with this Idempotency-Key is still in progress'},
+                status=status.HTTP_409_CONFLICT
+            )
+        except Exception:
+            # Release the key so the client can retry
+            _release(record)
+            raise
+
+        if response.status_code >= 500:
+            _release(record)
+        return response
+
+    return wrapper
@@ -0,0 +1,192 @@
+"""
+Menu image variants.
+Menu photos are uploaded at full size, but the mobile grid only needs
+small copies. For every uploaded image the generate_menu_images worker
+builds resized variants (MENU_IMAGE_VARIANTS: thumb, card, full) in the
+original format and as WebP, off the request path.
+
+Variant files are named after a hash of their contents
+(menu_items/variants/<item>-<size>.<hash>.<ext>), so a URL always serves
+the same bytes and can be cached as immutable. A new upload gives new
+names, and the old files are simply no longer referenced.
+
+An item is pending while image_variants_source differs from its image,
+so saving a new photo (admin or API) is enough to queue it.
+
+A missing or undecodable photo is recorded as done without variants (the
+app falls back to the original). Other I/O errors are usually temporary
+(storage unavailable, disk full) and are retried with backoff, up to
+MENU_IMAGE_MAX_ATTEMPTS times.
+"""
+
+import hashlib
+import io
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import MenuItem
+
+logger = logging.getLogger(__name__)
+
+# Where generated files are stored (under MEDIA_ROOT)
+VARIANTS_DIR = 'menu_items/variants'
+
+# Encoder settings per output format
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+
+def variant_widths():
+    """Target width per variant name, smallest first"""
+    configured = getattr(settings, 'MENU_IMAGE_VARIANTS', {'thumb': 160, 'card': 480, 'full': 1200})
+    return dict(sorted(configured.items(), key=lambda item: item[1]))
+
+
+def pending_items(now=None):
+    """Menu items whose image has no variants yet (or changed since) and isn't backing off"""
+    return MenuItem.objects.exclude(
+        Q(image='') | Q(image__isnull=True)
+    ).exclude(
+        image_variants_source=F('image')
+    ).exclude(image_variants_retry_at__gt=now or timezone.now())
+
+
+def _retry_delay(attempts):
+    """Backoff after a temporary failure: 1, 2, 4 ... minutes, capped at 1 hour"""
+    return timedelta(minutes=min(2 ** (attempts - 1), 60))
+
+
+def _encode(image, fmt):
+    """Encode a Pillow image to bytes ('jpeg', 'png' or 'webp')"""
+    buffer = io.BytesIO()
+    if fmt == 'jpeg':
+        image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif fmt == 'png':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=6)
+    return buffer.getvalue()
+
+
+def _store(stem, fmt, data):
+    """Save bytes under a content-hashed name; identical files are written once"""
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    name = f'{VARIANTS_DIR}/{stem}.{digest}.{"jpg" if fmt == "jpeg" else fmt}'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(data))
+    return name
+
+
+def build_variants(item):
+    """
+    Render and store every variant of item.image.
+    Returns the image_variants dict. Images are never upscaled: sizes larger
+    than the original reuse the original width.
+    """
+    with item.image.open('rb') as source:
+        original = Image.open(source)
+        original.load()
+    # Apply camera rotation so variants don't come out sideways
+    original = ImageOps.exif_transpose(original)
+
+    # Keep transparency (PNG) where the original has it, JPEG otherwise
+    has_alpha = original.mode in ('RGBA', 'LA') or 'transparency' in original.info
+    fallback = 'png' if has_alpha else 'jpeg'
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if has_alpha else 'RGB')
+
+    base = os.path.splitext(os.path.basename(item.image.name))[0]
+    variants = {}
+    for size, width in variant_widths().items():
+        width = min(width, original.width)
+        height = max(1, round(original.height * width / original.width))
+        resized = original if width == original.width else original.resize(
+            (width, height), Image.Resampling.LANCZOS
+        )
+
+        stem = f'{base}-{size}'
+        variants[size] = {
+            'width': width,
+            fallback: _store(stem, fallback, _encode(resized, fallback)),
+            'webp': _store(stem, 'webp', _encode(resized, 'webp')),
+        }
+    return variants
+
+
+def generate_menu_images(batch_size=20, now=None):
+    """
+    Build variants for pending menu items.
+    The result is written only if the item still has the same image
+    (a photo replaced meanwhile stays pending for the next round).
+
+    Returns (generated, failed); failed includes items that will be retried.
+    """
+    from .menu import menu_cache
+
+    now = now or timezone.now()
+    max_attempts = getattr(settings, 'MENU_IMAGE_MAX_ATTEMPTS', 5)
+    generated = failed = 0
+    for item in pending_items(now).order_by('pk')[:batch_size]:
+        source = item.image.name
+        same_image = MenuItem.objects.filter(pk=item.pk, image=source)
+        try:
+            variants = build_variants(item)
+        except (FileNotFoundError, UnidentifiedImageError, Image.DecompressionBombError, ValueError) as error:
+            # Missing or undecodable - retrying won't help
+            logger.warning('Menu item %s image %s is unusable: %s', item.pk, source, error)
+            variants = {}
+            failed += 1
+        except OSError as error:
+            failed += 1
+            attempts = item.image_variants_attempts + 1
+            if attempts < max_attempts:
+                logger.warning('Menu item %s image %s failed (attempt %d), retrying: %s', item.pk, source, attempts, error)
+                same_image.update(
+                    image_variants_attempts=attempts,
+                    image_variants_retry_at=now + _retry_delay(attempts)
+                )
+                continue
+            logger.error('Menu item %s image %s failed %d times, giving up: %s', item.pk, source, attempts, error)
+            variants = {}
+        else:
+            generated += 1
+
+        same_image.update(
+            image_variants=variants, image_variants_source=source,
+            image_variants_attempts=0, image_variants_retry_at=None
+        )
+
+    if generated or failed:
+        # update() sends no signals - refresh menu snapshots in this process
+        menu_cache.bump()
+    return generated, failed
+
+
+def srcset(item, build_url):
+    """
+    srcset strings per format for an item, e.g.
+    {"webp": "<url> 160w, <url> 480w, ...", "jpeg": "..."}
+    build_url turns a media URL into the URL to send (e.g. an absolute one).
+    None while variants are pending.
+    """
+    if not item.image or item.image_variants_source != item.image.name or not item.image_variants:
+        return None
+
+    sets, widths = {}, set()
+    for variant in sorted(item.image_variants.values(), key=lambda variant: variant['width']):
+        # Small originals give several variants of the same width - list each once
+        if variant['width'] in widths:
+            continue
+        widths.add(variant['width'])
+        for fmt, name in variant.items():
+            if fmt != 'width':
+                sets.setdefault(fmt, []).append(f"{build_url(default_storage.url(name))} {variant['width']}w")
+    return {fmt: ', '.join(entries) for fmt, entries in sets.items()}
@@ -0,0 +1,128 @@
+"""
+Loyalty points ledger.
+Every points change is an append-only LoyaltyLedger entry, and
+User.loyalty_points is updated in the same transaction with a single
+F() expression - no read-modify-write, so concurrent orders and
+redemptions can't lose each other's changes.
+
+Spending points is a conditional decrement
+(UPDATE ... SET loyalty_points = loyalty_points - n WHERE loyalty_points >= n),
+which fails cleanly instead of going negative.
+
+Redemption codes are applied the same way: one conditional UPDATE
+(... SET is_used = true WHERE is_used = false), so a double-tap at the
+counter can't use a code twice.
+"""
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import LoyaltyLedger, LoyaltyRedemption, User
+
+
+class InsufficientPoints(Exception):
+    """Balance is lower than the points being spent"""
+
+
+def _record(user_id, kind, points, **fields):
+    """Write one ledger entry and move the cached balance"""
+    with transaction.atomic():
+        entry = LoyaltyLedger.objects.create(user_id=user_id, kind=kind, points=points, **fields)
+        User.objects.filter(pk=user_id).update(loyalty_points=F('loyalty_points') + points)
+    return entry
+
+
+def earn(user_id, points, order=None):
+    """Award points (e.g. for an order)"""
+    if points <= 0:
+        return None
+    return _record(user_id, LoyaltyLedger.Kind.EARN, points, order=order)
+
+
+def adjust(user_id, points, note=''):
+    """Manual correction (positive or negative)"""
+    if not points:
+        return None
+    return _record(user_id, LoyaltyLedger.Kind.ADJUST, points, note=note)
+
+
+def spend(user_id, points, redemption=None):
+    """
+    Spend points with a conditional decrement.
+    Raises InsufficientPoints (and writes nothing) if the balance is too low.
+    """
+    with transaction.atomic():
+        updated = User.objects.filter(
+            pk=user_id, loyalty_points__gte=points
+        ).update(loyalty_points=F('loyalty_points') - points)
+        if not updated:
+            raise InsufficientPoints(f'Balance is below {points} points')
+
+        return LoyaltyLedger.objects.create(
+            user_id=user_id,
+            kind=LoyaltyLedger.Kind.REDEEM,
+            points=-points,
+            redemption=redemption
+        )
+
+
+def find_redemption(code):
+    """Redemption with its offer and customer by code (unique index lookup), or None"""
+    if not code:
+        return None
+    return LoyaltyRedemption.objects.select_related(
+        'customer', 'loyalty_offer'
+    ).filter(redemption_code=code.strip().upper()).first()
+
+
+def use_redemption(redemptions, order_id=None):
+    """
+    Mark a redemption used with one conditional UPDATE ... WHERE is_used = false.
+    Returns whether it was applied (False if already used or not matched).
+    """
+    fields = {'is_used': True}
+    if order_id:
+        fields['order_id'] = order_id
+    return bool(redemptions.filter(is_used=False).update(**fields))
+
+
+def balance(user_id):
+    """Current cached balance (one indexed lookup)"""
+    return User.objects.filter(pk=user_id).values_list('loyalty_points', flat=True).first()
+
+
+def reconcile_balances(batch_size=2000):
+    """
+    Recompute balances from the ledger and fix cached balances that drifted.
+    One aggregate query per batch of users (SUM over the (user, ...) index).
+    Returns {user_id: (cached, ledger)} for the users that were corrected.
+    """
+    corrected = {}
+    last_id = 0
+    while True:
+        users = list(
+            User.objects.filter(pk__gt=last_id).order_by('pk').values_list(
+                'pk', 'loyalty_points'
+            )[:batch_size]
+        )
+        if not users:
+            break
+
+        # Sum right after reading the batch to keep the race window small
+        totals = dict(
+            LoyaltyLedger.objects.filter(
+                user_id__in=[user_id for user_id, _ in users]
+            ).values_list('user').annotate(total=Sum('points')).order_by()
+        )
+
+        for user_id, cached in users:
+            expected = totals.get(user_id, 0)
+            # Only fix rows nobody changed since we read them
+            if cached != expected and User.objects.filter(
+                pk=user_id, loyalty_points=cached
+            ).update(loyalty_points=expected):
+                corrected[user_id] = (cached, expected)
+
+        last_id = users[-1][0]
+
+    return corrected
@@ -0,0 +1,64 @@
+"""
+Management command to move old finished orders into the archive tables.
+Run once (e.g. nightly from cron):
+    python manage.py archive_orders
+Or keep it running as a scheduled worker:
+    python manage.py archive_orders --loop --interval 3600
+
+COMPLETED and CANCELLED orders older than ORDER_ARCHIVE_AFTER_DAYS
+(or --days) are moved with their items and notifications (see api.archive).
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.archive import archive_orders
+
+
+class Command(BaseCommand):
+    """
+    Django management command that archives finished orders in batches.
+    """
+
+    help = 'Moves old COMPLETED/CANCELLED orders into the archive tables'
+
+    def add_arguments(self, parser):
+        """Define command line options"""
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 7),
+            help='Archive finished orders last updated more than this many days ago'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Orders moved per transaction'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and archive orders as they age'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=3600,
+            help='Seconds between runs when running with --loop'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        while True:
+            archived = archive_orders(
+                older_than_days=options['days'],
+                batch_size=options['batch_size']
+            )
+            self.stdout.write(self.style.SUCCESS(f'✅ Archived {archived} orders'))
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
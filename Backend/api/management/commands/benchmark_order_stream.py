@@ -0,0 +1,130 @@
+"""
+Management command to benchmark live order status fan-out.
+Run with: python manage.py benchmark_order_stream --connections 2000
+
+Connects many OrderStatusConsumer instances to one order using the
+Channels test communicator, broadcasts status events through the
+channel layer and reports delivery latency percentiles.
+
+A temporary customer and order are created for the run and deleted afterwards.
+"""
+
+import asyncio
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+
+from api.events import order_group
+from api.models import Order, User
+from api.routing import websocket_urlpatterns
+
+
+class Command(BaseCommand):
+    """
+    Django management command to measure WebSocket broadcast latency.
+    Useful for sizing the channel layer before busy service periods.
+    """
+
+    help = 'Benchmarks broadcast latency of per-order status WebSockets'
+
+    def add_arguments(self, parser):
+        """Define command line options"""
+        parser.add_argument(
+            '--connections',
+            type=int,
+            default=2000,
+            help='Number of WebSocket clients following the order'
+        )
+        parser.add_argument(
+            '--broadcasts',
+            type=int,
+            default=20,
+            help='Number of status events to broadcast'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        connections = options['connections']
+        broadcasts = options['broadcasts']
+
+        # Temporary customer and order to follow
+        customer = User.objects.create_user(
+            username=f'benchmark-{int(time.time() * 1000)}',
+            password=None
+        )
+        order = Order.objects.create(customer=customer, total_price=0)
+
+        try:
+            self.stdout.write(
+                f'Connecting {connections} clients to order #{order.id}...'
+            )
+            connect_time, latencies = async_to_sync(self.run)(
+                customer, order.id, connections, broadcasts
+            )
+        finally:
+            # Deleting the customer cascades to the order
+            customer.delete()
+
+        self.report(connections, broadcasts, connect_time, latencies)
+
+    async def run(self, user, order_id, connections, broadcasts):
+        """Connect all clients, broadcast events and collect latencies in ms"""
+        application = URLRouter(websocket_urlpatterns)
+        channel_layer = get_channel_layer()
+
+        # Connect every client as the order owner
+        start = time.perf_counter()
+        communicators = []
+        for _ in range(connections):
+            communicator = WebsocketCommunicator(application, f'/ws/orders/{order_id}/')
+            communicator.scope['user'] = user
+            connected, _ = await communicator.connect()
+            if not connected:
+                raise RuntimeError('WebSocket connection was rejected')
+            communicators.append(communicator)
+        connect_time = time.perf_counter() - start
+
+        latencies = []
+        try:
+            for index in range(broadcasts):
+                sent_at = time.perf_counter()
+                await channel_layer.group_send(order_group(order_id), {
+                    'type': 'order.status',
+                    'message': {'event': 'status', 'order_id': order_id, 'seq': index},
+                })
+
+                # Record when each client receives the event
+                async def receive(communicator):
+                    await communicator.receive_json_from(timeout=30)
+                    return (time.perf_counter() - sent_at) * 1000
+
+                latencies.extend(await asyncio.gather(
+                    *(receive(communicator) for communicator in communicators)
+                ))
+        finally:
+            for communicator in communicators:
+                await communicator.disconnect()
+
+        return connect_time, latencies
+
+    def report(self, connections, broadcasts, connect_time, latencies):
+        """Print connection time and latency percentiles"""
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+
+        self.stdout.write(f'\nClients:      {connections}')
+        self.stdout.write(f'Broadcasts:   {broadcasts}')
+        self.stdout.write(f'Deliveries:   {len(latencies)}')
+        self.stdout.write(f'Connect time: {connect_time:.2f}s')
+        self.stdout.write('\nBroadcast latency (ms):')
+        self.stdout.write(f'   mean  {statistics.mean(latencies):8.2f}')
+        for p in (50, 90, 99):
+            self.stdout.write(f'   p{p:<3} {percentile(p):8.2f}')
+        self.stdout.write(f'   max   {latencies[-1]:8.2f}')
@@ -0,0 +1,155 @@
+"""
+Management command to compare barista queue wire formats.
+Run with: python manage.py benchmark_queue_format --orders 500
+
+Generates a queue of orders inside a transaction, serializes it with the
+full OrderSerializer and with the compact CompactQueueSerializer, and
+reports payload size and serialization time for each.
+
+All generated data is rolled back at the end of the run.
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from api.events import QUEUE_STATUSES
+from api.models import MenuItem, Order, OrderItem, User
+from api.serializers import CompactQueueSerializer, OrderSerializer
+
+
+class Command(BaseCommand):
+    """
+    Django management command to benchmark queue serialization.
+    Useful for checking payload growth before changing queue serializers.
+    """
+
+    help = 'Compares full and compact barista queue formats on a generated queue'
+
+    def add_arguments(self, parser):
+        """Define command line options"""
+        parser.add_argument(
+            '--orders',
+            type=int,
+            default=500,
+            help='Number of orders in the generated queue'
+        )
+        parser.add_argument(
+            '--customers',
+            type=int,
+            default=100,
+            help='Number of distinct customers placing those orders'
+        )
+        parser.add_argument(
+            '--menu-items',
+            type=int,
+            default=15,
+            help='Number of distinct menu items on the menu'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Serialization runs per format (best time is reported)'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        with transaction.atomic():
+            self.generate_queue(options)
+            results = self.measure(options['repeat'])
+
+            # Throw the generated data away
+            transaction.set_rollback(True)
+
+        self.report(options, results)
+
+    def generate_queue(self, options):
+        """Create customers, menu items and a queue of orders with 1-4 lines each"""
+        rng = random.Random(42)
+        prefix = f'benchmark-{int(time.time() * 1000)}'
+
+        customers = User.objects.bulk_create([
+            User(username=f'{prefix}-{index}', email=f'{prefix}-{index}@example.com')
+            for index in range(options['customers'])
+        ])
+        menu_items = MenuItem.objects.bulk_create([
+            MenuItem(
+                title=f'{prefix} item {index}',
+                description='A reasonably long description of a menu item ' * 3,
+                image=f'menu_items/{prefix}-{index}.jpg',
+                item_type=rng.choice(MenuItem.ItemType.values),
+                price=rng.choice([2.5, 3, 4, 4.5, 5]),
+                preparation_time=rng.randint(1, 5),
+            )
+            for index in range(options['menu_items'])
+        ])
+        orders = Order.objects.bulk_create([
+            Order(
+                customer=rng.choice(customers),
+                status=rng.choice(QUEUE_STATUSES),
+                total_price=0,
+            )
+            for _ in range(options['orders'])
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                menu_item=menu_item,
+                quantity=rng.randint(1, 3),
+                price=menu_item.price,
+            )
+            for order in orders
+            for menu_item in rng.sample(menu_items, rng.randint(1, 4))
+        ])
+
+        self.order_ids = [order.id for order in orders]
+
+    def measure(self, repeat):
+        """Serialize the generated queue in both formats"""
+        request = RequestFactory().get('/api/orders/queue/')
+        renderer = JSONRenderer()
+
+        formats = {
+            'full': lambda orders: OrderSerializer(
+                orders, many=True, context={'request': request}
+            ).data,
+            'compact': lambda orders: CompactQueueSerializer(orders).data,
+        }
+
+        results = {}
+        for name, serialize in formats.items():
+            best = None
+            for _ in range(repeat):
+                orders = list(
+                    Order.objects.select_related('customer').prefetch_related(
+                        'items__menu_item'
+                    ).filter(id__in=self.order_ids).order_by('created_at')
+                )
+                start = time.perf_counter()
+                body = renderer.render(serialize(orders))
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = (len(body), best)
+        return results
+
+    def report(self, options, results):
+        """Print payload size and serialization time per format"""
+        self.stdout.write(
+            f"\nQueue: {options['orders']} orders, {options['customers']} customers, "
+            f"{options['menu_items']} menu items\n"
+        )
+        self.stdout.write(f"{'format':<10}{'bytes':>12}{'serialize ms':>16}")
+        for name, (size, seconds) in results.items():
+            self.stdout.write(f'{name:<10}{size:>12}{seconds * 1000:>16.2f}')
+
+        full_size, full_time = results['full']
+        compact_size, compact_time = results['compact']
+        self.stdout.write(
+            f'\nCompact is {full_size / compact_size:.1f}x smaller and '
+            f'{full_time / compact_time:.1f}x faster to serialize'
+        )
@@ -0,0 +1,90 @@
+"""
+Management command to send a promotional notification to many users.
+Usage:
+    python manage.py broadcast_promotion --title "Happy hour" --message "2-for-1 lattes until 5pm"
+    python manage.py broadcast_promotion --title "..." --message "..." --min-points 100 --only-enabled
+
+Notifications are written in bulk batches (see api.broadcast). Device
+pushes are sent by the send_push_notifications worker.
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.broadcast import broadcast_audience, broadcast_promotion
+from api.models import User
+
+
+class Command(BaseCommand):
+    """
+    Django management command that broadcasts a PROMOTION notification.
+    """
+
+    help = 'Sends a promotional notification to customers matching the filters'
+
+    def add_arguments(self, parser):
+        """Define command line options"""
+        parser.add_argument('--title', required=True, help='Notification headline')
+        parser.add_argument('--message', required=True, help='Notification body text')
+        parser.add_argument(
+            '--role',
+            default=User.UserRole.CUSTOMER,
+            choices=User.UserRole.values + ['ALL'],
+            help='Recipient role (default CUSTOMER, ALL for every role)'
+        )
+        parser.add_argument(
+            '--only-enabled',
+            action='store_true',
+            help='Only users with notifications enabled'
+        )
+        parser.add_argument(
+            '--min-points',
+            type=int,
+            help='Only users with at least this many loyalty points'
+        )
+        parser.add_argument(
+            '--joined-after',
+            help='Only users who joined on or after this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Notifications inserted per batch'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        joined_after = None
+        if options['joined_after']:
+            try:
+                joined_after = timezone.make_aware(
+                    datetime.strptime(options['joined_after'], '%Y-%m-%d')
+                )
+            except ValueError:
+                raise CommandError('--joined-after must be YYYY-MM-DD')
+
+        users = broadcast_audience(
+            role=None if options['role'] == 'ALL' else options['role'],
+            only_enabled=options['only_enabled'],
+            min_points=options['min_points'],
+            joined_after=joined_after
+        )
+
+        def progress(sent, elapsed):
+            self.stdout.write(f'  {sent} sent ({round(sent / elapsed) if elapsed else sent}/s)')
+
+        result = broadcast_promotion(
+            users,
+            title=options['title'],
+            message=options['message'],
+            batch_size=options['batch_size'],
+            progress=progress
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Sent {result['sent']} notifications in {result['seconds']}s "
+            f"({result['per_second']}/s)"
+        ))
@@ -0,0 +1,64 @@
+"""
+Management command to deliver queued notifications from the outbox.
+Run once (e.g. from cron every minute):
+    python manage.py dispatch_outbox
+Or keep it running as a worker:
+    python manage.py dispatch_outbox --loop --interval 1
+
+Each batch is written with one bulk_create and pushed to the users'
+WebSocket sockets. Failures are retried with backoff (see api.outbox).
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.outbox import dispatch_outbox, next_attempt_at
+
+
+class Command(BaseCommand):
+    """
+    Django management command that drains the notification outbox.
+    """
+
+    help = 'Delivers queued notifications from the outbox'
+
+    def add_arguments(self, parser):
+        """Define command line options"""
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and deliver notifications as they are queued'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1,
+            help='Maximum seconds between checks when running with --loop'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Notifications delivered per transaction'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        while True:
+            delivered, failed = dispatch_outbox(batch_size=options['batch_size'])
+            if delivered:
+                self.stdout.write(self.style.SUCCESS(f'✅ Delivered {delivered} notifications'))
+            if failed:
+                self.stdout.write(self.style.WARNING(f'⚠️ {failed} notifications failed, will retry'))
+
+            if not options['loop']:
+                break
+
+            # Wake up early when a retry is due before the next regular check
+            sleep_for = options['interval']
+            next_due = next_attempt_at()
+            if next_due is not None:
+                sleep_for = max(0, min(sleep_for, (next_due - timezone.now()).total_seconds()))
+            time.sleep(sleep_for)
@@ -0,0 +1,61 @@
+"""
+Management command to build resized/WebP copies of menu photos.
+Run once (e.g. after deploying or from cron):
+    python manage.py generate_menu_images
+Or keep it running so new uploads are picked up within seconds:
+    python manage.py generate_menu_images --loop --interval 5
+
+Items are pending while their image has no variants (see api.images);
+ones that hit a storage error are retried with backoff.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.images import generate_menu_images
+
+
+class Command(BaseCommand):
+    """
+    Django management command that generates menu image variants.
+    """
+
+    help = 'Generates thumbnail, card and full-size (JPEG/PNG + WebP) menu images'
+
+    def add_arguments(self, parser):
+        """Define command line options"""
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and process new uploads as they arrive'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds between checks when running with --loop'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Menu items processed per round'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        while True:
+            # Keep going while full batches come back
+            while True:
+                generated, failed = generate_menu_images(batch_size=options['batch_size'])
+                if generated or failed:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'✅ Generated images for {generated} menu items ({failed} failed)'
+                    ))
+                if generated + failed < options['batch_size']:
+                    break
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
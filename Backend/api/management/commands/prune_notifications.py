@@ -0,0 +1,54 @@
+"""
+Management command to delete notifications past their retention period.
+Run periodically (e.g. nightly from cron):
+    python manage.py prune_notifications
+    python manage.py prune_notifications --summarize --pause 0.05
+
+TTLs per notification type come from NOTIFICATION_RETENTION_DAYS.
+Deletes in primary-key chunks and resumes from where the last run
+stopped (see api.retention).
+"""
+
+from django.core.management.base import BaseCommand
+
+from api.retention import prune_notifications
+
+
+class Command(BaseCommand):
+    """
+    Django management command that applies the notification retention policy.
+    """
+
+    help = 'Deletes notifications older than their type\'s retention period'
+
+    def add_arguments(self, parser):
+        """Define command line options"""
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Primary-key range deleted per transaction'
+        )
+        parser.add_argument(
+            '--summarize',
+            action='store_true',
+            help='Roll deleted notifications into per-user summary counts'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Seconds to sleep between chunks (eases load on busy databases)'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        deleted = prune_notifications(
+            chunk_size=options['chunk_size'],
+            summarize=options['summarize'],
+            pause=options['pause']
+        )
+        for notification_type, count in deleted.items():
+            if count:
+                self.stdout.write(f'  {notification_type}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'✅ Deleted {sum(deleted.values())} notifications'))
@@ -0,0 +1,45 @@
+"""
+Management command to purge expired idempotency keys.
+Run periodically (e.g. hourly from cron):
+    python manage.py purge_idempotency_keys
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    """
+    Django management command that deletes expired IdempotencyKey rows
+    in small batches, using the expires_at index.
+    """
+
+    help = 'Deletes expired idempotency keys'
+
+    def add_arguments(self, parser):
+        """Define command line options"""
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per statement'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        now = timezone.now()
+        deleted = 0
+
+        while True:
+            ids = list(
+                IdempotencyKey.objects.filter(
+                    expires_at__lte=now
+                ).values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Deleted {deleted} expired idempotency keys'))
@@ -0,0 +1,27 @@
+"""
+Management command to check cached loyalty balances against the ledger.
+Run periodically (e.g. nightly from cron):
+    python manage.py reconcile_loyalty_points
+
+User.loyalty_points is maintained with F() updates next to each
+LoyaltyLedger entry (see api.loyalty); this repairs any drift.
+"""
+
+from django.core.management.base import BaseCommand
+
+from api.loyalty import reconcile_balances
+
+
+class Command(BaseCommand):
+    """
+    Django management command that recomputes loyalty balances from the ledger.
+    """
+
+    help = 'Fixes loyalty balances that differ from the ledger'
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        corrected = reconcile_balances()
+        for user_id, (cached, ledger) in corrected.items():
+            self.stdout.write(f'  user {user_id}: {cached} → {ledger}')
+        self.stdout.write(self.style.SUCCESS(f'✅ Corrected {len(corrected)} balances'))
@@ -0,0 +1,35 @@
+"""
+Management command to reconcile unread notification counters.
+Run periodically (e.g. hourly from cron):
+    python manage.py reconcile_unread_counts
+
+Counters are maintained incrementally (see api.unread); this fixes any
+drift against the Notification table.
+"""
+
+from django.core.management.base import BaseCommand
+
+from api.unread import reconcile_unread_counts
+
+
+class Command(BaseCommand):
+    """
+    Django management command that recomputes unread counters
+    from the (user, is_read) index.
+    """
+
+    help = 'Fixes unread notification counters that drifted'
+
+    def add_arguments(self, parser):
+        """Define command line options"""
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Users checked per round'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        corrected = reconcile_unread_counts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✅ Corrected {corrected} unread counters'))
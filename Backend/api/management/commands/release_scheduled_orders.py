@@ -0,0 +1,62 @@
+"""
+Management command to release scheduled orders into the barista queue.
+Run once (e.g. from cron every minute):
+    python manage.py release_scheduled_orders
+Or keep it running as a worker:
+    python manage.py release_scheduled_orders --loop --interval 15
+
+Scheduled orders are held out of the queue until their pickup time
+minus their preparation time (see Order.schedule_release).
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.scheduler import next_release_at, release_due_orders
+
+
+class Command(BaseCommand):
+    """
+    Django management command that moves due scheduled orders into the queue.
+    """
+
+    help = 'Releases scheduled orders into the barista queue when they are due'
+
+    def add_arguments(self, parser):
+        """Define command line options"""
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and release orders as they become due'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=15,
+            help='Maximum seconds between checks when running with --loop'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Orders released per transaction'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        while True:
+            released = release_due_orders(batch_size=options['batch_size'])
+            if released:
+                self.stdout.write(self.style.SUCCESS(f'✅ Released {released} scheduled orders'))
+
+            if not options['loop']:
+                break
+
+            # Sleep until the next order is due, but never longer than --interval
+            next_due = next_release_at()
+            sleep_for = options['interval']
+            if next_due is not None:
+                sleep_for = max(0, min(sleep_for, (next_due - timezone.now()).total_seconds()))
+            time.sleep(sleep_for)
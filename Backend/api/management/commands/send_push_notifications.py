@@ -0,0 +1,70 @@
+"""
+Management command to push notifications to users' devices.
+Run once (e.g. from cron every minute):
+    python manage.py send_push_notifications
+Or keep it running next to dispatch_outbox:
+    python manage.py send_push_notifications --loop --interval 1
+
+Uses the provider from the PUSH_PROVIDER setting (see api.push).
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.push import deliver_pushes, get_provider, next_push_at
+
+
+class Command(BaseCommand):
+    """
+    Django management command that sends pending device pushes.
+    """
+
+    help = 'Sends pending notifications to users\' devices'
+
+    def add_arguments(self, parser):
+        """Define command line options"""
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and push notifications as they arrive'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1,
+            help='Maximum seconds between checks when running with --loop'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Notifications claimed per round'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        provider = get_provider()
+
+        while True:
+            # Keep going while full batches come back
+            while True:
+                counts = deliver_pushes(provider, batch_size=options['batch_size'])
+                handled = sum(counts.values())
+                if handled:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"✅ Pushed {counts['sent']}, skipped {counts['skipped']}, "
+                        f"retrying {counts['retried']}, failed {counts['failed']}"
+                    ))
+                if handled < options['batch_size']:
+                    break
+
+            if not options['loop']:
+                break
+
+            sleep_for = options['interval']
+            next_due = next_push_at()
+            if next_due is not None:
+                sleep_for = max(0, min(sleep_for, (next_due - timezone.now()).total_seconds()))
+            time.sleep(sleep_for)
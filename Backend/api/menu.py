@@ -0,0 +1,72 @@
+"""
+In-process menu snapshot cache.
+The menu list is read on every home-page load but only changes when staff
+edit it, so each filter combination is rendered to JSON bytes once and
+served from memory with an ETag (clients revalidate and get a 304).
+
+Snapshots belong to a menu version that is bumped when a MenuItem is saved
+or deleted (see api.signals); bumping drops every snapshot. Other processes
+don't see those signals, so snapshots also expire after
+MENU_CACHE_TTL_SECONDS. At most MENU_CACHE_MAX_ENTRIES snapshots are kept;
+the least recently used one is evicted first.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class MenuCache:
+    """
+    Map of snapshot key → (JSON bytes, ETag) for the current menu version.
+    The key is chosen by the caller (filters, page, base URL).
+    Snapshots are kept in least recently used order.
+    """
+
+    def __init__(self, ttl_seconds=None, max_entries=None):
+        self.ttl_seconds = ttl_seconds or getattr(settings, 'MENU_CACHE_TTL_SECONDS', 30)
+        self.max_entries = max_entries or getattr(settings, 'MENU_CACHE_MAX_ENTRIES', 256)
+        self._lock = threading.Lock()
+        self._snapshots = OrderedDict()
+        self.version = 0
+
+    def bump(self):
+        """Menu changed - start a new version and drop every snapshot"""
+        with self._lock:
+            self.version += 1
+            self._snapshots = OrderedDict()
+
+    @staticmethod
+    def etag(body):
+        """Strong ETag from the rendered bytes (the same in every process)"""
+        return '"%s"' % hashlib.sha1(body).hexdigest()
+
+    def get(self, key, render):
+        """
+        Return (body, etag) for key, calling render() for the bytes on a miss.
+        A snapshot rendered while the menu changed is returned but not kept.
+        """
+        with self._lock:
+            version = self.version
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+        if snapshot is not None and time.monotonic() - snapshot[2] <= self.ttl_seconds:
+            return snapshot[0], snapshot[1]
+
+        body = render()
+        snapshot = (body, self.etag(body), time.monotonic())
+        with self._lock:
+            if self.version == version:
+                self._snapshots[key] = snapshot
+                self._snapshots.move_to_end(key)
+                if len(self._snapshots) > self.max_entries:
+                    self._snapshots.popitem(last=False)
+        return snapshot[0], snapshot[1]
+
+
+# Process-wide cache used by the menu list
+menu_cache = MenuCache()
@@ -0,0 +1,41 @@
+"""
+ASGI middleware for WebSocket connections.
+Lets the mobile app authenticate sockets with the same DRF token it
+sends in the Authorization header for HTTP requests.
+"""
+
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from rest_framework.authtoken.models import Token
+
+
+@database_sync_to_async
+def get_token_user(key):
+    """Return the user owning this token, or None if the token is invalid"""
+    try:
+        return Token.objects.select_related('user').get(key=key).user
+    except Token.DoesNotExist:
+        return None
+
+
+class TokenAuthMiddleware(BaseMiddleware):
+    """
+    Authenticate WebSocket connections with a DRF token.
+    Usage: ws://localhost:8000/ws/orders/queue/?token=<token>
+
+    Falls back to the session user set by AuthMiddlewareStack
+    when no token is given (e.g. the browsable API / admin).
+    """
+
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get('query_string', b'').decode())
+        token_key = query.get('token', [None])[0]
+
+        if token_key:
+            user = await get_token_user(token_key)
+            if user is not None:
+                scope = dict(scope, user=user)
+
+        return await super().__call__(scope, receive, send)
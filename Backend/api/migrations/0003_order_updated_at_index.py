@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_loyaltyredemption'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at', 'id'], name='api_order_updated_f7f655_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_order_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='release_at',
+            field=models.DateTimeField(blank=True, help_text='When a scheduled order is released to the barista queue (cleared once released)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['release_at'], name='api_order_release_8500d0_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_order_release_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Idempotency-Key header value', max_length=100)),
+                ('fingerprint', models.CharField(help_text='Hash of the original request', max_length=64)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, help_text='HTTP status of the original response', null=True)),
+                ('response_body', models.JSONField(blank=True, help_text='Body of the original response', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(help_text='When this key expires and may be purged')),
+                ('user', models.ForeignKey(help_text='User who sent the request', on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='api_idempot_expires_a5fac6_idx')],
+                'unique_together': {('user', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Id of the original order', primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('RECEIVED', 'Received'), ('PREPARING', 'Preparing'), ('READY', 'Ready'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled')], help_text='Final status of the order', max_length=20)),
+                ('total_price', models.DecimalField(decimal_places=2, help_text='Total order cost including all items', max_digits=8)),
+                ('notes', models.TextField(blank=True)),
+                ('scheduled_for', models.DateTimeField(blank=True, null=True)),
+                ('is_favourite', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(help_text='When order was placed')),
+                ('updated_at', models.DateTimeField(help_text='Last status update time')),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True, help_text='When order was moved to the archive')),
+                ('customer', models.ForeignKey(help_text='Customer who placed this order', on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('ORDER_RECEIVED', 'Order Received'), ('ORDER_PREPARING', 'Order Preparing'), ('ORDER_READY', 'Order Ready'), ('ORDER_COMPLETED', 'Order Completed'), ('ORDER_CANCELLED', 'Order Cancelled'), ('PROMOTION', 'Promotional')], max_length=30)),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('is_read', models.BooleanField(default=False)),
+                ('sent_at', models.DateTimeField(help_text='When notification was sent')),
+                ('user', models.ForeignKey(help_text='User who received notification', on_delete=django.db.models.deletion.CASCADE, related_name='archived_notifications', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(help_text='Archived order the notification was about', on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='api.archivedorder')),
+            ],
+            options={
+                'ordering': ['-sent_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=1)),
+                ('price', models.DecimalField(decimal_places=2, help_text='Price at time of order', max_digits=6)),
+                ('customizations', models.TextField(blank=True)),
+                ('menu_item', models.ForeignKey(help_text='Menu item that was ordered', on_delete=django.db.models.deletion.CASCADE, to='api.menuitem')),
+                ('order', models.ForeignKey(help_text='Archived order this item belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='items', to='api.archivedorder')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['customer', '-created_at'], name='api_archive_custome_ce1d61_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivednotification',
+            index=models.Index(fields=['user', '-sent_at'], name='api_archive_user_id_057bfa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorderitem',
+            index=models.Index(fields=['order'], name='api_archive_order_i_cf70f9_idx'),
+        ),
+    ]
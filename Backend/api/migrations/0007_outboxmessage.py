@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_order_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('ORDER_RECEIVED', 'Order Received'), ('ORDER_PREPARING', 'Order Preparing'), ('ORDER_READY', 'Order Ready'), ('ORDER_COMPLETED', 'Order Completed'), ('ORDER_CANCELLED', 'Order Cancelled'), ('PROMOTION', 'Promotional')], max_length=30)),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(blank=True, default=django.utils.timezone.now, help_text='When the next delivery attempt is due (null = gave up)', null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('order', models.ForeignKey(blank=True, help_text='Related order if applicable', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outbox_messages', to='api.order')),
+                ('user', models.ForeignKey(help_text='User to notify', on_delete=django.db.models.deletion.CASCADE, related_name='outbox_messages', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['next_attempt_at', 'id'], name='api_outboxm_next_at_1d7a59_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def skip_existing_notifications(apps, schema_editor):
+    """Don't push notifications that were sent before push delivery existed"""
+    Notification = apps.get_model('api', 'Notification')
+    Notification.objects.update(push_state='SKIPPED')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='push_attempts',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Failed push attempts so far'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='push_next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='When the push worker may (re)try this notification'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='push_state',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('SENT', 'Sent'), ('SKIPPED', 'Skipped'), ('FAILED', 'Failed')], default='PENDING', help_text='Device push delivery state', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['push_state', 'push_next_attempt_at'], name='api_notific_push_st_138105_idx'),
+        ),
+        migrations.RunPython(skip_existing_notifications, migrations.RunPython.noop),
+    ]
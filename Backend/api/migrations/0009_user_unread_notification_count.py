@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:07
+
+from django.db import migrations, models
+
+
+def count_unread_notifications(apps, schema_editor):
+    """Initialise the counters from existing notifications"""
+    Notification = apps.get_model('api', 'Notification')
+    User = apps.get_model('api', 'User')
+    rows = Notification.objects.filter(is_read=False).values('user').annotate(unread=models.Count('id'))
+    for row in rows:
+        User.objects.filter(pk=row['user']).update(unread_notification_count=row['unread'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_notification_push_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notification_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of unread notifications (kept in step by api.unread)'),
+        ),
+        migrations.RunPython(count_unread_notifications, migrations.RunPython.noop),
+    ]
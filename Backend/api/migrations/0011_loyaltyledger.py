@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_opening_balances(apps, schema_editor):
+    """Existing balances become ADJUST entries so the ledger sums match"""
+    User = apps.get_model('api', 'User')
+    LoyaltyLedger = apps.get_model('api', 'LoyaltyLedger')
+    LoyaltyLedger.objects.bulk_create([
+        LoyaltyLedger(user_id=user_id, kind='ADJUST', points=points, note='Opening balance')
+        for user_id, points in User.objects.exclude(loyalty_points=0).values_list('pk', 'loyalty_points')
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_notification_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoyaltyLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('EARN', 'Earned'), ('REDEEM', 'Redeemed'), ('ADJUST', 'Adjusted')], help_text='Type of change', max_length=10)),
+                ('points', models.IntegerField(help_text='Signed points change')),
+                ('note', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(blank=True, db_constraint=False, help_text='Order that earned the points', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.order')),
+                ('redemption', models.ForeignKey(blank=True, help_text='Redemption that spent the points', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='api.loyaltyredemption')),
+                ('user', models.ForeignKey(help_text='User whose points changed', on_delete=django.db.models.deletion.CASCADE, related_name='loyalty_ledger', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='api_loyalty_user_id_286159_idx')],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:15
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_codesequence'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='loyaltyredemption',
+            name='api_loyalty_redempt_647750_idx',
+        ),
+    ]
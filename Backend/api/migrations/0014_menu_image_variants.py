@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_drop_redemption_code_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Resized image files per size (generated automatically)'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='image_variants_source',
+            field=models.CharField(blank=True, default='', help_text='Image file the variants were generated from', max_length=255),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_menu_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, help_text='When an unfinished claim may be taken over by a retry', null=True),
+        ),
+    ]
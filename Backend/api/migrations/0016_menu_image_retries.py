@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_idempotency_key_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='image_variants_attempts',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Failed attempts at generating the image variants'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='image_variants_retry_at',
+            field=models.DateTimeField(blank=True, help_text='When a failed variant generation is tried again', null=True),
+        ),
+    ]
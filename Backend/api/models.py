@@ -3,8 +3,11 @@ Database models for the coffee shop application.
 Defines all database tables and their relationships using Django ORM.
 """
 
-from django.db import models
+from datetime import timedelta
+
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
@@ -24,6 +27,7 @@ class User(AbstractUser):
     - loyalty_points: Accumulated points from purchases
     - push_token: Device token for push notifications
     - notification_enabled: Whether user wants notifications
+    - unread_notification_count: Unread notification badge
     """
     
     # User role choices - determines what features user can access
@@ -69,6 +73,12 @@ class User(AbstractUser):
         help_text="Whether user wants to receive push notifications"
     )
     
+    # Unread notification badge, maintained incrementally (see api.unread)
+    unread_notification_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of unread notifications (kept in step by api.unread)"
+    )
+    
     class Meta:
         # Add database indexes for frequently queried fields
         indexes = [
@@ -76,9 +86,26 @@ class User(AbstractUser):
             models.Index(fields=['email']),
         ]
     
+    # Denormalized counters - only ever moved with F() expressions
+    # (api.loyalty, api.unread), never written from a loaded instance
+    COUNTER_FIELDS = ('loyalty_points', 'unread_notification_count')
+    
     def __str__(self):
         """String representation of user"""
         return f"{self.username} ({self.role})"
+    
+    def save(self, *args, **kwargs):
+        """
+        Saving an existing user leaves the counter columns alone.
+        A full-row save would write back the values read when this instance
+        was loaded, losing points or unread notifications added meanwhile.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
 
 # ============================================================================
@@ -94,6 +121,7 @@ class MenuItem(models.Model):
     - title: Display name
     - description: Product details
     - image: Product photo
+    - image_variants: Resized/WebP copies of the photo (see api.images)
     - item_type: COFFEE or DESSERT
     - price: Cost in dollars
     - is_available: Whether currently in stock
@@ -124,6 +152,35 @@ class MenuItem(models.Model):
         help_text="Product image displayed in app"
     )
     
+    # Resized copies of the image (built by the generate_menu_images worker)
+    # {"thumb": {"width": 160, "jpeg": "menu_items/variants/...", "webp": "..."}, ...}
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Resized image files per size (generated automatically)"
+    )
+    
+    # Image the variants were built from - differs from image while they are pending
+    image_variants_source = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        help_text="Image file the variants were generated from"
+    )
+    
+    # Failed attempts at building the variants of the current image
+    # (temporary storage errors are retried with backoff, see api.images)
+    image_variants_attempts = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Failed attempts at generating the image variants"
+    )
+    
+    image_variants_retry_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When a failed variant generation is tried again"
+    )
+    
     # Category: coffee or dessert
     item_type = models.CharField(
         max_length=20,
@@ -174,6 +231,13 @@ class MenuItem(models.Model):
     def __str__(self):
         """String representation of menu item"""
         return f"{self.title} ({self.item_type})"
+    
+    def save(self, *args, **kwargs):
+        """A newly uploaded photo starts without failed variant attempts"""
+        if self.image and not self.image._committed:
+            self.image_variants_attempts = 0
+            self.image_variants_retry_at = None
+        super().save(*args, **kwargs)
 
 
 # ============================================================================
@@ -186,6 +250,7 @@ class Order(models.Model):
     Tracks order status and manages the order lifecycle.
     
     Status workflow: RECEIVED → PREPARING → READY → COMPLETED
+    (RECEIVED → CANCELLED is the only way to cancel, see TRANSITIONS)
     
     Fields:
     - customer: Who placed the order
@@ -204,6 +269,21 @@ class Order(models.Model):
         COMPLETED = 'COMPLETED', 'Completed'     # Customer picked up
         CANCELLED = 'CANCELLED', 'Cancelled'     # Order was cancelled
     
+    # Legal status transitions (cancel only before preparation starts)
+    TRANSITIONS = {
+        OrderStatus.RECEIVED: [OrderStatus.PREPARING, OrderStatus.CANCELLED],
+        OrderStatus.PREPARING: [OrderStatus.READY],
+        OrderStatus.READY: [OrderStatus.COMPLETED],
+        OrderStatus.COMPLETED: [],
+        OrderStatus.CANCELLED: [],
+    }
+    
+    class InvalidTransition(Exception):
+        """Requested status change is not in TRANSITIONS"""
+    
+    class TransitionConflict(Exception):
+        """Order status changed underneath the caller (e.g. another barista)"""
+    
     # Foreign key to customer who placed the order
     customer = models.ForeignKey(
         User,
@@ -241,6 +321,13 @@ class Order(models.Model):
         help_text="Future time when order should be prepared"
     )
     
+    # When a scheduled order enters the barista queue (null = already in queue)
+    release_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When a scheduled order is released to the barista queue (cleared once released)"
+    )
+    
     # Whether customer saved this as favorite template
     is_favourite = models.BooleanField(
         default=False,
@@ -272,6 +359,10 @@ class Order(models.Model):
             models.Index(fields=['customer', '-created_at']),
             models.Index(fields=['status', 'created_at']),
             models.Index(fields=['scheduled_for']),
+            # Serves the scheduled-order release job
+            models.Index(fields=['release_at']),
+            # Serves incremental queue refreshes (GET /api/orders/queue/?since=)
+            models.Index(fields=['updated_at', 'id']),
         ]
     
     def __str__(self):
@@ -291,6 +382,103 @@ class Order(models.Model):
         Rule: 1 point per dollar spent
         """
         return int(self.total_price)
+    
+    def preparation_minutes(self):
+        """Total preparation time of all items (minutes)"""
+        # Reuse prefetched items (e.g. from place_order) instead of querying again
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            items = self.items.all()
+        else:
+            items = self.items.select_related('menu_item')
+        return sum(item.menu_item.preparation_time * item.quantity for item in items)
+    
+    def schedule_release(self, minutes=None):
+        """
+        Hold a scheduled order out of the barista queue until it is time
+        to start making it: scheduled_for minus its preparation time.
+        Orders that are due now (or not scheduled) go straight to the queue.
+        Call after the order items exist (or pass their preparation minutes).
+        """
+        release_at = None
+        if self.scheduled_for:
+            if minutes is None:
+                minutes = self.preparation_minutes()
+            release_at = self.scheduled_for - timedelta(minutes=minutes)
+            if release_at <= timezone.now():
+                release_at = None
+        
+        if release_at != self.release_at:
+            self.release_at = release_at
+            self.save(update_fields=['release_at'])
+    
+    def is_held(self, now=None):
+        """Whether this scheduled order is still waiting to be released"""
+        return self.release_at is not None and self.release_at > (now or timezone.now())
+    
+    @classmethod
+    def can_transition(cls, from_status, to_status):
+        """Check the transition table"""
+        return to_status in cls.TRANSITIONS.get(from_status, [])
+    
+    @staticmethod
+    def _transition_fields(new_status, now):
+        """Columns written by a status transition"""
+        fields = {'status': new_status, 'updated_at': now}
+        if new_status == Order.OrderStatus.COMPLETED:
+            fields['completed_at'] = now
+        return fields
+    
+    def transition_to(self, new_status, expected_status=None):
+        """
+        Move this order to a new status.
+        Runs a single conditional UPDATE ... WHERE id = ? AND status = ?
+        so there are no row locks and no full-row writes.
+        
+        expected_status: status the caller last saw (defaults to self.status)
+        
+        Raises:
+        - Order.InvalidTransition: change not allowed by TRANSITIONS
+        - Order.TransitionConflict: status changed underneath the caller
+        """
+        from_status = expected_status or self.status
+        if not self.can_transition(from_status, new_status):
+            raise Order.InvalidTransition(
+                f'Cannot change order from {from_status} to {new_status}'
+            )
+        
+        fields = self._transition_fields(new_status, timezone.now())
+        updated = Order.objects.filter(pk=self.pk, status=from_status).update(**fields)
+        if not updated:
+            raise Order.TransitionConflict(
+                f'Order is no longer {from_status}'
+            )
+        
+        for attr, value in fields.items():
+            setattr(self, attr, value)
+    
+    @classmethod
+    def transition_many(cls, changes):
+        """
+        Apply several (order, new_status) transitions.
+        Each order gets its own conditional UPDATE ... WHERE id = ? AND status = ?
+        (all in one transaction), so whether it applied comes from the UPDATE
+        itself rather than from reading the rows back.
+        Callers must check can_transition first.
+        
+        Returns the orders that were changed; the rest changed underneath the caller.
+        """
+        now = timezone.now()
+        applied = []
+        
+        with transaction.atomic():
+            for order, new_status in changes:
+                fields = cls._transition_fields(new_status, now)
+                if cls.objects.filter(pk=order.pk, status=order.status).update(**fields):
+                    for attr, value in fields.items():
+                        setattr(order, attr, value)
+                    applied.append(order)
+        
+        return applied
 
 
 # ============================================================================
@@ -499,6 +687,8 @@ class Notification(models.Model):
     - order: Related order (optional)
     - is_read: Whether user has seen it
     - sent_at: When it was sent
+    - push_state / push_attempts / push_next_attempt_at: Device push
+      delivery (see api.push)
     """
     
     # Notification types
@@ -510,6 +700,13 @@ class Notification(models.Model):
         ORDER_CANCELLED = 'ORDER_CANCELLED', 'Order Cancelled'
         PROMOTION = 'PROMOTION', 'Promotional'
     
+    # Device push delivery states
+    class PushState(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'    # Waiting for the push worker
+        SENT = 'SENT', 'Sent'             # Accepted by the push provider
+        SKIPPED = 'SKIPPED', 'Skipped'    # Notifications disabled or no device token
+        FAILED = 'FAILED', 'Failed'       # Gave up (dead token or too many attempts)
+    
     # Recipient of notification
     user = models.ForeignKey(
         User,
@@ -558,11 +755,31 @@ class Notification(models.Model):
         help_text="When notification was sent"
     )
     
+    # Device push delivery (handled by the send_push_notifications worker)
+    push_state = models.CharField(
+        max_length=10,
+        choices=PushState.choices,
+        default=PushState.PENDING,
+        help_text="Device push delivery state"
+    )
+    
+    push_attempts = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Failed push attempts so far"
+    )
+    
+    push_next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="When the push worker may (re)try this notification"
+    )
+    
     class Meta:
         ordering = ['-sent_at']
         indexes = [
             models.Index(fields=['user', '-sent_at']),
             models.Index(fields=['user', 'is_read']),
+            # Serves the push worker's "due pushes" scan
+            models.Index(fields=['push_state', 'push_next_attempt_at']),
         ]
     
     def __str__(self):
@@ -571,6 +788,108 @@ class Notification(models.Model):
     
 
 
+# ============================================================================
+# NOTIFICATION OUTBOX MODEL
+# ============================================================================
+
+class OutboxMessage(models.Model):
+    """
+    Notification waiting to be delivered.
+    Written in the same transaction as the change it reports (status
+    change, redemption), so a notification exists if and only if the
+    change was committed. The dispatch_outbox worker turns pending rows
+    into Notification rows in batches, pushes them to WebSocket clients
+    and deletes them. Failed rows are retried with backoff.
+    
+    Fields:
+    - user / notification_type / title / message / order: the notification
+    - attempts: Failed delivery attempts so far
+    - next_attempt_at: When the worker may try again (null = gave up)
+    - last_error: Error from the last failed attempt
+    """
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='outbox_messages',
+        help_text="User to notify"
+    )
+    
+    notification_type = models.CharField(
+        max_length=30,
+        choices=Notification.NotificationType.choices
+    )
+    
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='outbox_messages',
+        help_text="Related order if applicable"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    # Retry bookkeeping
+    attempts = models.PositiveIntegerField(default=0)
+    
+    next_attempt_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        default=timezone.now,
+        help_text="When the next delivery attempt is due (null = gave up)"
+    )
+    
+    last_error = models.TextField(blank=True)
+    
+    class Meta:
+        indexes = [
+            # Serves the dispatcher's "due messages" scan
+            models.Index(fields=['next_attempt_at', 'id']),
+        ]
+    
+    def __str__(self):
+        """String representation of outbox message"""
+        return f"{self.notification_type} to {self.user_id} (attempts: {self.attempts})"
+    
+    def to_notification(self):
+        """The Notification this message delivers"""
+        return Notification(
+            user_id=self.user_id,
+            notification_type=self.notification_type,
+            title=self.title,
+            message=self.message,
+            order_id=self.order_id
+        )
+
+
+# ============================================================================
+# CODE SEQUENCE MODEL
+# ============================================================================
+
+class CodeSequence(models.Model):
+    """
+    Named counter handing out blocks of sequence numbers.
+    Processes reserve a block with one F() increment and use it from
+    memory (see api.codes), so allocating a number is usually free.
+    
+    Fields:
+    - name: Sequence name
+    - value: Highest number reserved so far
+    """
+    
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        """String representation of sequence"""
+        return f"{self.name} = {self.value}"
+
+
 # ============================================================================
 # LOYALTY REDEMPTION MODEL
 # ============================================================================
@@ -644,7 +963,7 @@ class LoyaltyRedemption(models.Model):
         ordering = ['-redeemed_at']
         indexes = [
             models.Index(fields=['customer', '-redeemed_at']),
-            models.Index(fields=['redemption_code']),
+            # redemption_code lookups use its unique index
             models.Index(fields=['is_used']),
         ]
     
@@ -653,19 +972,416 @@ class LoyaltyRedemption(models.Model):
         return f"{self.customer.username} - {self.loyalty_offer.title} ({self.redemption_code})"
     
     def generate_code(self):
-        """Generate unique redemption code"""
-        import random
-        import string
-        
-        # Generate 8-character alphanumeric code
-        while True:
-            code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-            # Check if code is unique
-            if not LoyaltyRedemption.objects.filter(redemption_code=code).exists():
-                return code
+        """
+        Allocate a unique 8-character redemption code.
+        Codes come from a keyed permutation of a sequence (see api.codes),
+        so no lookup is needed to avoid collisions.
+        """
+        from .codes import redemption_codes
+        return redemption_codes.allocate()
     
     def save(self, *args, **kwargs):
         """Override save to generate redemption code"""
-        if not self.redemption_code:
+        if self.redemption_code:
+            return super().save(*args, **kwargs)
+        
+        from .codes import redemption_codes
+        
+        # The unique index is only a safety net (codes issued before the
+        # allocator existed)
+        for _ in range(5):
             self.redemption_code = self.generate_code()
-        super().save(*args, **kwargs)
\ No newline at end of file
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if not LoyaltyRedemption.objects.filter(redemption_code=self.redemption_code).exists():
+                    raise
+                redemption_codes.discard_block()
+        raise IntegrityError('Could not allocate a unique redemption code')
+
+# ============================================================================
+# IDEMPOTENCY KEY MODEL
+# ============================================================================
+
+class IdempotencyKey(models.Model):
+    """
+    Stored responses for requests sent with an Idempotency-Key header.
+    Lets mobile clients safely retry order placement on flaky Wi-Fi:
+    a retry with the same key gets the original response back instead
+    of creating another order.
+    
+    Fields:
+    - user: Who sent the request (keys are scoped per user)
+    - key: Client-generated Idempotency-Key header value
+    - fingerprint: Hash of method, path and body (detects key reuse)
+    - status_code / response_body: Original response (null while in progress)
+    - locked_until: Lease of the request working on it (a retry may take over after)
+    - expires_at: When the key may be purged
+    """
+    
+    # User who sent the request
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+        help_text="User who sent the request"
+    )
+    
+    # Client-generated key from the Idempotency-Key header
+    key = models.CharField(
+        max_length=100,
+        help_text="Idempotency-Key header value"
+    )
+    
+    # SHA-256 of method, path and body
+    fingerprint = models.CharField(
+        max_length=64,
+        help_text="Hash of the original request"
+    )
+    
+    # Original response (empty until the first request finishes)
+    status_code = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        help_text="HTTP status of the original response"
+    )
+    
+    response_body = models.JSONField(
+        blank=True,
+        null=True,
+        help_text="Body of the original response"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    # Lease of the in-progress request - if it dies, a retry takes over after this
+    locked_until = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When an unfinished claim may be taken over by a retry"
+    )
+    
+    # TTL - expired keys are purged by the purge_idempotency_keys command
+    expires_at = models.DateTimeField(
+        help_text="When this key expires and may be purged"
+    )
+    
+    class Meta:
+        # One stored response per key per user
+        unique_together = ['user', 'key']
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+    
+    def __str__(self):
+        """String representation of idempotency key"""
+        return f"{self.key} ({self.user_id})"
+    
+    def is_complete(self):
+        """Whether the original request has finished"""
+        return self.status_code is not None
+
+
+# ============================================================================
+# ORDER ARCHIVE MODELS
+# ============================================================================
+
+class ArchivedOrder(models.Model):
+    """
+    Cold storage for finished orders.
+    COMPLETED and CANCELLED orders are moved here by the archive_orders
+    command once they are older than ORDER_ARCHIVE_AFTER_DAYS, so the hot
+    Order table only holds recent orders.
+    
+    Keeps the original order id, so ids stay stable for customers.
+    
+    Fields: same as Order (without queue fields), plus:
+    - archived_at: When the order was moved to the archive
+    """
+    
+    # Original Order id
+    id = models.BigIntegerField(
+        primary_key=True,
+        help_text="Id of the original order"
+    )
+    
+    customer = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_orders',
+        help_text="Customer who placed this order"
+    )
+    
+    status = models.CharField(
+        max_length=20,
+        choices=Order.OrderStatus.choices,
+        help_text="Final status of the order"
+    )
+    
+    total_price = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        help_text="Total order cost including all items"
+    )
+    
+    notes = models.TextField(blank=True)
+    scheduled_for = models.DateTimeField(blank=True, null=True)
+    is_favourite = models.BooleanField(default=False)
+    created_at = models.DateTimeField(help_text="When order was placed")
+    updated_at = models.DateTimeField(help_text="Last status update time")
+    completed_at = models.DateTimeField(blank=True, null=True)
+    
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="When order was moved to the archive"
+    )
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Serves customer order history
+            models.Index(fields=['customer', '-created_at']),
+        ]
+    
+    def __str__(self):
+        """String representation of archived order"""
+        return f"Archived order #{self.id} ({self.status})"
+    
+    def can_be_modified(self):
+        """Archived orders are finished and read-only"""
+        return False
+
+
+class ArchivedOrderItem(models.Model):
+    """
+    Items of an archived order.
+    
+    Fields: same as OrderItem
+    """
+    
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        related_name='items',
+        help_text="Archived order this item belongs to"
+    )
+    
+    menu_item = models.ForeignKey(
+        MenuItem,
+        on_delete=models.CASCADE,
+        help_text="Menu item that was ordered"
+    )
+    
+    quantity = models.IntegerField(default=1)
+    
+    price = models.DecimalField(
+        max_digits=6,
+        decimal_places=2,
+        help_text="Price at time of order"
+    )
+    
+    customizations = models.TextField(blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['order']),
+        ]
+    
+    def __str__(self):
+        """String representation of archived order item"""
+        return f"{self.quantity}x {self.menu_item.title}"
+    
+    def get_total_price(self):
+        """Calculate total price for this line item (price × quantity)"""
+        return self.price * self.quantity
+
+
+class ArchivedNotification(models.Model):
+    """
+    Notifications of archived orders.
+    
+    Fields: same as Notification, with order pointing at the archived order
+    """
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_notifications',
+        help_text="User who received notification"
+    )
+    
+    notification_type = models.CharField(
+        max_length=30,
+        choices=Notification.NotificationType.choices
+    )
+    
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        help_text="Archived order the notification was about"
+    )
+    
+    is_read = models.BooleanField(default=False)
+    sent_at = models.DateTimeField(help_text="When notification was sent")
+    
+    class Meta:
+        ordering = ['-sent_at']
+        indexes = [
+            models.Index(fields=['user', '-sent_at']),
+        ]
+    
+    def __str__(self):
+        """String representation of archived notification"""
+        return f"{self.notification_type} to {self.user_id} (archived)"
+
+
+# ============================================================================
+# BACKGROUND JOB CHECKPOINT MODEL
+# ============================================================================
+
+class JobCheckpoint(models.Model):
+    """
+    Where a resumable background job got to.
+    Lets long-running jobs (e.g. notification retention) pick up where
+    they stopped instead of rescanning from the start.
+    
+    Fields:
+    - name: Job (and sub-task) name
+    - position: Last position reached (e.g. a primary key)
+    - updated_at: When the job last moved forward
+    """
+    
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="Job name"
+    )
+    
+    position = models.BigIntegerField(
+        default=0,
+        help_text="Last position reached by the job"
+    )
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        """String representation of checkpoint"""
+        return f"{self.name} @ {self.position}"
+
+
+# ============================================================================
+# NOTIFICATION SUMMARY MODEL
+# ============================================================================
+
+class NotificationSummary(models.Model):
+    """
+    Per-user counts of notifications removed by the retention job.
+    Keeps a compact record of old notifications after the rows are gone.
+    
+    Fields:
+    - user / notification_type: What was summarised
+    - count: How many notifications were removed
+    - first_sent_at / last_sent_at: Time span they covered
+    """
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notification_summaries'
+    )
+    
+    notification_type = models.CharField(
+        max_length=30,
+        choices=Notification.NotificationType.choices
+    )
+    
+    count = models.PositiveIntegerField(default=0)
+    first_sent_at = models.DateTimeField()
+    last_sent_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ['user', 'notification_type']
+    
+    def __str__(self):
+        """String representation of summary"""
+        return f"{self.count}x {self.notification_type} for {self.user_id}"
+
+
+# ============================================================================
+# LOYALTY LEDGER MODEL
+# ============================================================================
+
+class LoyaltyLedger(models.Model):
+    """
+    Append-only record of every loyalty points change.
+    User.loyalty_points is a cached balance: the sum of the user's entries.
+    Both are written in the same transaction (see api.loyalty).
+    
+    Fields:
+    - user: Whose points changed
+    - kind: EARN, REDEEM or ADJUST
+    - points: Signed change (negative for redemptions)
+    - order: Order that earned the points (EARN)
+    - redemption: Redemption that spent them (REDEEM)
+    - note: Reason for manual adjustments
+    - created_at: When the change happened
+    """
+    
+    class Kind(models.TextChoices):
+        EARN = 'EARN', 'Earned'          # Points from an order
+        REDEEM = 'REDEEM', 'Redeemed'    # Points spent on an offer
+        ADJUST = 'ADJUST', 'Adjusted'    # Manual correction / opening balance
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='loyalty_ledger',
+        help_text="User whose points changed"
+    )
+    
+    kind = models.CharField(
+        max_length=10,
+        choices=Kind.choices,
+        help_text="Type of change"
+    )
+    
+    points = models.IntegerField(help_text="Signed points change")
+    
+    # No DB constraint: the entry keeps the order id after the order is archived
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        blank=True,
+        null=True,
+        related_name='+',
+        help_text="Order that earned the points"
+    )
+    
+    redemption = models.ForeignKey(
+        LoyaltyRedemption,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='ledger_entries',
+        help_text="Redemption that spent the points"
+    )
+    
+    note = models.CharField(max_length=200, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+    
+    def __str__(self):
+        """String representation of ledger entry"""
+        return f"{self.kind} {self.points:+d} for {self.user_id}"
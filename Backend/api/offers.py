@@ -0,0 +1,113 @@
+"""
+In-process cache of the currently valid loyalty offers.
+The offer list changes a few times a month but is read on every app
+launch, so it is rendered once and served from memory.
+
+The cached list stays correct until the next validity boundary - the
+earliest future valid_from or current valid_until - and is rebuilt with
+a single query after that. Saving or deleting a LoyaltyOffer clears it
+immediately in the same process (see api.signals); other processes pick
+the change up after OFFER_CACHE_TTL_SECONDS.
+
+Each offer also carries an "affordable" flag for the requesting user.
+Offers are ordered by points_required, so the flags only depend on how
+many offers a balance covers; one list is rendered per distinct count and
+shared by every user with a balance in that range.
+"""
+
+import bisect
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import LoyaltyOffer
+
+
+class OfferCache:
+    """
+    Currently valid offers, serialized, plus per-balance affordable flags.
+    Returned lists are shared between requests and must not be modified.
+    """
+
+    def __init__(self, ttl_seconds=None):
+        self.ttl_seconds = ttl_seconds or getattr(settings, 'OFFER_CACHE_TTL_SECONDS', 60)
+        self._lock = threading.Lock()
+        self._state = None
+
+    def invalidate(self):
+        """Drop the cache; the next read reloads it"""
+        with self._lock:
+            self._state = None
+
+    def _load(self, now):
+        """
+        One query for active offers that are valid now or later.
+        Returns the cache state: rendered offers, their thresholds and expiry.
+        """
+        from .serializers import LoyaltyOfferSerializer
+
+        offers = LoyaltyOffer.objects.filter(is_active=True).filter(
+            Q(valid_until__isnull=True) | Q(valid_until__gte=now)
+        ).order_by('points_required', 'id')
+
+        current, boundaries = [], []
+        for offer in offers:
+            if offer.valid_from > now:
+                # Not started yet - the list changes when it does
+                boundaries.append(offer.valid_from)
+                continue
+            current.append(offer)
+            if offer.valid_until:
+                # Still valid at valid_until itself
+                boundaries.append(offer.valid_until + timedelta(microseconds=1))
+
+        rendered = LoyaltyOfferSerializer(current, many=True, context={'now': now}).data
+        return {
+            'offers': [dict(offer) for offer in rendered],
+            'thresholds': [offer.points_required for offer in current],
+            'expires_at': min(boundaries, default=None),
+            'loaded_at': time.monotonic(),
+            'by_count': {},
+        }
+
+    def _current(self, now):
+        """Return the cache state, reloading it if invalidated, expired or past a boundary"""
+        with self._lock:
+            state = self._state
+        if state is None or (
+            time.monotonic() - state['loaded_at'] > self.ttl_seconds or
+            (state['expires_at'] is not None and now >= state['expires_at'])
+        ):
+            state = self._load(now)
+            with self._lock:
+                self._state = state
+        return state
+
+    def offers(self, points=None, now=None):
+        """
+        Currently valid offers as serialized dicts, cheapest first.
+        With points, each offer has an "affordable" flag for that balance.
+        """
+        state = self._current(now or timezone.now())
+        if points is None:
+            return state['offers']
+
+        # Number of offers this balance covers (thresholds are sorted)
+        count = bisect.bisect_right(state['thresholds'], points)
+        rendered = state['by_count'].get(count)
+        if rendered is None:
+            rendered = [
+                dict(offer, affordable=index < count)
+                for index, offer in enumerate(state['offers'])
+            ]
+            # Racing requests build the same list - last write wins
+            state['by_count'][count] = rendered
+        return rendered
+
+
+# Process-wide cache used by the offer list
+offer_cache = OfferCache()
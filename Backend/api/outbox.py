@@ -0,0 +1,189 @@
+"""
+Transactional notification outbox.
+Request handlers only insert OutboxMessage rows, in the same transaction
+as the change they report. The dispatch_outbox worker drains them in
+batches: one bulk_create for the notifications, then WebSocket fan-out.
+Notification work never adds to request latency, and a notification is
+never lost (or sent for a change that was rolled back).
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .events import publish_notification
+from .models import Notification, Order, OutboxMessage
+from .unread import notifications_created
+
+logger = logging.getLogger(__name__)
+
+# Status → notification (type, title, message)
+STATUS_MESSAGES = {
+    Order.OrderStatus.RECEIVED: (
+        Notification.NotificationType.ORDER_RECEIVED,
+        "Order Received",
+        "Your order has been received and will be prepared soon."
+    ),
+    Order.OrderStatus.PREPARING: (
+        Notification.NotificationType.ORDER_PREPARING,
+        "Order is Being Prepared",
+        "Your order is now being prepared by our barista."
+    ),
+    Order.OrderStatus.READY: (
+        Notification.NotificationType.ORDER_READY,
+        "Order Ready for Pickup!",
+        "Your order is ready! Please come pick it up."
+    ),
+    Order.OrderStatus.COMPLETED: (
+        Notification.NotificationType.ORDER_COMPLETED,
+        "Order Completed",
+        "Thank you for your order! Enjoy your coffee and dessert."
+    ),
+    Order.OrderStatus.CANCELLED: (
+        Notification.NotificationType.ORDER_CANCELLED,
+        "Order Cancelled",
+        "Your order has been cancelled."
+    ),
+}
+
+
+# ============================================================================
+# ENQUEUEING (called inside the request's transaction)
+# ============================================================================
+
+def build_status_message(order):
+    """
+    Build (but don't save) the outbox message for an order's current status.
+    Returns None if the status has no notification.
+    """
+    if order.status not in STATUS_MESSAGES:
+        return None
+
+    notification_type, title, message = STATUS_MESSAGES[order.status]
+    return OutboxMessage(
+        user_id=order.customer_id,
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        order_id=order.pk
+    )
+
+
+def enqueue_status_notifications(orders):
+    """Queue status notifications for orders whose status just changed (one INSERT)"""
+    messages = [
+        message
+        for message in map(build_status_message, orders)
+        if message is not None
+    ]
+    OutboxMessage.objects.bulk_create(messages)
+    return messages
+
+
+def enqueue_notification(user, notification_type, title, message, order=None):
+    """Queue a single notification"""
+    return OutboxMessage.objects.create(
+        user=user,
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        order=order
+    )
+
+
+# ============================================================================
+# DISPATCHING (background worker)
+# ============================================================================
+
+def _retry_delay(attempts):
+    """Exponential backoff: 2, 4, 8 ... seconds, capped at 10 minutes"""
+    return timedelta(seconds=min(2 ** attempts, 600))
+
+
+def _deliver(messages):
+    """Create the notifications for a batch of messages and remove them from the outbox"""
+    notifications = Notification.objects.bulk_create(
+        [message.to_notification() for message in messages]
+    )
+    OutboxMessage.objects.filter(pk__in=[message.pk for message in messages]).delete()
+    notifications_created(notifications)
+    for notification in notifications:
+        publish_notification(notification)
+    return notifications
+
+
+def _record_failure(message, error, now):
+    """Schedule a retry, or give up after OUTBOX_MAX_ATTEMPTS"""
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 10)
+    attempts = message.attempts + 1
+    OutboxMessage.objects.filter(pk=message.pk).update(
+        attempts=attempts,
+        next_attempt_at=now + _retry_delay(attempts) if attempts < max_attempts else None,
+        last_error=str(error)[:1000]
+    )
+
+
+def dispatch_batch(batch_size=200, now=None):
+    """
+    Deliver one batch of due outbox messages.
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED so several
+    workers can run side by side. If the batch insert fails, messages
+    are retried one by one so one bad message can't hold up the rest.
+
+    Returns (delivered, failed).
+    """
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.filter(
+                next_attempt_at__lte=now
+            ).select_for_update(skip_locked=True).order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if not messages:
+            return 0, 0
+
+        try:
+            with transaction.atomic():
+                return len(_deliver(messages)), 0
+        except Exception:
+            logger.exception(
+                'Outbox batch of %d messages failed, retrying one by one', len(messages)
+            )
+
+        delivered = failed = 0
+        for message in messages:
+            try:
+                with transaction.atomic():
+                    _deliver([message])
+                delivered += 1
+            except Exception as error:
+                _record_failure(message, error, now)
+                failed += 1
+
+    return delivered, failed
+
+
+def dispatch_outbox(batch_size=200):
+    """
+    Drain every message that is currently due.
+    Returns (delivered, failed).
+    """
+    delivered = failed = 0
+    while True:
+        batch_delivered, batch_failed = dispatch_batch(batch_size=batch_size)
+        delivered += batch_delivered
+        failed += batch_failed
+        if batch_delivered + batch_failed < batch_size:
+            break
+    return delivered, failed
+
+
+def next_attempt_at():
+    """When the next outbox message is due (None if the outbox is empty)"""
+    return OutboxMessage.objects.filter(
+        next_attempt_at__isnull=False
+    ).order_by('next_attempt_at').values_list('next_attempt_at', flat=True).first()
@@ -0,0 +1,72 @@
+"""
+Cursor (keyset) pagination for append-only history tables.
+
+The project default PageNumberPagination runs a COUNT(*) and an OFFSET
+scan on every page, which gets slower the deeper a client scrolls. The
+classes below page with WHERE <timestamp> < <cursor> ORDER BY <timestamp>, id
+instead, served by the per-user (user, -timestamp) indexes, so every
+page costs the same no matter how far back it is.
+
+Responses keep the usual shape: {next, previous, results}.
+There is no count unless the client asks for one with ?include_count=true.
+"""
+
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+class HistoryCursorPagination(CursorPagination):
+    """
+    Base cursor pagination.
+
+    Query params:
+    - cursor: opaque position returned in next/previous links
+    - page_size: results per page (capped at max_page_size)
+    - include_count: also return the total number of rows (runs a COUNT)
+    """
+
+    # Same default as the project-wide PageNumberPagination (PAGE_SIZE)
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'include_count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Remember the filtered queryset in case a count was requested"""
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() == 'true':
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        """Standard cursor response, plus count when requested"""
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        """Document the optional count field"""
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {'type': 'integer', 'example': 123}
+        return response_schema
+
+
+class OrderCursorPagination(HistoryCursorPagination):
+    """Newest orders first - uses the (customer, -created_at) index"""
+    ordering = ('-created_at', '-id')
+
+
+class NotificationCursorPagination(HistoryCursorPagination):
+    """Newest notifications first - uses the (user, -sent_at) index"""
+    ordering = ('-sent_at', '-id')
+
+
+class RedemptionCursorPagination(HistoryCursorPagination):
+    """Newest redemptions first - uses the (customer, -redeemed_at) index"""
+    ordering = ('-redeemed_at', '-id')
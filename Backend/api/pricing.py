@@ -0,0 +1,58 @@
+"""
+In-process menu price and availability index.
+Order validation resolves every basket line from this index instead of
+one database lookup per line, and prices always come from the server.
+
+The index is rebuilt with a single query when it is first used and after
+a MenuItem is saved or deleted (see api.signals). Other processes don't see
+those signals, so entries also expire after PRICE_INDEX_TTL_SECONDS.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+
+from .models import MenuItem
+
+
+class PriceIndex:
+    """
+    Map of menu item id → MenuItem (price, is_available, preparation_time).
+    The cached instances are shared between requests and must not be modified.
+    """
+
+    def __init__(self, ttl_seconds=None):
+        self.ttl_seconds = ttl_seconds or getattr(settings, 'PRICE_INDEX_TTL_SECONDS', 30)
+        self._lock = threading.Lock()
+        self._items = None
+        self._loaded_at = None
+
+    def invalidate(self):
+        """Drop the index; the next lookup reloads it"""
+        with self._lock:
+            self._items = None
+
+    def _current(self):
+        """Return the index, reloading it if invalidated or expired"""
+        with self._lock:
+            items = self._items
+            expired = (
+                self._loaded_at is None or
+                time.monotonic() - self._loaded_at > self.ttl_seconds
+            )
+        if items is None or expired:
+            items = MenuItem.objects.in_bulk()
+            with self._lock:
+                self._items = items
+                self._loaded_at = time.monotonic()
+        return items
+
+    def get_many(self, ids):
+        """Return {id: MenuItem} for the given ids (unknown ids are left out)"""
+        items = self._current()
+        return {item_id: items[item_id] for item_id in ids if item_id in items}
+
+
+# Process-wide index used by order validation
+price_index = PriceIndex()
@@ -0,0 +1,241 @@
+"""
+Device push delivery.
+Notifications are pushed to User.push_token by the send_push_notifications
+worker, never from an HTTP request. The worker picks up due PENDING
+notifications, groups them into provider-sized batches and sends the
+batches on a bounded thread pool.
+
+Providers are pluggable (PUSH_PROVIDER setting). A provider reports a
+result per message:
+- ok: delivered
+- permanent error: the token is dead - it is cleared from the user
+- temporary error: retried with backoff; every pending push for the same
+  token waits too, so a struggling device isn't hammered
+"""
+
+import abc
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Notification, User
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# PROVIDER INTERFACE
+# ============================================================================
+
+@dataclass
+class PushMessage:
+    """One push to one device"""
+    notification_id: int
+    token: str
+    title: str
+    body: str
+    data: dict = field(default_factory=dict)
+
+
+@dataclass
+class PushResult:
+    """Provider outcome for one PushMessage"""
+    notification_id: int
+    ok: bool
+    permanent: bool = False
+    error: str = ''
+
+
+class PushProvider(abc.ABC):
+    """
+    Base class for push providers (FCM, APNs, ...).
+    Subclasses implement send_batch.
+    """
+
+    # Most messages the provider accepts in one call
+    max_batch_size = 500
+
+    @abc.abstractmethod
+    def send_batch(self, messages):
+        """Send a batch of PushMessages and return one PushResult per message"""
+
+
+class StubPushProvider(PushProvider):
+    """
+    Local provider for development and tests.
+    Records every message instead of sending it. Tokens listed in
+    dead_tokens fail permanently, tokens in flaky_tokens fail temporarily.
+    """
+
+    max_batch_size = 100
+
+    def __init__(self, dead_tokens=(), flaky_tokens=()):
+        self.dead_tokens = set(dead_tokens)
+        self.flaky_tokens = set(flaky_tokens)
+        self.sent = []
+
+    def send_batch(self, messages):
+        """Pretend to send, reporting failures for configured tokens"""
+        results = []
+        for message in messages:
+            if message.token in self.dead_tokens:
+                results.append(PushResult(message.notification_id, ok=False, permanent=True, error='Unregistered'))
+            elif message.token in self.flaky_tokens:
+                results.append(PushResult(message.notification_id, ok=False, error='Unavailable'))
+            else:
+                self.sent.append(message)
+                results.append(PushResult(message.notification_id, ok=True))
+        return results
+
+
+def get_provider():
+    """Provider configured by the PUSH_PROVIDER setting"""
+    return import_string(getattr(settings, 'PUSH_PROVIDER', 'api.push.StubPushProvider'))()
+
+
+# ============================================================================
+# DELIVERY
+# ============================================================================
+
+def _retry_delay(attempts):
+    """Exponential backoff per token: 30s, 60s, 120s ... capped at 1 hour"""
+    return timedelta(seconds=min(30 * 2 ** (attempts - 1), 3600))
+
+
+def _claim(batch_size, now):
+    """
+    Claim due pending pushes.
+    Claimed rows get a lease (push_next_attempt_at in the future) so
+    other workers skip them while this one is sending.
+    """
+    lease = timedelta(seconds=getattr(settings, 'PUSH_LEASE_SECONDS', 60))
+    with transaction.atomic():
+        notifications = list(
+            Notification.objects.filter(
+                push_state=Notification.PushState.PENDING,
+                push_next_attempt_at__lte=now
+            ).select_related('user').select_for_update(
+                skip_locked=True, of=('self',)
+            ).order_by('push_next_attempt_at', 'id')[:batch_size]
+        )
+        Notification.objects.filter(
+            pk__in=[notification.pk for notification in notifications]
+        ).update(push_next_attempt_at=now + lease)
+    return notifications
+
+
+def _send_all(provider, messages):
+    """Send messages in provider-sized batches on a bounded thread pool"""
+    batches = [
+        messages[start:start + provider.max_batch_size]
+        for start in range(0, len(messages), provider.max_batch_size)
+    ]
+    results = []
+    with ThreadPoolExecutor(max_workers=getattr(settings, 'PUSH_WORKERS', 4)) as pool:
+        for batch, outcome in zip(batches, pool.map(_safe_send, [provider] * len(batches), batches)):
+            results.extend(outcome)
+    return results
+
+
+def _safe_send(provider, batch):
+    """Send one batch; a provider crash counts as a temporary failure for the batch"""
+    try:
+        return provider.send_batch(batch)
+    except Exception as error:
+        logger.exception('Push provider failed to send a batch of %d', len(batch))
+        return [PushResult(message.notification_id, ok=False, error=str(error)) for message in batch]
+
+
+def deliver_pushes(provider=None, batch_size=500, now=None):
+    """
+    Push one batch of due notifications.
+    Returns a dict of counts: sent, skipped, retried, failed.
+    """
+    provider = provider or get_provider()
+    now = now or timezone.now()
+    max_attempts = getattr(settings, 'PUSH_MAX_ATTEMPTS', 5)
+    counts = {'sent': 0, 'skipped': 0, 'retried': 0, 'failed': 0}
+
+    notifications = _claim(batch_size, now)
+    if not notifications:
+        return counts
+
+    # Respect notification_enabled; nothing to do without a device token
+    by_id = {}
+    skipped = []
+    for n in notifications:
+        if n.user.notification_enabled and n.user.push_token:
+            by_id[n.pk] = n
+        else:
+            skipped.append(n.pk)
+    Notification.objects.filter(pk__in=skipped).update(push_state=Notification.PushState.SKIPPED)
+    counts['skipped'] = len(skipped)
+
+    messages = [
+        PushMessage(
+            notification_id=n.pk,
+            token=n.user.push_token,
+            title=n.title,
+            body=n.message,
+            data={'notification_type': n.notification_type, 'order_id': n.order_id}
+        )
+        for n in by_id.values()
+    ]
+    results = []
+    for result in _send_all(provider, messages):
+        if result.notification_id in by_id:
+            results.append(result)
+        else:
+            # Not one of ours - never update rows this worker didn't claim
+            logger.warning('Push provider returned a result for unknown notification %s', result.notification_id)
+
+    sent = [result.notification_id for result in results if result.ok]
+    Notification.objects.filter(pk__in=sent).update(push_state=Notification.PushState.SENT)
+    counts['sent'] = len(sent)
+
+    dead_tokens = {}
+    with transaction.atomic():
+        for result in results:
+            if result.ok:
+                continue
+            notification = by_id[result.notification_id]
+            attempts = notification.push_attempts + 1
+
+            if result.permanent or attempts >= max_attempts:
+                Notification.objects.filter(pk=notification.pk).update(
+                    push_state=Notification.PushState.FAILED, push_attempts=attempts
+                )
+                counts['failed'] += 1
+                if result.permanent:
+                    dead_tokens[notification.user_id] = notification.user.push_token
+                continue
+
+            retry_at = now + _retry_delay(attempts)
+            Notification.objects.filter(pk=notification.pk).update(
+                push_attempts=attempts, push_next_attempt_at=retry_at
+            )
+            # Back off every pending push for this token, not just this one
+            Notification.objects.filter(
+                user_id=notification.user_id,
+                push_state=Notification.PushState.PENDING,
+                push_next_attempt_at__lt=retry_at
+            ).exclude(pk=notification.pk).update(push_next_attempt_at=retry_at)
+            counts['retried'] += 1
+
+        # Clear dead tokens (unless the device registered a new one meanwhile)
+        for user_id, token in dead_tokens.items():
+            User.objects.filter(pk=user_id, push_token=token).update(push_token=None)
+
+    return counts
+
+
+def next_push_at():
+    """When the next pending push is due (None if nothing is pending)"""
+    return Notification.objects.filter(
+        push_state=Notification.PushState.PENDING
+    ).order_by('push_next_attempt_at').values_list('push_next_attempt_at', flat=True).first()
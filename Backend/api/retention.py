@@ -0,0 +1,140 @@
+"""
+Notification retention.
+Deletes notifications once they are older than their type's TTL
+(NOTIFICATION_RETENTION_DAYS) so the table stays at a steady size.
+
+Rows are deleted in primary-key ranges, one short transaction per range,
+so writers are never blocked for long. Each notification type walks
+forward from its own checkpoint (JobCheckpoint), so a run that stops
+halfway resumes where it left off and later runs only scan new rows.
+Optionally, removed rows are rolled into per-user NotificationSummary counts.
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from .models import JobCheckpoint, Notification, NotificationSummary
+from .unread import notifications_removed
+
+# Checkpoint name prefix (one checkpoint per notification type)
+CHECKPOINT_PREFIX = 'notification_retention'
+
+
+def retention_days():
+    """
+    TTL in days per notification type.
+    Types missing from NOTIFICATION_RETENTION_DAYS use its 'default' entry.
+    """
+    configured = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', {})
+    default = configured.get('default', 90)
+    return {
+        notification_type: configured.get(notification_type, default)
+        for notification_type in Notification.NotificationType.values
+    }
+
+
+def _summarize(rows):
+    """Add a chunk of to-be-deleted notifications to the per-user summaries"""
+    totals = list(
+        rows.values('user', 'notification_type').annotate(
+            removed=Count('id'), first=Min('sent_at'), last=Max('sent_at')
+        ).order_by()
+    )
+    if not totals:
+        return
+
+    existing = {
+        (summary.user_id, summary.notification_type): summary
+        for summary in NotificationSummary.objects.select_for_update().filter(
+            user_id__in={row['user'] for row in totals},
+            notification_type__in={row['notification_type'] for row in totals}
+        )
+    }
+
+    created, updated = [], []
+    for row in totals:
+        summary = existing.get((row['user'], row['notification_type']))
+        if summary is None:
+            created.append(NotificationSummary(
+                user_id=row['user'],
+                notification_type=row['notification_type'],
+                count=row['removed'],
+                first_sent_at=row['first'],
+                last_sent_at=row['last']
+            ))
+        else:
+            summary.count += row['removed']
+            summary.first_sent_at = min(summary.first_sent_at, row['first'])
+            summary.last_sent_at = max(summary.last_sent_at, row['last'])
+            updated.append(summary)
+
+    NotificationSummary.objects.bulk_create(created)
+    NotificationSummary.objects.bulk_update(updated, ['count', 'first_sent_at', 'last_sent_at'])
+
+
+def _prune_type(notification_type, cutoff, chunk_size, summarize, pause):
+    """
+    Delete one type's expired notifications, chunk by chunk from its checkpoint.
+    Stops at the first row of this type that is still within its TTL
+    (ids grow with sent_at, so everything after it is newer).
+
+    Returns the number of rows deleted.
+    """
+    checkpoint, _ = JobCheckpoint.objects.get_or_create(
+        name=f'{CHECKPOINT_PREFIX}:{notification_type}'
+    )
+    max_id = Notification.objects.order_by('-pk').values_list('pk', flat=True).first()
+    if max_id is None:
+        return 0
+
+    deleted = 0
+    start = checkpoint.position
+    while start <= max_id:
+        end = start + chunk_size
+        chunk = Notification.objects.filter(
+            pk__gte=start, pk__lt=end, notification_type=notification_type
+        )
+
+        with transaction.atomic():
+            expired = chunk.filter(sent_at__lt=cutoff)
+            if summarize:
+                _summarize(expired)
+            notifications_removed(expired)
+            deleted += expired.delete()[0]
+
+        # Reached rows that must be kept - resume from here next time
+        first_kept = chunk.order_by('pk').values_list('pk', flat=True).first()
+        if first_kept is not None:
+            start = first_kept
+            break
+
+        start = end
+        JobCheckpoint.objects.filter(pk=checkpoint.pk).update(position=start)
+        if pause:
+            time.sleep(pause)
+
+    JobCheckpoint.objects.filter(pk=checkpoint.pk).update(position=start)
+    return deleted
+
+
+def prune_notifications(chunk_size=1000, summarize=False, pause=0, now=None):
+    """
+    Apply the retention policy to every notification type.
+    Returns {notification_type: rows deleted}.
+    """
+    now = now or timezone.now()
+    return {
+        notification_type: _prune_type(
+            notification_type,
+            cutoff=now - timedelta(days=days),
+            chunk_size=chunk_size,
+            summarize=summarize,
+            pause=pause
+        )
+        for notification_type, days in retention_days().items()
+    }
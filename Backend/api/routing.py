@@ -3,12 +3,24 @@ WebSocket URL routing for real-time features.
 Defines WebSocket endpoint patterns and connects them to consumers.
 """
 
+from channels.auth import AuthMiddlewareStack
+from channels.routing import URLRouter
 from django.urls import re_path
+
 from . import consumers
+from .middleware import TokenAuthMiddleware
 
 # WebSocket URL patterns
 # These define the WebSocket endpoints available to clients
 websocket_urlpatterns = [
+    # WebSocket for the live barista queue
+    # URL: ws://localhost:8000/ws/orders/queue/
+    # Sends the queue once on connect, then pushes per-order insert/update/remove events
+    re_path(
+        r'ws/orders/queue/$',
+        consumers.OrderQueueConsumer.as_asgi()
+    ),
+    
     # WebSocket for real-time order status updates
     # URL: ws://localhost:8000/ws/orders/<order_id>/
     # Clients connect to this to receive live updates about a specific order
@@ -16,4 +28,22 @@ websocket_urlpatterns = [
         r'ws/orders/(?P<order_id>\d+)/$',
         consumers.OrderStatusConsumer.as_asgi()
     ),
-]
\ No newline at end of file
+    
+    # WebSocket for the current user's notifications
+    # URL: ws://localhost:8000/ws/notifications/
+    # Pushes each notification as soon as the outbox dispatcher delivers it
+    re_path(
+        r'ws/notifications/$',
+        consumers.NotificationConsumer.as_asgi()
+    ),
+]
+
+
+# WebSocket application served by Main.asgi
+# AuthMiddlewareStack adds session authentication to WebSocket connections
+# TokenAuthMiddleware lets the mobile app authenticate with ?token=<token>
+websocket_application = AuthMiddlewareStack(
+    TokenAuthMiddleware(
+        URLRouter(websocket_urlpatterns)
+    )
+)
@@ -0,0 +1,60 @@
+"""
+Scheduled order release.
+Orders placed for a later pickup are held out of the barista queue
+(Order.release_at) until it is time to start preparing them. The release
+job periodically moves due orders into the queue and pushes queue events.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from .events import publish_queue_events
+from .models import Order
+
+
+def release_due_orders(now=None, batch_size=500):
+    """
+    Release every held order whose release time has passed.
+    Served by the release_at index. Clearing release_at and bumping
+    updated_at also makes released orders show up for ?since= queue clients.
+
+    Returns the number of orders released.
+    """
+    now = now or timezone.now()
+    released = 0
+
+    while True:
+        with transaction.atomic():
+            due = list(
+                Order.objects.filter(
+                    release_at__lte=now
+                ).select_for_update(skip_locked=True).order_by('release_at')[:batch_size]
+            )
+            if not due:
+                break
+
+            # Only release orders still held (another worker may have beaten us)
+            count = Order.objects.filter(
+                pk__in=[order.pk for order in due],
+                release_at__isnull=False
+            ).update(release_at=None, updated_at=now)
+
+            for order in due:
+                order.release_at = None
+                order.updated_at = now
+            # Push the whole batch to barista screens after commit
+            publish_queue_events(due, created=True)
+
+            released += count
+
+        if len(due) < batch_size:
+            break
+
+    return released
+
+
+def next_release_at():
+    """When the next held order is due (None if nothing is scheduled)"""
+    return Order.objects.filter(
+        release_at__isnull=False
+    ).order_by('release_at').values_list('release_at', flat=True).first()
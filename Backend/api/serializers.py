@@ -3,9 +3,61 @@ Serializers convert Django models to/from JSON for API requests/responses.
 Each serializer defines which fields are exposed and validation rules.
 """
 
-from rest_framework import serializers
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
 from django.contrib.auth import authenticate
+from django.db import models, transaction
 from .models import *
+from .eta import eta_engine
+from .pricing import price_index
+from .services import place_order
+
+
+def serialize_datetime(value):
+    """Format a datetime like DRF's DateTimeField (None stays None)"""
+    return serializers.DateTimeField().to_representation(value) if value else None
+
+
+class EstimatedOrderListSerializer(serializers.ListSerializer):
+    """
+    List of orders with estimated_ready_at.
+    Predicts the whole list with one eta_engine.estimate_many call
+    instead of one queue simulation per order.
+    """
+    
+    def to_representation(self, data):
+        """Estimate every order first, then serialize them"""
+        orders = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        self.etas = eta_engine.estimate_many(orders)
+        return super().to_representation(orders)
+
+
+def order_eta(serializer, order):
+    """ETA for one serialized order - from the list's batch when there is one"""
+    etas = getattr(serializer.parent, 'etas', None)
+    eta = etas.get(order.pk) if etas is not None else eta_engine.estimate(order)
+    return serialize_datetime(eta)
+
+class OrderStatusConflict(APIException):
+    """Order status changed underneath the caller (HTTP 409)"""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Order status was changed by someone else. Refresh and try again.'
+    default_code = 'status_conflict'
+
+
+def apply_status_transition(order, new_status, expected_status=None):
+    """
+    Run Order.transition_to and turn its errors into API errors.
+    - Illegal transition → 400 (ValidationError)
+    - Changed underneath the caller → 409 (OrderStatusConflict)
+    """
+    try:
+        order.transition_to(new_status, expected_status=expected_status)
+    except Order.InvalidTransition as error:
+        raise serializers.ValidationError({'status': str(error)})
+    except Order.TransitionConflict as error:
+        raise OrderStatusConflict(str(error))
+
 
 # User serializers for authentication and profile management
 class UserSerializer(serializers.ModelSerializer):
@@ -24,6 +76,14 @@ class UserSerializer(serializers.ModelSerializer):
         ]
         # Read-only fields that users cannot modify directly
         read_only_fields = ['id', 'role', 'loyalty_points', 'date_joined']
+    
+    def update(self, instance, validated_data):
+        """Save only the edited profile fields"""
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        if validated_data:
+            instance.save(update_fields=list(validated_data))
+        return instance
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -124,11 +184,13 @@ class MenuItemSerializer(serializers.ModelSerializer):
     
     # Include full image URL in response
     image_url = serializers.SerializerMethodField()
+    # Resized copies for <img srcset> / Image sources: {"webp": "...", "jpeg": "..."}
+    image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = MenuItem
         fields = [
-            'id', 'title', 'description', 'image', 'image_url',
+            'id', 'title', 'description', 'image', 'image_url', 'image_srcset',
             'item_type', 'price', 'is_available', 'preparation_time',
             'created_at', 'updated_at'
         ]
@@ -141,6 +203,12 @@ class MenuItemSerializer(serializers.ModelSerializer):
             if request:
                 return request.build_absolute_uri(obj.image.url)
         return None
+    
+    def get_image_srcset(self, obj):
+        """srcset per format (null until the variants are generated)"""
+        from .images import srcset
+        request = self.context.get('request')
+        return srcset(obj, request.build_absolute_uri if request else str)
 
 
 # Order item serializers
@@ -153,9 +221,8 @@ class OrderItemSerializer(serializers.ModelSerializer):
     # Include full menu item data in response
     menu_item_detail = MenuItemSerializer(source='menu_item', read_only=True)
     # Accept menu item ID when creating order
-    menu_item = serializers.PrimaryKeyRelatedField(
-        queryset=MenuItem.objects.all()
-    )
+    # (resolved for the whole basket at once by resolve_order_lines)
+    menu_item = serializers.IntegerField(source='menu_item_id')
     # Calculate total for this line item
     total = serializers.SerializerMethodField()
     
@@ -165,13 +232,46 @@ class OrderItemSerializer(serializers.ModelSerializer):
             'id', 'menu_item', 'menu_item_detail', 'quantity',
             'price', 'customizations', 'total'
         ]
-        read_only_fields = ['id']
+        # Price is always taken from the menu, never from the client
+        read_only_fields = ['id', 'price']
     
     def get_total(self, obj):
         """Calculate line item total (price * quantity)"""
         return obj.get_total_price()
 
 
+def resolve_order_lines(lines):
+    """
+    Resolve basket lines against the menu in one pass.
+    lines: dicts with menu_item_id, quantity and optional customizations
+    
+    Uses the in-process price index (no query per line). Returns new dicts
+    with the MenuItem instance and its current server-side price.
+    Unknown or unavailable menu items are rejected together.
+    """
+    menu_items = price_index.get_many({line['menu_item_id'] for line in lines})
+    
+    errors = {}
+    resolved = []
+    for index, line in enumerate(lines):
+        menu_item = menu_items.get(line['menu_item_id'])
+        if menu_item is None:
+            errors[index] = {'menu_item': f"Menu item {line['menu_item_id']} does not exist"}
+        elif not menu_item.is_available:
+            errors[index] = {'menu_item': f'{menu_item.title} is currently unavailable'}
+        else:
+            resolved.append({
+                'menu_item': menu_item,
+                'quantity': line.get('quantity', 1),
+                'price': menu_item.price,
+                'customizations': line.get('customizations', ''),
+            })
+    
+    if errors:
+        raise serializers.ValidationError(errors)
+    return resolved
+
+
 class OrderSerializer(serializers.ModelSerializer):
     """
     Serializer for Order model.
@@ -186,108 +286,86 @@ class OrderSerializer(serializers.ModelSerializer):
     customer_detail = UserSerializer(source='customer', read_only=True)
     # Calculate if order can be modified
     can_modify = serializers.SerializerMethodField()
+    # Predicted ready time from the ETA engine (null once out of the queue)
+    estimated_ready_at = serializers.SerializerMethodField()
     
     class Meta:
         model = Order
         fields = [
             'id', 'customer', 'customer_detail', 'status', 'total_price',
             'notes', 'scheduled_for', 'is_favourite', 'items', 'order_items',
-            'can_modify', 'created_at', 'updated_at', 'completed_at'
+            'can_modify', 'estimated_ready_at', 'created_at', 'updated_at',
+            'completed_at'
         ]
         read_only_fields = [
             'id', 'customer', 'total_price', 'created_at', 'updated_at', 'completed_at'
         ]
+        # One ETA simulation for a whole list of orders
+        list_serializer_class = EstimatedOrderListSerializer
     
     def get_can_modify(self, obj):
         """Check if order status allows modifications"""
         return obj.can_be_modified()
     
+    def validate_order_items(self, order_items):
+        """Resolve menu items and prices for the whole basket at once"""
+        return resolve_order_lines(order_items)
+    
+    def get_estimated_ready_at(self, obj):
+        """Predicted ready time from the in-memory queue simulation"""
+        return order_eta(self, obj)
+    
     def create(self, validated_data):
         """Create order with nested order items"""
         # Extract order items data
         order_items_data = validated_data.pop('order_items', [])
         
         # Set customer from request context
-        validated_data['customer'] = self.context['request'].user
-        
-        # Calculate total price from items
-        total = sum(
-            item['price'] * item['quantity']
-            for item in order_items_data
-        )
-        validated_data['total_price'] = total
-        
-        # Create order
-        order = Order.objects.create(**validated_data)
-        
-        # Create order items
-        for item_data in order_items_data:
-            OrderItem.objects.create(order=order, **item_data)
+        validated_data.pop('customer', None)
+        customer = self.context['request'].user
         
-        # Award loyalty points (1 point per dollar)
-        customer = order.customer
-        customer.loyalty_points += order.calculate_points()
-        customer.save()
+        # New orders always start as RECEIVED
+        validated_data.pop('status', None)
         
-        return order
+        # Order, items and loyalty points are written in one transaction
+        return place_order(customer, order_items_data, **validated_data)
     
     def update(self, instance, validated_data):
         """Update order, handle status changes"""
-        old_status = instance.status
+        from .events import publish_order_status
+        from .outbox import enqueue_status_notifications
+        new_status = validated_data.pop('status', instance.status)
+        status_changed = new_status != instance.status
         
-        # Update order fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        # Reject illegal status changes before writing anything
+        if status_changed and not Order.can_transition(instance.status, new_status):
+            raise serializers.ValidationError({
+                'status': f'Cannot change order from {instance.status} to {new_status}'
+            })
         
-        # If status changed, send notification
-        if old_status != instance.status:
-            self._send_status_notification(instance)
+        with transaction.atomic():
+            # Update order fields (status is never part of this write)
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            update_fields = [
+                field.name for field in Order._meta.concrete_fields
+                if field.name in validated_data
+            ]
+            if update_fields:
+                instance.save(update_fields=update_fields + ['updated_at'])
+            
+            # Pickup time changed - recompute when the order enters the queue
+            if 'scheduled_for' in validated_data:
+                instance.schedule_release()
+            
+            # If status changed, go through the transition table,
+            # then queue the notification and push live status event
+            if status_changed:
+                apply_status_transition(instance, new_status)
+                enqueue_status_notifications([instance])
+                publish_order_status(instance)
         
         return instance
-    
-    def _send_status_notification(self, order):
-        """Create notification when order status changes"""
-        from .models import Notification
-        
-        # Map status to notification type and message
-        status_messages = {
-            Order.OrderStatus.RECEIVED: (
-                Notification.NotificationType.ORDER_RECEIVED,
-                "Order Received",
-                "Your order has been received and will be prepared soon."
-            ),
-            Order.OrderStatus.PREPARING: (
-                Notification.NotificationType.ORDER_PREPARING,
-                "Order is Being Prepared",
-                "Your order is now being prepared by our barista."
-            ),
-            Order.OrderStatus.READY: (
-                Notification.NotificationType.ORDER_READY,
-                "Order Ready for Pickup!",
-                "Your order is ready! Please come pick it up."
-            ),
-            Order.OrderStatus.COMPLETED: (
-                Notification.NotificationType.ORDER_COMPLETED,
-                "Order Completed",
-                "Thank you for your order! Enjoy your coffee and dessert."
-            ),
-            Order.OrderStatus.CANCELLED: (
-                Notification.NotificationType.ORDER_CANCELLED,
-                "Order Cancelled",
-                "Your order has been cancelled."
-            ),
-        }
-        
-        if order.status in status_messages:
-            notif_type, title, message = status_messages[order.status]
-            Notification.objects.create(
-                user=order.customer,
-                notification_type=notif_type,
-                title=title,
-                message=message,
-                order=order
-            )
 
 
 class OrderListSerializer(serializers.ModelSerializer):
@@ -298,17 +376,166 @@ class OrderListSerializer(serializers.ModelSerializer):
     
     customer_name = serializers.CharField(source='customer.username', read_only=True)
     items_count = serializers.SerializerMethodField()
+    total_quantity = serializers.SerializerMethodField()
     
     class Meta:
         model = Order
         fields = [
             'id', 'customer_name', 'status', 'total_price',
-            'items_count', 'scheduled_for', 'created_at'
+            'items_count', 'total_quantity', 'scheduled_for', 'created_at'
         ]
     
     def get_items_count(self, obj):
-        """Count total items in order"""
+        """Count order lines (annotated by OrderViewSet.get_queryset)"""
+        if hasattr(obj, 'items_count'):
+            return obj.items_count
         return obj.items.count()
+    
+    def get_total_quantity(self, obj):
+        """Total number of items across all lines (annotated by OrderViewSet.get_queryset)"""
+        if hasattr(obj, 'total_quantity'):
+            return obj.total_quantity
+        return obj.items.aggregate(total=models.Sum('quantity'))['total'] or 0
+
+
+class StatusUpdateSerializer(serializers.Serializer):
+    """One (order_id, status) pair in a bulk status update"""
+    
+    order_id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=Order.OrderStatus.choices)
+
+
+class BulkStatusUpdateSerializer(serializers.Serializer):
+    """
+    Request body for POST /api/orders/bulk_update_status/
+    {"updates": [{"order_id": 1, "status": "READY"}, ...]}
+    """
+    
+    updates = StatusUpdateSerializer(many=True, allow_empty=False, max_length=100)
+    
+    def validate_updates(self, updates):
+        """Each order may appear only once per request"""
+        order_ids = [update['order_id'] for update in updates]
+        if len(order_ids) != len(set(order_ids)):
+            raise serializers.ValidationError("Each order can only be updated once per request")
+        return updates
+
+
+# Compact barista queue serializers
+class QueueMenuItemSerializer(serializers.ModelSerializer):
+    """
+    Minimal menu item data the kitchen needs.
+    No description, image or timestamps.
+    """
+    
+    class Meta:
+        model = MenuItem
+        fields = ['id', 'title', 'item_type', 'preparation_time']
+
+
+class QueueCustomerSerializer(serializers.ModelSerializer):
+    """
+    Minimal customer data shown on queue tickets.
+    No email, phone, loyalty points or join date.
+    """
+    
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name']
+
+
+class QueueOrderItemSerializer(serializers.ModelSerializer):
+    """Order line that refers to its menu item by id"""
+    
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'menu_item', 'quantity', 'customizations']
+
+
+class QueueOrderSerializer(serializers.ModelSerializer):
+    """Queue ticket that refers to its customer and menu items by id"""
+    
+    items = QueueOrderItemSerializer(many=True, read_only=True)
+    estimated_ready_at = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'customer', 'status', 'notes', 'scheduled_for',
+            'items', 'estimated_ready_at', 'created_at', 'updated_at'
+        ]
+        list_serializer_class = EstimatedOrderListSerializer
+    
+    def get_estimated_ready_at(self, obj):
+        """Predicted ready time from the in-memory queue simulation"""
+        return order_eta(self, obj)
+
+
+class EtaQuoteItemSerializer(serializers.Serializer):
+    """One basket line in an ETA quote request"""
+    
+    menu_item = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class EtaQuoteSerializer(serializers.Serializer):
+    """
+    Request body for POST /api/orders/eta_quote/
+    {"order_items": [{"menu_item": 1, "quantity": 2}], "scheduled_for": null}
+    """
+    
+    order_items = EtaQuoteItemSerializer(many=True, allow_empty=False)
+    scheduled_for = serializers.DateTimeField(required=False, allow_null=True)
+
+
+class ReorderSerializer(serializers.Serializer):
+    """
+    Request body for POST /api/favourites/{id}/reorder/
+    {"scheduled_for": "2024-01-01T12:00:00Z"} (optional)
+    """
+    
+    scheduled_for = serializers.DateTimeField(required=False, allow_null=True)
+
+
+class CompactQueueSerializer(serializers.BaseSerializer):
+    """
+    De-duplicated wire format for the barista queue.
+    Each distinct customer and menu item is sent once in a side
+    dictionary and orders refer to them by id:
+    
+    {
+        "orders": [{"id": 1, "customer": 7, "items": [{"menu_item": 3, ...}], ...}],
+        "customers": {"7": {...}},
+        "menu_items": {"3": {...}}
+    }
+    
+    Expects orders loaded with select_related('customer') and
+    prefetch_related('items__menu_item').
+    """
+    
+    def to_representation(self, orders):
+        """Serialize orders plus the distinct customers and menu items they use"""
+        orders = list(orders)
+        customers = {}
+        menu_items = {}
+        
+        # Collect each distinct customer and menu item once
+        for order in orders:
+            customers.setdefault(order.customer_id, order.customer)
+            for item in order.items.all():
+                menu_items.setdefault(item.menu_item_id, item.menu_item)
+        
+        return {
+            'orders': QueueOrderSerializer(orders, many=True).data,
+            'customers': {
+                customer['id']: customer
+                for customer in QueueCustomerSerializer(customers.values(), many=True).data
+            },
+            'menu_items': {
+                menu_item['id']: menu_item
+                for menu_item in QueueMenuItemSerializer(menu_items.values(), many=True).data
+            },
+        }
 
 
 # Favourite order serializers
@@ -354,9 +581,9 @@ class LoyaltyOfferSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
     
     def get_is_valid(self, obj):
-        """Check if offer is within validity period"""
+        """Check if offer is within validity period (at context['now'] if given)"""
         from django.utils import timezone
-        now = timezone.now()
+        now = self.context.get('now') or timezone.now()
         
         if not obj.is_active:
             return False
@@ -405,4 +632,26 @@ class LoyaltyRedemptionSerializer(serializers.ModelSerializer):
         read_only_fields = [
             'id', 'customer', 'points_spent', 'redemption_code', 
             'redeemed_at'
-        ]
\ No newline at end of file
+        ]
+
+
+class UseRedemptionSerializer(serializers.Serializer):
+    """
+    Request body for POST /api/loyalty-redemptions/{id}/mark_used/
+    {"order_id": 123} (optional)
+    """
+    
+    order_id = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+
+
+class RedeemCodeSerializer(UseRedemptionSerializer):
+    """
+    Request body for POST /api/loyalty-redemptions/redeem_code/
+    {"code": "AB12CD34", "order_id": 123 (optional)}
+    """
+    
+    code = serializers.CharField(max_length=20)
+    
+    def validate_code(self, code):
+        """Codes are matched case-insensitively"""
+        return code.strip().upper()
\ No newline at end of file
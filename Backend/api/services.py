@@ -0,0 +1,66 @@
+"""
+Order placement service.
+Single code path for creating orders (checkout and reorder) so every
+order is written the same way: in one transaction, with a constant
+number of queries regardless of basket size.
+"""
+
+from django.db import transaction
+
+from . import loyalty
+from .models import Order, OrderItem
+
+
+def place_order(customer, items, **order_fields):
+    """
+    Create an order with its items and award loyalty points.
+
+    customer: User placing the order
+    items: list of dicts with menu_item (MenuItem instance), quantity,
+           price and optional customizations
+    order_fields: extra Order fields (notes, scheduled_for, is_favourite)
+
+    Everything runs in one atomic block:
+    - one INSERT for the order
+    - one bulk_create for all order items
+    - one loyalty ledger entry plus one UPDATE of just the loyalty_points
+      column (F() expression, so concurrent orders can't lose each other's points)
+
+    Returns the order with customer and items__menu_item already loaded,
+    so serializing the response issues no follow-up queries.
+    """
+    # Calculate total price from items
+    total = sum(item['price'] * item['quantity'] for item in items)
+
+    with transaction.atomic():
+        order = Order.objects.create(
+            customer=customer,
+            total_price=total,
+            **order_fields
+        )
+
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                menu_item=item['menu_item'],
+                quantity=item['quantity'],
+                price=item['price'],
+                customizations=item.get('customizations', '')
+            )
+            for item in items
+        ])
+
+        # Award loyalty points (1 point per dollar)
+        loyalty.earn(customer.pk, order.calculate_points(), order=order)
+
+        # Hold scheduled orders out of the queue until they are due
+        order.schedule_release(minutes=sum(
+            item['menu_item'].preparation_time * item['quantity']
+            for item in items
+        ))
+
+    return Order.objects.select_related(
+        'customer'
+    ).prefetch_related(
+        'items__menu_item'
+    ).get(pk=order.pk)
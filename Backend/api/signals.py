@@ -0,0 +1,45 @@
+"""
+Model signal handlers.
+Keep in-process caches and counters in step with database changes.
+Connected in ApiConfig.ready().
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .menu import menu_cache
+from .models import LoyaltyOffer, MenuItem, Notification
+from .offers import offer_cache
+from .pricing import price_index
+from .unread import notifications_created
+
+
+@receiver([post_save, post_delete], sender=MenuItem)
+def menu_item_changed(sender, instance, **kwargs):
+    """
+    Menu item saved or deleted - prices or availability may have changed.
+    The price index and menu snapshots are dropped now (so this transaction
+    sees its change) and again on commit, in case a concurrent request
+    cached the old data in between.
+    """
+    price_index.invalidate()
+    transaction.on_commit(price_index.invalidate)
+    menu_cache.bump()
+    transaction.on_commit(menu_cache.bump)
+
+
+@receiver([post_save, post_delete], sender=LoyaltyOffer)
+def loyalty_offer_changed(sender, instance, **kwargs):
+    """Offer saved or deleted - its validity window or points may have changed"""
+    offer_cache.invalidate()
+
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, **kwargs):
+    """
+    Notification created one at a time (e.g. from the admin).
+    Bulk paths (outbox dispatcher) update the counters themselves.
+    """
+    if created:
+        notifications_created([instance])
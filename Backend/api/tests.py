@@ -1,3 +1,1686 @@
-from django.test import TestCase
+"""
+API tests.
+Query-count assertions keep the order endpoints from regressing into N+1 queries.
+"""
 
-# Create your tests here.
+import io
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib import admin
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase as DjangoTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .archive import archive_orders
+from .broadcast import broadcast_audience, broadcast_promotion
+from .codes import CodeAllocator, redemption_codes
+from .consumers import OrderQueueConsumer
+from .eta import EtaEngine, eta_engine
+from .events import publish_queue_event
+from .images import generate_menu_images, pending_items
+from .loyalty import InsufficientPoints, earn, reconcile_balances, spend
+from .menu import MenuCache, menu_cache
+from .models import (
+    ArchivedOrder, FavouriteOrder, IdempotencyKey, JobCheckpoint, LoyaltyLedger,
+    LoyaltyOffer, LoyaltyRedemption, MenuItem, Notification, NotificationSummary,
+    Order, OrderItem, OutboxMessage, User,
+)
+from .offers import offer_cache
+from .outbox import dispatch_outbox
+from .pricing import price_index
+from .push import PushResult, StubPushProvider, deliver_pushes
+from .retention import prune_notifications
+from .routing import websocket_application
+from .scheduler import release_due_orders
+from .serializers import OrderSerializer
+from .services import place_order
+from .unread import reconcile_unread_counts
+
+
+class TestCase(DjangoTestCase):
+    """
+    Test case that leaves no ETA model behind.
+    eta_engine is process-global, so without the reset the next test would
+    start from the orders (and the load) of this one.
+    """
+
+    def _post_teardown(self):
+        super()._post_teardown()
+        eta_engine.reset()
+
+
+class QueueSocketTests(TestCase):
+    """Barista queue socket: snapshot on connect, then per-order deltas after commit"""
+
+    def setUp(self):
+        self.barista = User.objects.create_user(
+            username='barista', password='barista123', role=User.UserRole.BARISTA
+        )
+        self.customer = User.objects.create_user(username='customer', password='customer123')
+        self.menu_item = MenuItem.objects.create(
+            title='Latte', item_type=MenuItem.ItemType.COFFEE, price=4, preparation_time=3
+        )
+        self.order = self.create_order()
+        self.token = Token.objects.create(user=self.barista).key
+        eta_engine.load()
+
+    def create_order(self):
+        order = Order.objects.create(customer=self.customer, total_price=4)
+        OrderItem.objects.create(order=order, menu_item=self.menu_item, quantity=1, price=4)
+        return order
+
+    async def connect(self, token=None):
+        """Open the queue socket, authenticated with ?token= if given"""
+        path = '/ws/orders/queue/' + (f'?token={token}' if token else '')
+        communicator = WebsocketCommunicator(websocket_application, path)
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    async def test_snapshot_then_deltas(self):
+        """The snapshot lists the queue; later changes arrive as insert/update/remove"""
+        communicator, connected = await self.connect(self.token)
+        self.assertTrue(connected)
+
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual(snapshot['event'], 'snapshot')
+        self.assertEqual([order['id'] for order in snapshot['orders']], [self.order.id])
+        self.assertEqual(snapshot['orders'][0]['customer_detail']['username'], 'customer')
+
+        @sync_to_async
+        def change_orders():
+            with self.captureOnCommitCallbacks(execute=True):
+                created = place_order(self.customer, [
+                    {'menu_item': self.menu_item, 'quantity': 1, 'price': self.menu_item.price}
+                ])
+                publish_queue_event(created, created=True)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.order.transition_to(Order.OrderStatus.PREPARING)
+                publish_queue_event(self.order)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.order.transition_to(Order.OrderStatus.READY)
+                publish_queue_event(self.order)
+            return created
+
+        created = await change_orders()
+
+        insert = await communicator.receive_json_from()
+        self.assertEqual((insert['event'], insert['order']['id']), ('insert', created.id))
+        update = await communicator.receive_json_from()
+        self.assertEqual((update['event'], update['order']['status']), ('update', 'PREPARING'))
+        self.assertEqual(await communicator.receive_json_from(), {'event': 'remove', 'order_id': self.order.id})
+        await communicator.disconnect()
+
+    async def test_rolled_back_change_is_not_published(self):
+        """Deltas are only sent once the transaction commits"""
+        communicator, _ = await self.connect(self.token)
+        await communicator.receive_json_from()
+
+        @sync_to_async
+        def change_and_roll_back():
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                self.order.transition_to(Order.OrderStatus.PREPARING)
+                publish_queue_event(self.order)
+            return callbacks
+
+        self.assertTrue(await change_and_roll_back())
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_customers_and_anonymous_are_refused(self):
+        """Only staff may watch the queue; a bad token is anonymous"""
+        customer_token = await sync_to_async(lambda: Token.objects.create(user=self.customer).key)()
+        for token in (customer_token, 'not-a-token', None):
+            communicator, connected = await self.connect(token)
+            self.assertFalse(connected, token)
+            await communicator.disconnect()
+
+    def test_snapshot_queries(self):
+        """The snapshot needs the same queries no matter how many orders are queued"""
+        for _ in range(5):
+            self.create_order()
+
+        with self.assertNumQueries(3):
+            orders = async_to_sync(OrderQueueConsumer().get_queue_snapshot)()
+        self.assertEqual(len(orders), 6)
+
+
+class OrderStatusSocketTests(TestCase):
+    """Order status socket: owner and staff get a compact event for every status change"""
+
+    def setUp(self):
+        self.barista = User.objects.create_user(
+            username='barista', password='barista123', role=User.UserRole.BARISTA
+        )
+        self.customer = User.objects.create_user(username='customer', password='customer123')
+        self.other = User.objects.create_user(username='other', password='other123')
+        self.order = Order.objects.create(customer=self.customer, total_price=4)
+        self.tokens = {
+            user.username: Token.objects.create(user=user).key
+            for user in (self.barista, self.customer, self.other)
+        }
+        self.path = f'/ws/orders/{self.order.id}/'
+        eta_engine.load()
+
+    async def connect(self, username=None):
+        """Open the order socket as username (anonymous if None)"""
+        path = self.path + (f'?token={self.tokens[username]}' if username else '')
+        communicator = WebsocketCommunicator(websocket_application, path)
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    def committed(self, change):
+        """Run change(client) and its commit callbacks"""
+        client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            return change(client)
+
+    async def test_owner_and_staff_only(self):
+        """The customer who placed the order and staff may follow it, nobody else"""
+        for username, allowed in [('customer', True), ('barista', True), ('other', False), (None, False)]:
+            communicator, connected = await self.connect(username)
+            self.assertEqual(connected, allowed, username)
+            await communicator.disconnect()
+
+    async def test_update_status_event(self):
+        """A barista's update_status reaches the customer as a compact event"""
+        communicator, _ = await self.connect('customer')
+
+        def update_status(client):
+            client.force_authenticate(self.barista)
+            return client.post(f'/api/orders/{self.order.id}/update_status/', {'status': 'PREPARING'})
+
+        response = await sync_to_async(self.committed)(update_status)
+        self.assertEqual(response.status_code, 200)
+
+        event = await communicator.receive_json_from()
+        self.assertEqual(
+            {key: event[key] for key in ('event', 'order_id', 'status', 'completed_at')},
+            {'event': 'status', 'order_id': self.order.id, 'status': 'PREPARING', 'completed_at': None}
+        )
+        self.assertEqual(set(event), {'event', 'order_id', 'status', 'updated_at', 'completed_at'})
+        await communicator.disconnect()
+
+    async def test_serializer_transition_event(self):
+        """A status change through the order serializer (customer cancels) is pushed"""
+        communicator, _ = await self.connect('barista')
+
+        def cancel(client):
+            client.force_authenticate(self.customer)
+            return client.patch(f'/api/orders/{self.order.id}/', {'status': 'CANCELLED'}, format='json')
+
+        response = await sync_to_async(self.committed)(cancel)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((await communicator.receive_json_from())['status'], 'CANCELLED')
+        await communicator.disconnect()
+
+    async def test_admin_transition_events(self):
+        """Staff status edits in the admin reach the order and queue sockets"""
+        order_socket, _ = await self.connect('barista')
+        queue_socket = WebsocketCommunicator(websocket_application, f'/ws/orders/queue/?token={self.tokens["barista"]}')
+        await queue_socket.connect()
+        await queue_socket.receive_json_from()
+
+        @sync_to_async
+        def admin_transition():
+            order = Order.objects.get(pk=self.order.pk)
+            order.status = Order.OrderStatus.PREPARING
+            form = mock.Mock(changed_data=['status'], initial={'status': Order.OrderStatus.RECEIVED})
+            with self.captureOnCommitCallbacks(execute=True):
+                admin.site._registry[Order].save_model(None, order, form, change=True)
+
+        await admin_transition()
+
+        self.assertEqual((await order_socket.receive_json_from())['status'], 'PREPARING')
+        update = await queue_socket.receive_json_from()
+        self.assertEqual((update['event'], update['order']['status']), ('update', 'PREPARING'))
+        await order_socket.disconnect()
+        await queue_socket.disconnect()
+
+
+class BulkStatusUpdateTests(TestCase):
+    """Bulk status updates publish their queue deltas in one batch after commit"""
+
+    def setUp(self):
+        self.barista = User.objects.create_user(
+            username='barista', password='barista123', role=User.UserRole.BARISTA
+        )
+        self.customer = User.objects.create_user(username='customer', password='customer123')
+        self.menu_item = MenuItem.objects.create(
+            title='Latte', item_type=MenuItem.ItemType.COFFEE, price=4, preparation_time=3
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.barista)
+
+    def bulk_update_queries(self, count):
+        """Queries run by a bulk update of count orders, including its commit callbacks"""
+        orders = []
+        for _ in range(count):
+            order = Order.objects.create(customer=self.customer, total_price=4)
+            OrderItem.objects.create(order=order, menu_item=self.menu_item, quantity=1, price=4)
+            orders.append(order)
+        eta_engine.load()
+
+        with CaptureQueriesContext(connection) as queries, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/orders/bulk_update_status/', {
+                'updates': [{'order_id': order.id, 'status': 'PREPARING'} for order in orders]
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(result['updated'] for result in response.data['results']))
+        return len(queries)
+
+    def test_publishing_does_not_grow_with_orders(self):
+        """Only the conditional UPDATE is per order; changed orders are serialized together"""
+        self.assertEqual(self.bulk_update_queries(6) - self.bulk_update_queries(2), 4)
+
+
+class OrderStatusTransitionTests(TestCase):
+    """Status changes follow Order.TRANSITIONS with conditional updates"""
+
+    def setUp(self):
+        self.barista = User.objects.create_user(
+            username='barista', password='barista123', role=User.UserRole.BARISTA
+        )
+        self.customer = User.objects.create_user(username='customer', password='customer123')
+        self.order = Order.objects.create(customer=self.customer, total_price=3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.barista)
+
+    def update_status(self, new_status, **extra):
+        return self.client.post(
+            f'/api/orders/{self.order.id}/update_status/', {'status': new_status, **extra}
+        )
+
+    def test_legal_transition(self):
+        """RECEIVED → PREPARING is applied"""
+        response = self.update_status('PREPARING')
+
+        self.assertEqual(response.status_code, 200)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.OrderStatus.PREPARING)
+
+    def test_illegal_transition(self):
+        """RECEIVED → COMPLETED is rejected and nothing changes"""
+        response = self.update_status('COMPLETED')
+
+        self.assertEqual(response.status_code, 400)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.OrderStatus.RECEIVED)
+
+    def test_lost_race(self):
+        """A barista acting on a stale screen gets 409; the other change stands"""
+        Order.objects.filter(pk=self.order.pk).update(status=Order.OrderStatus.PREPARING)
+
+        response = self.update_status('CANCELLED', expected_status='RECEIVED')
+
+        self.assertEqual(response.status_code, 409)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.OrderStatus.PREPARING)
+
+    def test_transition_many_reports_only_applied_rows(self):
+        """Orders that moved underneath the caller are left out of the result"""
+        stale = Order.objects.create(customer=self.customer, total_price=3)
+        Order.objects.filter(pk=stale.pk).update(status=Order.OrderStatus.CANCELLED)
+
+        applied = Order.transition_many([
+            (self.order, Order.OrderStatus.PREPARING),
+            (stale, Order.OrderStatus.PREPARING),
+        ])
+
+        self.assertEqual(applied, [self.order])
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, Order.OrderStatus.CANCELLED)
+
+    def test_favourite_keeps_concurrent_status(self):
+        """Toggling the favourite flag doesn't write back a stale status"""
+        self.client.force_authenticate(self.customer)
+        with mock.patch.object(
+            Order, 'save', side_effect=AssertionError('full-row save')
+        ):
+            response = self.client.post(
+                f'/api/orders/{self.order.id}/mark_favourite/', {'is_favourite': True}
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.order.refresh_from_db()
+        self.assertTrue(self.order.is_favourite)
+
+
+class ScheduledOrderReleaseTests(TestCase):
+    """Orders for a later pickup stay out of the queue until they are due"""
+
+    def setUp(self):
+        self.barista = User.objects.create_user(
+            username='barista', password='barista123', role=User.UserRole.BARISTA
+        )
+        self.customer = User.objects.create_user(username='customer', password='customer123')
+        self.latte = MenuItem.objects.create(
+            title='Latte', item_type=MenuItem.ItemType.COFFEE, price=4, preparation_time=10
+        )
+        self.client = APIClient()
+        eta_engine.load()
+
+    def schedule(self, pickup_in):
+        """Place an order for pickup after pickup_in, as the customer"""
+        self.client.force_authenticate(self.customer)
+        response = self.client.post('/api/orders/', {
+            'scheduled_for': (timezone.now() + pickup_in).isoformat(),
+            'order_items': [{'menu_item': self.latte.id, 'quantity': 1}]
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Order.objects.get(pk=response.data['id'])
+
+    def queue_ids(self):
+        self.client.force_authenticate(self.barista)
+        return [order['id'] for order in self.client.get('/api/orders/queue/').data]
+
+    def test_held_then_released(self):
+        """A future order is hidden, then released with updated_at bumped and an insert event"""
+        with mock.patch('api.events._group_send') as group_send, \
+                self.captureOnCommitCallbacks(execute=True):
+            order = self.schedule(timedelta(hours=2))
+        group_send.assert_not_called()
+
+        # Released preparation time (10 minutes) before pickup
+        self.assertEqual(order.release_at, order.scheduled_for - timedelta(minutes=10))
+        self.assertNotIn(order.id, self.queue_ids())
+        self.assertEqual(release_due_orders(), 0)
+
+        due = order.release_at + timedelta(seconds=1)
+        with mock.patch('api.events._group_send') as group_send, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(release_due_orders(now=due), 1)
+
+        order.refresh_from_db()
+        self.assertIsNone(order.release_at)
+        self.assertEqual(order.updated_at, due)
+        self.assertIn(order.id, self.queue_ids())
+        (group, message), _ = group_send.call_args
+        self.assertEqual(message['message']['event'], 'insert')
+        self.assertEqual(message['message']['order']['id'], order.id)
+
+    def test_release_publishes_in_one_batch(self):
+        """Releasing more orders doesn't add queries"""
+        def release_queries(count):
+            orders = [self.schedule(timedelta(hours=2)) for _ in range(count)]
+            eta_engine.load()
+            due = max(order.release_at for order in orders) + timedelta(seconds=1)
+            with CaptureQueriesContext(connection) as queries, \
+                    self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(release_due_orders(now=due), count)
+            return len(queries)
+
+        self.assertEqual(release_queries(2), release_queries(6))
+
+
+class EtaEngineTests(TestCase):
+    """Ready-time predictions from the in-memory queue model"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='customer123')
+        self.espresso = MenuItem.objects.create(
+            title='Espresso', item_type=MenuItem.ItemType.COFFEE, price=3, preparation_time=5
+        )
+        self.engine = EtaEngine(stations=2, resync_seconds=60)
+
+    def create_order(self):
+        order = Order.objects.create(customer=self.customer, total_price=3)
+        OrderItem.objects.create(order=order, menu_item=self.espresso, quantity=1, price=3)
+        return order
+
+    def test_orders_share_the_stations(self):
+        """Two stations make the first two orders together, the third after them"""
+        orders = [self.create_order() for _ in range(3)]
+        self.engine.load()
+
+        now = timezone.now()
+        etas = [self.engine.estimate(order) for order in orders]
+        self.assertAlmostEqual((etas[0] - now).total_seconds(), 300, delta=5)
+        self.assertAlmostEqual((etas[1] - now).total_seconds(), 300, delta=5)
+        self.assertAlmostEqual((etas[2] - now).total_seconds(), 600, delta=5)
+
+        quote = self.engine.quote(3)
+        self.assertEqual(quote['orders_ahead'], 3)
+        self.assertEqual(quote['wait_minutes'], 8)
+
+    def test_estimate_is_read_only(self):
+        """An order the model doesn't know is estimated without changing it"""
+        self.create_order()
+        self.engine.load()
+        known = dict(self.engine._orders)
+
+        order = Order.objects.prefetch_related('items__menu_item').get(pk=self.create_order().pk)
+        with CaptureQueriesContext(connection) as queries:
+            eta = self.engine.estimate(order)
+
+        self.assertEqual(len(queries), 0)
+        self.assertAlmostEqual((eta - timezone.now()).total_seconds(), 300, delta=5)
+        self.assertEqual(self.engine._orders, known)
+
+    def test_unknown_orders_are_simulated_together(self):
+        """Serializing orders the model doesn't know runs one simulation for all of them"""
+        eta_engine.load()
+        for _ in range(5):
+            self.create_order()
+        orders = Order.objects.prefetch_related('items__menu_item').order_by('id')
+
+        with mock.patch.object(eta_engine, '_simulate', wraps=eta_engine._simulate) as simulate:
+            data = OrderSerializer(orders, many=True).data
+
+        # One run for the known queue (empty), one for the unknown orders
+        self.assertEqual(simulate.call_count, 2)
+        now = timezone.now()
+        minutes = [
+            round((datetime.fromisoformat(order['estimated_ready_at']) - now).total_seconds() / 60)
+            for order in data
+        ]
+        self.assertEqual(minutes, [5, 5, 10, 10, 15])
+        self.assertEqual(eta_engine._orders, {})
+
+    def test_no_resync_on_the_request_path(self):
+        """Reads never reload the model, however old it is"""
+        order = self.create_order()
+        self.engine.load()
+        self.engine._loaded_at -= 3600
+
+        with CaptureQueriesContext(connection) as queries:
+            self.engine.estimate(order)
+            self.engine.quote(5)
+
+        self.assertEqual(len(queries), 0)
+        self.assertIsNone(self.engine._thread)
+
+
+class OrderPlacementTests(TestCase):
+    """place_order writes an order, its lines and its points together"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='customer123')
+        self.menu_items = [
+            MenuItem.objects.create(
+                title=f'Item {index}', item_type=MenuItem.ItemType.COFFEE, price=4, preparation_time=2
+            )
+            for index in range(4)
+        ]
+
+    def basket(self, size):
+        return [
+            {'menu_item': menu_item, 'quantity': 2, 'price': menu_item.price}
+            for menu_item in self.menu_items[:size]
+        ]
+
+    def test_queries_do_not_grow_with_basket(self):
+        """One INSERT per table whatever the number of lines"""
+        with CaptureQueriesContext(connection) as small:
+            place_order(self.customer, self.basket(1))
+        with CaptureQueriesContext(connection) as large:
+            order = place_order(self.customer, self.basket(4))
+
+        self.assertEqual(len(small), len(large))
+        with self.assertNumQueries(0):
+            self.assertEqual(len(order.items.all()), 4)
+            self.assertEqual(order.customer.username, 'customer')
+
+    def test_points_are_added_not_overwritten(self):
+        """Points earned elsewhere meanwhile are kept (stale user instance)"""
+        stale = User.objects.get(pk=self.customer.pk)
+        earn(self.customer.pk, 5)
+
+        order = place_order(stale, self.basket(2))
+
+        self.assertEqual(order.status, Order.OrderStatus.RECEIVED)
+        self.assertEqual(order.total_price, 16)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.loyalty_points, 21)
+
+    def test_failure_writes_nothing(self):
+        """An error while awarding points rolls back the order and its lines"""
+        with mock.patch('api.loyalty.earn', side_effect=RuntimeError('ledger down')):
+            with self.assertRaises(RuntimeError):
+                place_order(self.customer, self.basket(2))
+
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+
+class OrderPricingTests(TestCase):
+    """Order prices always come from the menu, never from the client"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='customer123')
+        self.latte = MenuItem.objects.create(
+            title='Latte', item_type=MenuItem.ItemType.COFFEE, price=4, preparation_time=3
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def place(self, **line):
+        return self.client.post('/api/orders/', {
+            'total_price': '0.01',
+            'order_items': [{'menu_item': self.latte.id, 'quantity': 2, **line}]
+        }, format='json')
+
+    def test_client_prices_are_ignored(self):
+        """Line and total prices sent by the client have no effect"""
+        response = self.place(price='0.50')
+
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual(order.total_price, 8)
+        self.assertEqual(order.items.get().price, 4)
+
+    def test_price_change_is_used_after_commit(self):
+        """Saving a menu item refreshes the cached prices once it commits"""
+        stale = MenuItem.objects.get(pk=self.latte.pk)
+        self.place()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.latte.price = 5
+            self.latte.save()
+            # A concurrent request reloads the index before the commit
+            with mock.patch.object(MenuItem.objects, 'in_bulk', return_value={stale.pk: stale}):
+                price_index.get_many([stale.pk])
+
+        self.place()
+        self.assertEqual(Order.objects.order_by('-id').first().total_price, 10)
+
+    def test_reorder_uses_current_prices(self):
+        """A favourite is reordered at today's prices; a bad pickup time is a 400"""
+        template = Order.objects.create(customer=self.customer, total_price=6)
+        OrderItem.objects.create(order=template, menu_item=self.latte, quantity=2, price=3)
+        favourite = FavouriteOrder.objects.create(customer=self.customer, name='Usual', template_order=template)
+        url = f'/api/favourites/{favourite.id}/reorder/'
+
+        response = self.client.post(url, {'scheduled_for': 'tomorrow'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('scheduled_for', response.data)
+
+        response = self.client.post(url, {}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.get(pk=response.data['id']).total_price, 8)
+
+    def test_unavailable_items_are_rejected(self):
+        """Unknown and unavailable menu items are rejected"""
+        self.latte.is_available = False
+        self.latte.save()
+
+        self.assertEqual(self.place().status_code, 400)
+        response = self.client.post('/api/orders/', {
+            'order_items': [{'menu_item': 9999, 'quantity': 1}]
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+class IdempotencyKeyTests(TestCase):
+    """Retries with the same Idempotency-Key never place a second order"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='customer123')
+        self.latte = MenuItem.objects.create(
+            title='Latte', item_type=MenuItem.ItemType.COFFEE, price=4, preparation_time=3
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def place(self, quantity=1, key='order-1'):
+        return self.client.post(
+            '/api/orders/',
+            {'order_items': [{'menu_item': self.latte.id, 'quantity': quantity}]},
+            format='json',
+            HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_replay(self):
+        """The same key and body get the stored response back"""
+        first = self.place()
+        second = self.place()
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.data['id'], first.data['id'])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_reused_for_different_request(self):
+        """Reusing a key with another payload is rejected"""
+        self.place()
+        response = self.place(quantity=2)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def claim_in_progress(self):
+        """Pretend the first attempt is still running (its order not committed)"""
+        first = self.place()
+        Order.objects.all().delete()
+        IdempotencyKey.objects.update(
+            status_code=None, response_body=None,
+            locked_until=timezone.now() + timedelta(seconds=30)
+        )
+        return first
+
+    def test_duplicate_waits_for_first_response(self):
+        """A duplicate polls the live claim and replays the response once stored"""
+        first = self.claim_in_progress()
+        stored = IdempotencyKey.objects.get()
+
+        def first_request_finishes(seconds):
+            IdempotencyKey.objects.filter(pk=stored.pk).update(
+                status_code=201, response_body={'id': first.data['id']}, locked_until=None
+            )
+
+        with mock.patch('api.idempotency.time.sleep', side_effect=first_request_finishes) as sleep:
+            response = self.place()
+
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(response.data['id'], first.data['id'])
+        self.assertFalse(Order.objects.exists())
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=1)
+    def test_in_progress_and_stale_claims(self):
+        """A live claim is waited on for a bounded time, then 409; an expired lease is taken over"""
+        self.claim_in_progress()
+
+        with mock.patch('api.idempotency.time.sleep') as sleep:
+            response = self.place()
+        self.assertEqual(sleep.call_count, 10)
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Order.objects.exists())
+
+        # The worker died - once its lease runs out a retry takes over
+        IdempotencyKey.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        with mock.patch('api.idempotency.time.sleep', side_effect=AssertionError('waited on a dead claim')):
+            response = self.place()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 201)
+
+
+class OrderQueryCountTests(TestCase):
+    """
+    Order endpoints must issue a fixed number of queries
+    no matter how many orders or items are returned.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.barista = User.objects.create_user(
+            username='barista', password='barista123', role=User.UserRole.BARISTA
+        )
+        cls.customer = User.objects.create_user(username='customer', password='customer123')
+        cls.menu_items = [
+            MenuItem.objects.create(
+                title=f'Item {index}',
+                item_type=MenuItem.ItemType.COFFEE,
+                price=3,
+                preparation_time=2
+            )
+            for index in range(3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.create_orders(2)
+
+    def create_orders(self, count):
+        """Create orders with one line per menu item"""
+        orders = []
+        for _ in range(count):
+            order = Order.objects.create(customer=self.customer, total_price=9)
+            for menu_item in self.menu_items:
+                OrderItem.objects.create(order=order, menu_item=menu_item, quantity=2, price=3)
+            orders.append(order)
+
+        # Keep the ETA model in step with orders created directly in the DB
+        eta_engine.load()
+        return orders
+
+    def test_barista_order_list(self):
+        """List: one annotated SELECT (cursor pagination runs no COUNT)"""
+        self.client.force_authenticate(self.barista)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/orders/')
+
+        self.assertEqual(response.status_code, 200)
+        first = response.data['results'][0]
+        self.assertEqual(first['items_count'], 3)
+        self.assertEqual(first['total_quantity'], 6)
+        self.assertEqual(first['customer_name'], 'customer')
+
+    def test_order_list_does_not_grow_with_orders(self):
+        """Adding orders doesn't add queries"""
+        self.client.force_authenticate(self.customer)
+        self.create_orders(10)
+
+        # One query per table (hot and archive)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/orders/')
+
+        self.assertEqual(len(response.data['results']), 12)
+
+    def test_order_detail(self):
+        """Detail: order with customer, then items, then menu items"""
+        self.client.force_authenticate(self.customer)
+        order = Order.objects.first()
+
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/orders/{order.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['items']), 3)
+
+    def test_queue(self):
+        """Queue: cursor, orders with customers, items, menu items"""
+        self.client.force_authenticate(self.barista)
+        self.create_orders(10)
+
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/orders/queue/')
+
+        self.assertEqual(len(response.data), 12)
+
+    def test_since_cursor_returns_changes(self):
+        """?since= returns orders that entered, changed or left the queue, then nothing"""
+        self.client.force_authenticate(self.barista)
+        changing, leaving = Order.objects.order_by('id')
+        cursor = self.client.get('/api/orders/queue/')['X-Queue-Cursor']
+
+        entering = self.create_orders(1)[0]
+        changing.transition_to(Order.OrderStatus.PREPARING)
+        leaving.transition_to(Order.OrderStatus.PREPARING)
+        leaving.transition_to(Order.OrderStatus.READY)
+
+        response = self.client.get('/api/orders/queue/', {'since': cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {order['id']: order['status'] for order in response.data['orders']},
+            {entering.id: 'RECEIVED', changing.id: 'PREPARING'}
+        )
+        self.assertEqual(response.data['removed'], [leaving.id])
+        self.assertFalse(response.data['has_more'])
+        self.assertNotEqual(response.data['cursor'], cursor)
+
+        # Nothing changed since the returned cursor
+        again = self.client.get('/api/orders/queue/', {'since': response.data['cursor']})
+        self.assertEqual((again.data['orders'], again.data['removed']), ([], []))
+        self.assertEqual(again.data['cursor'], response.data['cursor'])
+
+    def test_since_cursor_pages_with_has_more(self):
+        """Changes beyond QUEUE_CHANGES_LIMIT come on the next call"""
+        self.client.force_authenticate(self.barista)
+        cursor = self.client.get('/api/orders/queue/')['X-Queue-Cursor']
+        created = self.create_orders(3)
+
+        seen = []
+        with mock.patch('api.views.QUEUE_CHANGES_LIMIT', 2):
+            response = self.client.get('/api/orders/queue/', {'since': cursor})
+            self.assertTrue(response.data['has_more'])
+            seen += [order['id'] for order in response.data['orders']]
+
+            response = self.client.get('/api/orders/queue/', {'since': response.data['cursor']})
+            self.assertFalse(response.data['has_more'])
+            seen += [order['id'] for order in response.data['orders']]
+
+        self.assertEqual(seen, [order.id for order in created])
+
+    def test_malformed_since_cursor(self):
+        """Garbage or out-of-range ?since= cursors are a 400, not a 500"""
+        self.client.force_authenticate(self.barista)
+
+        for cursor in ['abc', '1-2-3', '99999999999999999999-1', '5-x']:
+            response = self.client.get('/api/orders/queue/', {'since': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+
+    def test_compact_queue(self):
+        """Compact queue needs the same queries as the full queue"""
+        self.client.force_authenticate(self.barista)
+
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/orders/queue/', {'compact': 'true'})
+
+        self.assertEqual(len(response.data['orders']), 2)
+        self.assertEqual(len(response.data['menu_items']), 3)
+
+
+class OrderCursorPaginationTests(TestCase):
+    """Order history pages with a cursor instead of page numbers"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='regular', password='regular123')
+        self.orders = [
+            Order.objects.create(customer=self.customer, total_price=3)
+            for _ in range(5)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_walks_history_newest_first(self):
+        """Following next links returns every order exactly once"""
+        seen = []
+        response = self.client.get('/api/orders/', {'page_size': 2})
+        while True:
+            self.assertNotIn('count', response.data)
+            seen += [order['id'] for order in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(seen, [order.id for order in reversed(self.orders)])
+
+    def test_default_page_size(self):
+        """Without page_size a page holds as many orders as before (PAGE_SIZE)"""
+        for _ in range(100):
+            Order.objects.create(customer=self.customer, total_price=3)
+
+        response = self.client.get('/api/orders/')
+        self.assertEqual(len(response.data['results']), 100)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_page_size_is_capped(self):
+        """page_size above the cap falls back to max_page_size"""
+        response = self.client.get('/api/orders/', {'page_size': 100000, 'include_count': 'true'})
+
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['results']), 5)
+
+
+class OrderArchiveTests(TestCase):
+    """Old finished orders move to the archive and stay visible in history"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='regular', password='regular123')
+        self.menu_item = MenuItem.objects.create(
+            title='Latte', item_type=MenuItem.ItemType.COFFEE, price=4, preparation_time=3
+        )
+        old = timezone.now() - timedelta(days=30)
+
+        self.old_orders = []
+        for _ in range(3):
+            order = Order.objects.create(
+                customer=self.customer, total_price=4, status=Order.OrderStatus.COMPLETED
+            )
+            OrderItem.objects.create(order=order, menu_item=self.menu_item, quantity=1, price=4)
+            Notification.objects.create(
+                user=self.customer, order=order, title='Ready', message='Enjoy',
+                notification_type=Notification.NotificationType.ORDER_READY
+            )
+            self.old_orders.append(order)
+        Order.objects.filter(pk__in=[o.pk for o in self.old_orders]).update(
+            created_at=old, updated_at=old
+        )
+
+        # Recent and still-open orders stay in the hot table
+        self.recent = Order.objects.create(
+            customer=self.customer, total_price=4, status=Order.OrderStatus.COMPLETED
+        )
+        self.open = Order.objects.create(customer=self.customer, total_price=4)
+        Order.objects.filter(pk=self.open.pk).update(created_at=old, updated_at=old)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_archives_in_batches(self):
+        """Only old finished orders move, with their items and notifications"""
+        self.assertEqual(archive_orders(older_than_days=7, batch_size=2), 3)
+
+        self.assertEqual(
+            set(Order.objects.values_list('pk', flat=True)), {self.recent.pk, self.open.pk}
+        )
+        archived = ArchivedOrder.objects.get(pk=self.old_orders[0].pk)
+        self.assertEqual(archived.items.count(), 1)
+        self.assertEqual(archived.notifications.count(), 1)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_history_reads_both_tables(self):
+        """History and detail are the same before and after archiving"""
+        archive_orders(older_than_days=7)
+
+        seen = []
+        response = self.client.get('/api/orders/history/', {'page_size': 2})
+        while True:
+            seen += [order['id'] for order in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(seen[0], self.recent.pk)
+
+        response = self.client.get(f'/api/orders/{self.old_orders[0].pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['items']), 1)
+        self.assertFalse(response.data['can_modify'])
+
+    def test_order_list_includes_archived_orders(self):
+        """Archiving doesn't change what a customer's order list returns"""
+        before = self.client.get('/api/orders/', {'include_count': 'true'}).data
+        archive_orders(older_than_days=7)
+
+        seen = []
+        response = self.client.get('/api/orders/', {'page_size': 2, 'include_count': 'true'})
+        self.assertEqual(response.data['count'], 5)
+        while True:
+            seen += response.data['results']
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(seen, before['results'])
+        self.assertEqual(seen[-1]['items_count'], 1)
+
+        response = self.client.get('/api/orders/', {'status': 'COMPLETED'})
+        self.assertEqual(len(response.data['results']), 4)
+
+    def test_malformed_history_cursor(self):
+        """Garbage or out-of-range history cursors are a 400, not a 500"""
+        for cursor in ['abc', '99999999999999999999-1', '-1-1']:
+            response = self.client.get('/api/orders/history/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+
+
+class NotificationOutboxTests(TestCase):
+    """Status changes queue notifications; the dispatcher delivers them"""
+
+    def setUp(self):
+        self.barista = User.objects.create_user(
+            username='barista', password='barista123', role=User.UserRole.BARISTA
+        )
+        self.customer = User.objects.create_user(username='regular', password='regular123')
+        self.order = Order.objects.create(customer=self.customer, total_price=4)
+        self.client = APIClient()
+        self.client.force_authenticate(self.barista)
+
+    def test_update_status_queues_notification(self):
+        """update_status writes an outbox row, not a notification"""
+        response = self.client.post(
+            f'/api/orders/{self.order.id}/update_status/', {'status': 'PREPARING'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(OutboxMessage.objects.get().order_id, self.order.id)
+
+        self.assertEqual(dispatch_outbox(), (1, 0))
+        notification = Notification.objects.get()
+        self.assertEqual(notification.user, self.customer)
+        self.assertEqual(notification.notification_type, Notification.NotificationType.ORDER_PREPARING)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_cancel_queues_notification(self):
+        """A customer cancelling gets the CANCELLED notification through the outbox"""
+        self.client.force_authenticate(self.customer)
+        response = self.client.delete(f'/api/orders/{self.order.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            OutboxMessage.objects.get().notification_type, Notification.NotificationType.ORDER_CANCELLED
+        )
+
+    def test_failed_messages_are_retried_later(self):
+        """A bad message is rescheduled with backoff without blocking the rest"""
+        self.client.post(f'/api/orders/{self.order.id}/update_status/', {'status': 'PREPARING'})
+        bad = OutboxMessage.objects.create(
+            user=self.customer, notification_type='PROMOTION', title='Bad', message='Broken'
+        )
+
+        to_notification = OutboxMessage.to_notification
+
+        def fail_bad_message(message):
+            if message.title == 'Bad':
+                raise ValueError('cannot deliver')
+            return to_notification(message)
+
+        with mock.patch.object(OutboxMessage, 'to_notification', fail_bad_message), \
+                self.assertLogs('api.outbox', level='ERROR'):
+            self.assertEqual(dispatch_outbox(), (1, 1))
+
+        self.assertEqual(Notification.objects.count(), 1)
+        bad.refresh_from_db()
+        self.assertEqual(bad.attempts, 1)
+        self.assertEqual(bad.last_error, 'cannot deliver')
+        self.assertGreater(bad.next_attempt_at, timezone.now())
+
+
+class PushDeliveryTests(TestCase):
+    """Push worker respects preferences and handles provider errors"""
+
+    def setUp(self):
+        self.users = {
+            name: User.objects.create_user(username=name, password='secret123', push_token=token)
+            for name, token in [('ok', 'tok-ok'), ('dead', 'tok-dead'), ('flaky', 'tok-flaky')]
+        }
+        self.users['muted'] = User.objects.create_user(
+            username='muted', password='secret123', push_token='tok-muted', notification_enabled=False
+        )
+        for user in self.users.values():
+            Notification.objects.create(
+                user=user, title='Ready', message='Come get it',
+                notification_type=Notification.NotificationType.ORDER_READY
+            )
+        self.provider = StubPushProvider(dead_tokens=['tok-dead'], flaky_tokens=['tok-flaky'])
+
+    def state(self, name):
+        """Notification of one of the test users"""
+        return Notification.objects.get(user=self.users[name])
+
+    def test_delivery_outcomes(self):
+        """Sent, skipped, dead and flaky tokens in one round"""
+        counts = deliver_pushes(self.provider)
+
+        self.assertEqual(counts, {'sent': 1, 'skipped': 1, 'retried': 1, 'failed': 1})
+        self.assertEqual([message.token for message in self.provider.sent], ['tok-ok'])
+        self.assertEqual(self.state('ok').push_state, Notification.PushState.SENT)
+        self.assertEqual(self.state('muted').push_state, Notification.PushState.SKIPPED)
+
+        # Dead token is cleared from the user
+        self.assertEqual(self.state('dead').push_state, Notification.PushState.FAILED)
+        self.users['dead'].refresh_from_db()
+        self.assertIsNone(self.users['dead'].push_token)
+
+        # Flaky token backs off and is not retried straight away
+        flaky = self.state('flaky')
+        self.assertEqual(flaky.push_state, Notification.PushState.PENDING)
+        self.assertEqual(flaky.push_attempts, 1)
+        self.assertGreater(flaky.push_next_attempt_at, timezone.now())
+        self.assertEqual(sum(deliver_pushes(self.provider).values()), 0)
+
+    def test_unknown_results_are_ignored(self):
+        """Results for notifications this worker didn't claim are logged and skipped"""
+        stray = Notification.objects.create(
+            user=self.users['ok'], title='Later', message='Not claimed',
+            notification_type=Notification.NotificationType.ORDER_READY,
+            push_next_attempt_at=timezone.now() + timedelta(hours=1)
+        )
+        send_batch = self.provider.send_batch
+        self.provider.send_batch = lambda messages: send_batch(messages) + [PushResult(stray.pk, ok=True)]
+
+        with self.assertLogs('api.push', level='WARNING'):
+            counts = deliver_pushes(self.provider)
+
+        self.assertEqual(counts['sent'], 1)
+        stray.refresh_from_db()
+        self.assertEqual(stray.push_state, Notification.PushState.PENDING)
+
+
+class UnreadCountTests(TestCase):
+    """Unread badge is served from the user's counter"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='regular', password='regular123')
+        self.order = Order.objects.create(customer=self.customer, total_price=4)
+        self.client = APIClient()
+
+    def unread_count(self):
+        """GET the badge as the customer (fresh user row, like token auth)"""
+        self.client.force_authenticate(User.objects.get(pk=self.customer.pk))
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/notifications/unread_count/')
+        return response.data['unread_count']
+
+    def test_counter_follows_notifications(self):
+        """Created, read and read-all notifications keep the counter exact"""
+        barista = User.objects.create_user(
+            username='barista', password='barista123', role=User.UserRole.BARISTA
+        )
+        self.client.force_authenticate(barista)
+        self.client.post(f'/api/orders/{self.order.id}/update_status/', {'status': 'PREPARING'})
+        self.client.post(f'/api/orders/{self.order.id}/update_status/', {'status': 'READY'})
+        dispatch_outbox()
+        self.assertEqual(self.unread_count(), 2)
+
+        first = Notification.objects.first()
+        self.client.post(f'/api/notifications/{first.id}/mark_read/')
+        self.client.post(f'/api/notifications/{first.id}/mark_read/')
+        self.assertEqual(self.unread_count(), 1)
+
+        self.client.post('/api/notifications/mark_all_read/')
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_reconcile_fixes_drift(self):
+        """Rows changed behind the counter's back are picked up by reconcile"""
+        Notification.objects.create(
+            user=self.customer, title='Hi', message='Hello',
+            notification_type=Notification.NotificationType.PROMOTION
+        )
+        User.objects.filter(pk=self.customer.pk).update(unread_notification_count=7)
+
+        self.assertEqual(reconcile_unread_counts(), 1)
+        self.assertEqual(self.unread_count(), 1)
+
+    def test_admin_edits_and_deletes(self):
+        """Toggling is_read or deleting in the admin moves the counter too"""
+        notification, promotion = [
+            Notification.objects.create(
+                user=self.customer, title='Hi', message='Hello', order=order,
+                notification_type=Notification.NotificationType.PROMOTION
+            )
+            for order in (self.order, None)
+        ]
+        model_admin = admin.site._registry[Notification]
+        form = mock.Mock(changed_data=['is_read'])
+
+        notification.is_read = True
+        model_admin.save_model(None, notification, form, change=True)
+        self.assertEqual(self.unread_count(), 1)
+
+        notification.is_read = False
+        model_admin.save_model(None, notification, form, change=True)
+        self.assertEqual(self.unread_count(), 2)
+
+        # Deleting the order cascades to its notification
+        admin.site._registry[Order].delete_model(None, self.order)
+        self.assertEqual(self.unread_count(), 1)
+
+        model_admin.delete_model(None, promotion)
+        self.assertEqual(self.unread_count(), 0)
+
+
+class NotificationRetentionTests(TestCase):
+    """Notifications are pruned per type in resumable chunks"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='regular', password='regular123')
+        now = timezone.now()
+        for age, notification_type in [
+            (120, 'ORDER_READY'), (60, 'PROMOTION'), (45, 'PROMOTION'),
+            (60, 'ORDER_READY'), (5, 'PROMOTION'),
+        ]:
+            notification = Notification.objects.create(
+                user=self.customer, notification_type=notification_type,
+                title='Hi', message='Hello'
+            )
+            Notification.objects.filter(pk=notification.pk).update(
+                sent_at=now - timedelta(days=age)
+            )
+
+    def test_per_type_ttls_with_summaries(self):
+        """PROMOTION keeps 30 days, order events 90 days"""
+        deleted = prune_notifications(chunk_size=2, summarize=True)
+
+        self.assertEqual(deleted['PROMOTION'], 2)
+        self.assertEqual(deleted['ORDER_READY'], 1)
+        self.assertEqual(Notification.objects.count(), 2)
+
+        summaries = NotificationSummary.objects.filter(user=self.customer)
+        self.assertEqual(
+            {(summary.notification_type, summary.count) for summary in summaries},
+            {('PROMOTION', 2), ('ORDER_READY', 1)}
+        )
+
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.unread_notification_count, 2)
+
+    def test_resumes_from_checkpoint(self):
+        """A second run starts at the first row that was kept"""
+        prune_notifications(chunk_size=2)
+        kept = Notification.objects.filter(notification_type='PROMOTION').get()
+
+        checkpoint = JobCheckpoint.objects.get(name='notification_retention:PROMOTION')
+        self.assertEqual(checkpoint.position, kept.pk)
+        self.assertEqual(sum(prune_notifications(chunk_size=2).values()), 0)
+
+
+class PromotionBroadcastTests(TestCase):
+    """Broadcasts insert notifications in fixed-size batches"""
+
+    def setUp(self):
+        User.objects.bulk_create([
+            User(username=f'customer{index}', notification_enabled=index % 2 == 0)
+            for index in range(5)
+        ])
+        User.objects.create_user(username='barista', password='barista123', role=User.UserRole.BARISTA)
+
+    def test_broadcast_to_customers(self):
+        """Only customers are targeted; counters and pushes follow"""
+        batches = []
+        result = broadcast_promotion(
+            broadcast_audience(), 'Happy hour', '2-for-1 lattes',
+            batch_size=2, progress=lambda sent, elapsed: batches.append(sent)
+        )
+
+        self.assertEqual(result['sent'], 5)
+        self.assertEqual(batches, [2, 4, 5])
+        self.assertEqual(
+            Notification.objects.filter(
+                notification_type='PROMOTION', push_state=Notification.PushState.PENDING
+            ).count(),
+            5
+        )
+        self.assertEqual(
+            set(User.objects.filter(role=User.UserRole.CUSTOMER).values_list(
+                'unread_notification_count', flat=True
+            )),
+            {1}
+        )
+
+    def test_filters(self):
+        """only_enabled narrows the audience"""
+        result = broadcast_promotion(broadcast_audience(only_enabled=True), 'Hi', 'Hello')
+        self.assertEqual(result['sent'], 3)
+
+
+class LoyaltyLedgerTests(TestCase):
+    """Points changes go through the ledger with atomic balance updates"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='regular', password='regular123')
+        self.menu_item = MenuItem.objects.create(
+            title='Latte', item_type=MenuItem.ItemType.COFFEE, price=4, preparation_time=3
+        )
+        self.offer = LoyaltyOffer.objects.create(
+            title='Free cookie', description='One cookie', points_required=10,
+            valid_from=timezone.now() - timedelta(days=1)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def balance(self):
+        """Cached balance from the database"""
+        self.customer.refresh_from_db()
+        return self.customer.loyalty_points
+
+    def test_earn_and_redeem(self):
+        """Orders earn points, redemptions spend them, both are in the ledger"""
+        response = self.client.post('/api/orders/', {
+            'order_items': [{'menu_item': self.menu_item.id, 'quantity': 3}]
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.balance(), 12)
+
+        response = self.client.post(f'/api/loyalty-offers/{self.offer.id}/redeem/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['remaining_points'], 2)
+
+        self.assertEqual(
+            list(LoyaltyLedger.objects.order_by('id').values_list('kind', 'points')),
+            [('EARN', 12), ('REDEEM', -10)]
+        )
+
+    def test_spend_fails_cleanly(self):
+        """A conditional decrement never goes negative"""
+        with self.assertRaises(InsufficientPoints):
+            spend(self.customer.pk, 10)
+        self.assertEqual(self.balance(), 0)
+        self.assertFalse(LoyaltyLedger.objects.exists())
+
+    def test_reconcile_from_ledger(self):
+        """Drifted balances are recomputed from the ledger"""
+        LoyaltyLedger.objects.create(user=self.customer, kind='ADJUST', points=5)
+        self.assertEqual(reconcile_balances(), {self.customer.pk: (0, 5)})
+        self.assertEqual(self.balance(), 5)
+
+    def test_profile_edit_keeps_concurrent_points(self):
+        """Saving a stale user instance doesn't write its old balance back"""
+        earn(self.customer.pk, 12)
+
+        response = self.client.patch('/api/profile/', {'phone': '555-0100'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.customer.save()
+
+        self.assertEqual(self.balance(), 12)
+        self.assertEqual(self.customer.phone, '555-0100')
+
+
+class RedemptionCodeTests(TestCase):
+    """Redemption codes come from a keyed permutation, not random retries"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='regular', password='regular123')
+        self.offer = LoyaltyOffer.objects.create(
+            title='Free cookie', description='One cookie', points_required=10,
+            valid_from=timezone.now()
+        )
+
+    def redeem(self):
+        """Create a redemption, letting the model allocate its code"""
+        return LoyaltyRedemption.objects.create(
+            customer=self.customer, loyalty_offer=self.offer, points_spent=10
+        )
+
+    def test_permutation_is_unique_and_keeps_format(self):
+        """Distinct sequence numbers give distinct 8-character codes"""
+        allocator = CodeAllocator('test', key=b'secret')
+        codes = {allocator.encode(allocator.permute(number)) for number in range(20000)}
+
+        self.assertEqual(len(codes), 20000)
+        for code in codes:
+            self.assertRegex(code, r'^[A-Z0-9]{8}$')
+
+    def test_no_lookup_per_code(self):
+        """Within a reserved block a redemption costs its INSERT (in a savepoint), no lookups"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.redeem()
+        with self.assertNumQueries(3):
+            self.redeem()
+
+    def test_rolled_back_block_is_not_reused(self):
+        """A reservation undone with the caller's transaction is never handed out"""
+        redemption_codes.discard_block()
+        with self.assertRaises(InsufficientPoints), transaction.atomic():
+            self.redeem()
+            raise InsufficientPoints()
+
+        # Another process reserves from the (rolled back) sequence meanwhile
+        other_process = CodeAllocator('redemption_code')
+        codes = [allocator.allocate() for allocator in [redemption_codes, other_process] * 2]
+        self.assertEqual(len(set(codes)), 4)
+
+    def test_clash_with_existing_code_is_skipped(self):
+        """The unique index is a safety net for codes issued before the allocator"""
+        taken = redemption_codes.encode(redemption_codes.permute(redemption_codes._next))
+        LoyaltyRedemption.objects.create(
+            customer=self.customer, loyalty_offer=self.offer, points_spent=10, redemption_code=taken
+        )
+
+        redemption = self.redeem()
+        self.assertNotEqual(redemption.redemption_code, taken)
+
+
+class RedemptionCodeCounterTests(TestCase):
+    """Baristas look codes up and apply them exactly once"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='regular', password='regular123')
+        self.barista = User.objects.create_user(
+            username='barista', password='barista123', role=User.UserRole.BARISTA
+        )
+        offer = LoyaltyOffer.objects.create(
+            title='Free cookie', description='One cookie', points_required=10,
+            valid_from=timezone.now()
+        )
+        self.redemption = LoyaltyRedemption.objects.create(
+            customer=self.customer, loyalty_offer=offer, points_spent=10
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.barista)
+
+    def test_lookup_by_code(self):
+        """Codes are matched case-insensitively; unknown codes are 404"""
+        response = self.client.get(
+            '/api/loyalty-redemptions/lookup/', {'code': self.redemption.redemption_code.lower()}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.redemption.id)
+
+        response = self.client.get('/api/loyalty-redemptions/lookup/', {'code': 'NOSUCH00'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_customers_cannot_use_staff_endpoints(self):
+        """Only baristas and admins can look up or apply someone's code"""
+        self.client.force_authenticate(self.customer)
+        response = self.client.get(
+            '/api/loyalty-redemptions/lookup/', {'code': self.redemption.redemption_code}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_double_tap_is_rejected(self):
+        """The second redeem of the same code gets 409 and changes nothing"""
+        url = '/api/loyalty-redemptions/redeem_code/'
+        first = self.client.post(url, {'code': self.redemption.redemption_code})
+        second = self.client.post(url, {'code': self.redemption.redemption_code})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.data['redemption']['is_used'])
+        self.assertEqual(second.status_code, 409)
+
+    def test_attaches_order_of_same_customer(self):
+        """The code is linked to the order only if both belong to the same customer"""
+        other = User.objects.create_user(username='other', password='other123')
+        foreign_order = Order.objects.create(customer=other, total_price=3)
+        url = '/api/loyalty-redemptions/redeem_code/'
+
+        response = self.client.post(url, {'code': self.redemption.redemption_code, 'order_id': foreign_order.id})
+        self.assertEqual(response.status_code, 400)
+
+        order = Order.objects.create(customer=self.customer, total_price=3)
+        response = self.client.post(url, {'code': self.redemption.redemption_code, 'order_id': order.id})
+        self.assertEqual(response.status_code, 200)
+
+        self.redemption.refresh_from_db()
+        self.assertTrue(self.redemption.is_used)
+        self.assertEqual(self.redemption.order_id, order.id)
+
+    def test_invalid_order_id(self):
+        """A non-numeric order_id is a 400, not a server error"""
+        url = '/api/loyalty-redemptions/redeem_code/'
+        response = self.client.post(url, {'code': self.redemption.redemption_code, 'order_id': 'abc'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('order_id', response.data)
+        self.redemption.refresh_from_db()
+        self.assertFalse(self.redemption.is_used)
+
+
+class OfferCacheTests(TestCase):
+    """The offer list is served from memory until the next validity boundary"""
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.customer = User.objects.create_user(
+            username='regular', password='regular123', loyalty_points=60
+        )
+        self.cookie = LoyaltyOffer.objects.create(
+            title='Free cookie', description='One cookie', points_required=50,
+            valid_from=self.now - timedelta(days=1), valid_until=self.now + timedelta(hours=1)
+        )
+        self.latte = LoyaltyOffer.objects.create(
+            title='Free latte', description='Any size', points_required=100,
+            valid_from=self.now - timedelta(days=1)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        offer_cache.invalidate()
+
+    def test_list_without_queries(self):
+        """After the first load the list costs no queries and flags what the user can afford"""
+        self.client.get('/api/loyalty-offers/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/loyalty-offers/')
+
+        self.assertEqual(
+            [(offer['id'], offer['affordable']) for offer in response.data['results']],
+            [(self.cookie.id, True), (self.latte.id, False)]
+        )
+
+    def test_expires_at_validity_boundaries(self):
+        """Offers drop out at valid_until and appear at valid_from without a save"""
+        muffin = LoyaltyOffer.objects.create(
+            title='Free muffin', description='Any muffin', points_required=70,
+            valid_from=self.now + timedelta(minutes=30)
+        )
+        offer_cache.invalidate()
+
+        def titles(now):
+            return [offer['title'] for offer in offer_cache.offers(now=now)]
+
+        self.assertEqual(titles(self.now), ['Free cookie', 'Free latte'])
+        self.assertEqual(titles(muffin.valid_from), ['Free cookie', 'Free muffin', 'Free latte'])
+        self.assertEqual(
+            titles(self.cookie.valid_until + timedelta(seconds=1)), ['Free muffin', 'Free latte']
+        )
+
+    def test_save_invalidates(self):
+        """Editing an offer is visible on the next request"""
+        self.client.get('/api/loyalty-offers/')
+        self.latte.points_required = 60
+        self.latte.save()
+
+        response = self.client.get('/api/loyalty-offers/')
+        self.assertTrue(all(offer['affordable'] for offer in response.data['results']))
+
+
+class MenuSnapshotTests(TestCase):
+    """The menu list is served from pre-rendered bytes with an ETag"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='regular', password='regular123')
+        self.latte = MenuItem.objects.create(
+            title='Latte', description='Milky', item_type='COFFEE', price=3, preparation_time=4
+        )
+        MenuItem.objects.create(
+            title='Brownie', description='Chocolate', item_type='DESSERT', price=2, preparation_time=1
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        menu_cache.bump()
+
+    def test_cached_list_without_queries(self):
+        """Repeat requests do no database work and return the same body"""
+        first = self.client.get('/api/menu-items/', {'item_type': 'COFFEE'})
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/menu-items/', {'item_type': 'COFFEE'})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(
+            [item['title'] for item in second.json()['results']], ['Latte']
+        )
+
+    def test_not_modified(self):
+        """A matching If-None-Match gets an empty 304"""
+        etag = self.client.get('/api/menu-items/')['ETag']
+        response = self.client.get('/api/menu-items/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_save_bumps_version(self):
+        """Editing an item changes the ETag and the served data"""
+        etag = self.client.get('/api/menu-items/')['ETag']
+        self.latte.is_available = False
+        self.latte.save()
+
+        response = self.client.get('/api/menu-items/', {'is_available': 'true'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['title'] for item in response.json()['results']], ['Brownie'])
+
+    def test_page_is_normalised(self):
+        """Equivalent page numbers share one snapshot"""
+        self.client.get('/api/menu-items/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/menu-items/', {'page': '001'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('must-revalidate', response['Cache-Control'])
+
+    @override_settings(MENU_BASE_URL='http://api.example.com')
+    def test_only_configured_host_is_cached(self):
+        """Requests for other hosts are rendered, not stored"""
+        self.client.get('/api/menu-items/', HTTP_HOST='api.example.com')
+        with self.assertNumQueries(0):
+            self.client.get('/api/menu-items/', HTTP_HOST='api.example.com')
+
+        for host in ('evil.example.com', 'other.example.com'):
+            self.assertEqual(self.client.get('/api/menu-items/', HTTP_HOST=host).status_code, 200)
+        self.assertEqual(len(menu_cache._snapshots), 1)
+
+    def test_least_recently_used_is_evicted(self):
+        """The cache keeps at most max_entries snapshots"""
+        cache = MenuCache(max_entries=2)
+        for key in ('a', 'b', 'a', 'c'):
+            cache.get(key, lambda: key.encode())
+
+        self.assertEqual(list(cache._snapshots), ['a', 'c'])
+
+
+class MenuImageVariantTests(TestCase):
+    """Menu photos get resized, WebP and content-hashed copies off the request path"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.item = MenuItem.objects.create(
+            title='Latte', description='Milky', item_type='COFFEE', price=3,
+            preparation_time=4, image=self.photo(800, 600)
+        )
+        self.customer = User.objects.create_user(username='regular', password='regular123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        menu_cache.bump()
+
+    @staticmethod
+    def photo(width, height):
+        """Uploaded JPEG of the given size"""
+        buffer = io.BytesIO()
+        Image.new('RGB', (width, height), 'brown').save(buffer, 'JPEG')
+        return SimpleUploadedFile('latte.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_generates_srcset(self):
+        """Variants are listed per format, smallest first and never upscaled"""
+        item = self.client.get(f'/api/menu-items/{self.item.id}/').json()
+        self.assertIsNone(item['image_srcset'])
+
+        self.assertEqual(generate_menu_images(), (1, 0))
+        self.assertFalse(pending_items().exists())
+
+        item = self.client.get(f'/api/menu-items/{self.item.id}/').json()
+        webp = item['image_srcset']['webp'].split(', ')
+        self.assertEqual([entry.split(' ')[1] for entry in webp], ['160w', '480w', '800w'])
+        self.assertRegex(webp[0], r'^http://testserver/media/menu_items/variants/latte.*-thumb\.[0-9a-f]{16}\.webp ')
+        self.assertIn('.jpg 160w', item['image_srcset']['jpeg'])
+
+        self.item.refresh_from_db()
+        with Image.open(f"{self.media_root}/{self.item.image_variants['thumb']['webp']}") as thumb:
+            self.assertEqual(thumb.size, (160, 120))
+
+    def test_new_upload_is_pending_again(self):
+        """Replacing the photo queues it and changes the variant names"""
+        generate_menu_images()
+        self.item.refresh_from_db()
+        old = self.item.image_variants['card']['jpeg']
+
+        self.item.image = self.photo(1000, 500)
+        self.item.save()
+        self.assertTrue(pending_items().exists())
+
+        generate_menu_images()
+        self.item.refresh_from_db()
+        self.assertNotEqual(self.item.image_variants['card']['jpeg'], old)
+
+    @override_settings(MENU_IMAGE_MAX_ATTEMPTS=2)
+    def test_storage_errors_are_retried(self):
+        """Temporary I/O errors back off and retry; the item is given up on after the last attempt"""
+        now = timezone.now()
+        with mock.patch('api.images.build_variants', side_effect=PermissionError('storage offline')), \
+                self.assertLogs('api.images', level='WARNING'):
+            self.assertEqual(generate_menu_images(now=now), (0, 1))
+            self.item.refresh_from_db()
+            self.assertEqual(self.item.image_variants_attempts, 1)
+            self.assertFalse(pending_items(now).exists())
+
+            later = now + timedelta(minutes=2)
+            self.assertTrue(pending_items(later).exists())
+            self.assertEqual(generate_menu_images(now=later), (0, 1))
+
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.image_variants, {})
+        self.assertEqual(self.item.image_variants_source, self.item.image.name)
+        self.assertEqual(self.item.image_variants_attempts, 0)
+
+    def test_missing_file_is_not_retried(self):
+        """A photo that is gone is recorded as done without variants straight away"""
+        os.remove(self.item.image.path)
+
+        with self.assertLogs('api.images', level='WARNING'):
+            self.assertEqual(generate_menu_images(), (0, 1))
+        self.assertFalse(pending_items(timezone.now() + timedelta(days=1)).exists())
@@ -0,0 +1,122 @@
+"""
+Unread notification counters.
+User.unread_notification_count is kept in step with the Notification
+table so the unread badge (GET /api/notifications/unread_count/) is read
+straight from the already-loaded user row - no list, no COUNT.
+
+Counters change with F() expressions in the same transaction as the
+notification change, so concurrent requests can't lose updates.
+reconcile_unread_counts() repairs any drift (e.g. rows deleted in bulk).
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Notification, User
+
+
+def _apply(deltas):
+    """
+    Add per-user deltas ({user_id: delta}) to the counters.
+    Users sharing the same delta are updated in one statement,
+    so a broadcast to thousands of users is a single UPDATE.
+    """
+    by_delta = {}
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(user_id)
+
+    for delta, user_ids in by_delta.items():
+        User.objects.filter(pk__in=user_ids).update(
+            unread_notification_count=Greatest(F('unread_notification_count') + delta, 0)
+        )
+
+
+def notifications_created(notifications):
+    """Count newly created notifications (call after bulk_create)"""
+    _apply(Counter(
+        notification.user_id
+        for notification in notifications
+        if not notification.is_read
+    ))
+
+
+def notifications_removed(queryset):
+    """Uncount the unread notifications in queryset (call before deleting them)"""
+    rows = queryset.filter(is_read=False).values('user').annotate(unread=Count('id'))
+    _apply({row['user']: -row['unread'] for row in rows})
+
+
+def mark_read(notification):
+    """
+    Mark one notification as read.
+    Conditional UPDATE, so marking twice only decrements once.
+    Returns whether it was unread.
+    """
+    with transaction.atomic():
+        updated = Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True)
+        if updated:
+            _apply({notification.user_id: -1})
+    notification.is_read = True
+    return bool(updated)
+
+
+def mark_unread(notification):
+    """
+    Mark one notification as unread again (e.g. from the admin).
+    Conditional UPDATE, so it only increments once. Returns whether it was read.
+    """
+    with transaction.atomic():
+        updated = Notification.objects.filter(pk=notification.pk, is_read=True).update(is_read=False)
+        if updated:
+            _apply({notification.user_id: 1})
+    notification.is_read = False
+    return bool(updated)
+
+
+def mark_all_read(user):
+    """Mark all of a user's notifications as read. Returns how many changed."""
+    with transaction.atomic():
+        updated = Notification.objects.filter(user=user, is_read=False).update(is_read=True)
+        _apply({user.pk: -updated})
+    return updated
+
+
+def reconcile_unread_counts(batch_size=1000):
+    """
+    Recompute counters from the (user, is_read) index and fix any that drifted.
+    Returns the number of users corrected.
+    """
+    corrected = 0
+    last_id = 0
+    while True:
+        users = list(
+            User.objects.filter(pk__gt=last_id).order_by('pk').values_list(
+                'pk', 'unread_notification_count'
+            )[:batch_size]
+        )
+        if not users:
+            break
+
+        # Count right after reading the batch to keep the race window small
+        actual = dict(
+            Notification.objects.filter(
+                user_id__in=[user_id for user_id, _ in users],
+                is_read=False
+            ).values_list('user').annotate(unread=Count('id')).order_by()
+        )
+
+        for user_id, stored in users:
+            expected = actual.get(user_id, 0)
+            if stored != expected:
+                # Only fix rows nobody changed since we read them
+                corrected += User.objects.filter(
+                    pk=user_id, unread_notification_count=stored
+                ).update(unread_notification_count=expected)
+
+        last_id = users[-1][0]
+
+    return corrected
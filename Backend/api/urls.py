@@ -26,7 +26,8 @@ router = DefaultRouter()
 router.register(r'menu-items', views.MenuItemViewSet, basename='menuitem')
 
 # Orders CRUD: /api/orders/
-# Also includes custom actions: /api/orders/queue/, /api/orders/{id}/update_status/
+# Also includes custom actions: /api/orders/queue/, /api/orders/{id}/update_status/,
+# /api/orders/bulk_update_status/
 router.register(r'orders', views.OrderViewSet, basename='order')
 
 # Favourite orders CRUD: /api/favourites/
@@ -77,14 +78,19 @@ MENU ITEMS:
 - DELETE /api/menu-items/{id}/    - Delete item (admin)
 
 ORDERS:
-- GET    /api/orders/             - List my orders (customer) or all orders (barista)
-- POST   /api/orders/             - Create new order
+- GET    /api/orders/             - List my orders incl. archived (customer) or all orders (barista)
+- GET    /api/orders/history/     - My order history with items, newest first (cursor paginated)
+- POST   /api/orders/             - Create new order (supports Idempotency-Key header)
 - GET    /api/orders/{id}/        - Get order details
 - PUT    /api/orders/{id}/        - Update order (if status=RECEIVED)
 - PATCH  /api/orders/{id}/        - Partial update order
 - DELETE /api/orders/{id}/        - Cancel order (if status=RECEIVED)
+- POST   /api/orders/eta_quote/   - Predict ready time for a basket before checkout
 - GET    /api/orders/queue/       - Get orders to prepare (barista)
+- GET    /api/orders/queue/?since=<cursor> - Only queue changes after cursor (barista)
+- GET    /api/orders/queue/?compact=true - De-duplicated queue format (barista)
 - POST   /api/orders/{id}/update_status/ - Change status (barista)
+- POST   /api/orders/bulk_update_status/ - Change status of many orders at once (barista)
 - POST   /api/orders/{id}/mark_favourite/ - Mark as favourite template
 
 FAVOURITES:
@@ -94,16 +100,32 @@ FAVOURITES:
 - PUT    /api/favourites/{id}/    - Update template
 - PATCH  /api/favourites/{id}/    - Partial update
 - DELETE /api/favourites/{id}/    - Delete template
-- POST   /api/favourites/{id}/reorder/ - Create order from template
+- POST   /api/favourites/{id}/reorder/ - Create order from template (supports Idempotency-Key header)
 
 LOYALTY:
 - GET    /api/loyalty-points/     - Get my points balance
 - GET    /api/loyalty-offers/     - List available offers
 - GET    /api/loyalty-offers/{id}/ - Get offer details
+- POST   /api/loyalty-offers/{id}/redeem/ - Redeem offer with points
+- GET    /api/loyalty-redemptions/ - List my redemptions
+- GET    /api/loyalty-redemptions/{id}/ - Get redemption details
+- POST   /api/loyalty-redemptions/{id}/mark_used/ - Mark redemption as used
+- GET    /api/loyalty-redemptions/lookup/?code=<code> - Check a customer's code (barista)
+- POST   /api/loyalty-redemptions/redeem_code/ - Apply a code, optionally to an order (barista)
 
 NOTIFICATIONS:
 - GET    /api/notifications/      - List my notifications
 - GET    /api/notifications/{id}/ - Get notification details
+- GET    /api/notifications/unread_count/ - Unread badge count
 - POST   /api/notifications/{id}/mark_read/ - Mark as read
 - POST   /api/notifications/mark_all_read/ - Mark all as read
+
+IDEMPOTENCY-KEY (order create, reorder):
+- Retry with the same key and body: the original response is replayed
+  (header Idempotent-Replayed: true), no second order is placed
+- Same key with a different body: 422
+- Same key while the first request is still running: waits up to
+  IDEMPOTENCY_WAIT_SECONDS for its response, then 409 - retry later
+  with the same key (a request that died frees the key after
+  IDEMPOTENCY_LEASE_SECONDS)
 """
\ No newline at end of file
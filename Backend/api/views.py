@@ -5,15 +5,38 @@ Uses ViewSets for CRUD operations with minimal code.
 
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
 from rest_framework.authtoken.models import Token
+from rest_framework.utils.urls import replace_query_param
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
 from django.utils import timezone
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 from django.shortcuts import get_object_or_404
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import *
 from .serializers import *
+from .eta import eta_engine
+from .idempotency import idempotent
+from .pagination import (
+    NotificationCursorPagination, OrderCursorPagination, RedemptionCursorPagination,
+)
+from .archive import order_history, order_history_count
+from .outbox import enqueue_notification, enqueue_status_notifications
+from .menu import menu_cache
+from .offers import offer_cache
+from . import loyalty, unread
+from .services import place_order
+from .events import (
+    in_queue, publish_order_status, publish_queue_event, publish_queue_events, queue_orders,
+)
 
 # ============================================================================
 # CUSTOM PERMISSION CLASSES
@@ -157,6 +180,9 @@ class MenuItemViewSet(viewsets.ModelViewSet):
     - item_type: Filter by COFFEE or DESSERT
     - is_available: Filter by availability (true/false)
     - search: Search in title and description
+    
+    JSON lists are served from the menu snapshot cache (api.menu) with an
+    ETag; send it back in If-None-Match to get a 304.
     """
     
     queryset = MenuItem.objects.all()
@@ -183,22 +209,125 @@ class MenuItemViewSet(viewsets.ModelViewSet):
             permission_classes = [permissions.IsAdminUser]
         
         return [permission() for permission in permission_classes]
+    
+    def list(self, request, *args, **kwargs):
+        """
+        List menu items from a pre-rendered snapshot.
+        Only the first request per filter combination touches the database
+        and serializer; later ones copy bytes (or answer 304).
+        """
+        key = self._snapshot_key(request)
+        if key is None:
+            # Other formats or unexpected params - render normally
+            return super().list(request, *args, **kwargs)
+        
+        body, etag = menu_cache.get(key, lambda: self._render_list(request, *args, **kwargs))
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        # Same for every user: any cache may keep it but must revalidate
+        patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+        return response
+    
+    def _snapshot_key(self, request):
+        """
+        Cache key for a JSON list request, or None if it can't be cached.
+        Absolute image and page URLs depend on the host, so it is part of the
+        key; with MENU_BASE_URL set, other hosts are not cached at all.
+        """
+        if request.accepted_renderer.format != 'json':
+            return None
+        params = request.query_params
+        if set(params) - {'item_type', 'is_available', 'page'}:
+            return None
+        
+        item_type = params.get('item_type', '')
+        is_available = params.get('is_available', '')
+        page = params.get('page', '')
+        if item_type and item_type not in MenuItem.ItemType.values:
+            return None
+        if is_available not in ('', 'true', 'false'):
+            return None
+        if page and not page.isdigit():
+            return None
+        
+        base_url = request.build_absolute_uri('/')
+        configured = getattr(settings, 'MENU_BASE_URL', None)
+        if configured and base_url.rstrip('/') != configured.rstrip('/'):
+            return None
+        
+        # ?page=01 and ?page=1 (or no page) render the same list
+        return (base_url, item_type, is_available, int(page or 1))
+    
+    def _render_list(self, request, *args, **kwargs):
+        """Render the list response to JSON bytes"""
+        response = super().list(request, *args, **kwargs)
+        return JSONRenderer().render(response.data)
 
 
 # ============================================================================
 # ORDER VIEWSET
 # ============================================================================
 
+# Maximum number of changed orders returned by one ?since= queue refresh
+QUEUE_CHANGES_LIMIT = 500
+
+# Reference point for queue cursors
+_CURSOR_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _encode_queue_cursor(order):
+    """
+    Build a queue cursor from an order's (updated_at, id).
+    Format: "<microseconds since epoch>-<order id>" (URL safe).
+    """
+    micros = (order.updated_at - _CURSOR_EPOCH) // timedelta(microseconds=1)
+    return f'{micros}-{order.id}'
+
+
+# Largest timestamp a cursor may carry (datetime.max, in cursor microseconds)
+_CURSOR_MAX_MICROS = (datetime.max.replace(tzinfo=dt_timezone.utc) - _CURSOR_EPOCH) // timedelta(microseconds=1)
+
+
+def _decode_queue_cursor(cursor):
+    """Parse a queue cursor into (updated_at, id). Raises ValueError if malformed."""
+    micros, order_id = cursor.split('-')
+    micros, order_id = int(micros), int(order_id)
+    # Out-of-range values would overflow datetime (or never match anything)
+    if not 0 <= micros <= _CURSOR_MAX_MICROS or order_id < 0:
+        raise ValueError(f'Cursor out of range: {cursor}')
+    return _CURSOR_EPOCH + timedelta(microseconds=micros), order_id
+
+
+def _latest_queue_cursor():
+    """Cursor pointing at the most recently updated order (served by the updated_at index)"""
+    latest = Order.objects.only('id', 'updated_at').order_by('-updated_at', '-id').first()
+    return _encode_queue_cursor(latest) if latest else '0-0'
+
+
+def _encode_history_cursor(order):
+    """History cursor from an order's (created_at, id) - same format as queue cursors"""
+    micros = (order.created_at - _CURSOR_EPOCH) // timedelta(microseconds=1)
+    return f'{micros}-{order.id}'
+
+
+# Same "<micros>-<id>" format, read as (created_at, id)
+_decode_history_cursor = _decode_queue_cursor
+
+
 class OrderViewSet(viewsets.ModelViewSet):
     """
     CRUD operations for orders.
     
     Customer endpoints:
-    - GET /api/orders/ - List my orders
+    - GET /api/orders/ - List my orders (including archived ones)
     - GET /api/orders/{id}/ - Get order details
     - POST /api/orders/ - Create new order
     - PUT/PATCH /api/orders/{id}/ - Update order (if status=RECEIVED)
     - DELETE /api/orders/{id}/ - Cancel order (if status=RECEIVED)
+    - GET /api/orders/history/ - My orders including archived ones
     
     Barista endpoints:
     - GET /api/orders/queue/ - Get orders to prepare
@@ -207,9 +336,11 @@ class OrderViewSet(viewsets.ModelViewSet):
     Query params:
     - status: Filter by order status
     - scheduled_for: Filter scheduled orders
+    - cursor / page_size / include_count: cursor pagination (newest first)
     """
     
     serializer_class = OrderSerializer
+    pagination_class = OrderCursorPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['status']
     
@@ -223,10 +354,24 @@ class OrderViewSet(viewsets.ModelViewSet):
         
         if user.role == User.UserRole.CUSTOMER:
             # Customers see only their orders
-            return Order.objects.filter(customer=user)
+            queryset = Order.objects.filter(customer=user)
         else:
             # Baristas and admin see all orders
-            return Order.objects.all()
+            queryset = Order.objects.all()
+        
+        if self.action == 'list':
+            # Item counts computed in the same query (no per-row COUNT).
+            # Ordering comes from OrderCursorPagination.
+            return queryset.select_related('customer').annotate(
+                items_count=models.Count('items'),
+                total_quantity=Coalesce(models.Sum('items__quantity'), 0)
+            )
+        
+        if self.action in ['retrieve', 'update', 'partial_update']:
+            # Full order detail: load items and their menu items up front
+            return queryset.select_related('customer').prefetch_related('items__menu_item')
+        
+        return queryset
     
     def get_serializer_class(self):
         """
@@ -237,12 +382,30 @@ class OrderViewSet(viewsets.ModelViewSet):
             return OrderListSerializer
         return OrderSerializer
     
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        """
+        Create order.
+        Send an Idempotency-Key header to make retries safe: a retry with
+        the same key returns the original response instead of a new order
+        (a duplicate sent while the first is running waits briefly, then 409).
+        """
+        return super().create(request, *args, **kwargs)
+    
     def perform_create(self, serializer):
         """
         Create order and set customer to current user.
         Automatically set status to RECEIVED.
         """
-        serializer.save(customer=self.request.user)
+        order = serializer.save(customer=self.request.user)
+        
+        # Push the new order to barista queue screens
+        publish_queue_event(order, created=True)
+    
+    def perform_update(self, serializer):
+        """Save order changes and push them to barista queue screens"""
+        order = serializer.save()
+        publish_queue_event(order)
     
     def update(self, request, *args, **kwargs):
         """
@@ -266,6 +429,90 @@ class OrderViewSet(viewsets.ModelViewSet):
         
         return super().update(request, *args, **kwargs)
     
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Get order details.
+        Falls back to the archive for old finished orders (see api.archive).
+        """
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            archived = ArchivedOrder.objects.select_related(
+                'customer'
+            ).prefetch_related('items__menu_item')
+            if request.user.role == User.UserRole.CUSTOMER:
+                archived = archived.filter(customer=request.user)
+            
+            order = get_object_or_404(archived, pk=kwargs['pk'])
+            return Response(OrderSerializer(order, context={'request': request}).data)
+    
+    def list(self, request, *args, **kwargs):
+        """
+        List orders, newest first.
+        A customer's list also reads the archive (see api.archive), so
+        archived orders stay in it; staff lists only cover the hot table.
+        """
+        if request.user.role != User.UserRole.CUSTOMER:
+            return super().list(request, *args, **kwargs)
+        
+        order_status = request.query_params.get('status', '')
+        if order_status and order_status not in Order.OrderStatus.values:
+            return Response(
+                {'status': [f'Select a valid choice. {order_status} is not one of the available choices.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return self._history_page(request, OrderListSerializer, order_status=order_status, summary=True)
+    
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        """
+        Order history across the hot and archive tables, newest first.
+        GET /api/orders/history/?cursor=<cursor>&page_size=20
+        Returns: {next, results: [orders with items]}
+        """
+        return self._history_page(request, OrderSerializer)
+    
+    def _history_page(self, request, serializer_class, order_status=None, summary=False):
+        """
+        One keyset page of the customer's orders from both tables.
+        Same response shape as OrderCursorPagination: {count?, next, previous, results}.
+        """
+        before = None
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                before = _decode_history_cursor(cursor)
+            except ValueError:
+                return Response(
+                    {'error': 'Invalid cursor'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        try:
+            page_size = int(request.query_params.get('page_size', OrderCursorPagination.page_size))
+        except ValueError:
+            page_size = OrderCursorPagination.page_size
+        page_size = max(1, min(page_size, OrderCursorPagination.max_page_size))
+        
+        orders, has_more = order_history(
+            request.user, before=before, limit=page_size, status=order_status, summary=summary
+        )
+        
+        next_link = None
+        if has_more:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), 'cursor', _encode_history_cursor(orders[-1])
+            )
+        
+        payload = {
+            'next': next_link,
+            'previous': None,
+            'results': serializer_class(orders, many=True, context={'request': request}).data
+        }
+        if request.query_params.get(OrderCursorPagination.count_query_param, '').lower() == 'true':
+            payload = {'count': order_history_count(request.user, status=order_status), **payload}
+        return Response(payload)
+    
     def destroy(self, request, *args, **kwargs):
         """
         Cancel order - only allowed if status is RECEIVED.
@@ -286,10 +533,21 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Set status to cancelled instead of deleting
-        # order.status = Order.OrderStatus.CANCELLED
-        # order.save()
-        order.delete()
+        with transaction.atomic():
+            # Set status to cancelled instead of deleting
+            # Keeps the row so queue clients polling with ?since= see it leave
+            apply_status_transition(
+                order,
+                Order.OrderStatus.CANCELLED,
+                expected_status=Order.OrderStatus.RECEIVED
+            )
+            
+            # Customer notification, committed together with the status change
+            enqueue_status_notifications([order])
+            
+            # Push the cancellation to barista screens and the customer
+            publish_queue_event(order)
+            publish_order_status(order)
 
         return Response({
             'message': 'Order cancelled successfully'
@@ -300,55 +558,228 @@ class OrderViewSet(viewsets.ModelViewSet):
         """
         Get orders queue for baristas.
         GET /api/orders/queue/
-        Returns orders with status RECEIVED or PREPARING, ordered by creation time.
+        Returns orders with status RECEIVED or PREPARING, ordered by when they are due.
+        Scheduled orders stay hidden until released (scheduled time minus preparation time).
+        The response header X-Queue-Cursor holds a cursor for incremental refreshes.
+        
+        GET /api/orders/queue/?compact=true
+        De-duplicated format: {orders, customers: {id: ...}, menu_items: {id: ...}}
+        Orders refer to customers and menu items by id. Also applies to ?since=.
+        
+        GET /api/orders/queue/?since=<cursor>
+        Returns only what changed after the cursor:
+        {cursor, has_more, orders: [changed queue orders], removed: [ids that left the queue]}
         """
-        orders = Order.objects.prefetch_related(
+        since = request.query_params.get('since')
+        if since:
+            return self._queue_changes(request, since)
+        
+        # Read the cursor before the queue so no change falls between the two
+        cursor = _latest_queue_cursor()
+        
+        orders = queue_orders().select_related(
+            'customer'
+        ).prefetch_related(
             'items__menu_item'  # Load order items and their menu items efficiently
-        ).filter(
-            status__in=[Order.OrderStatus.RECEIVED, Order.OrderStatus.PREPARING]
-        ).order_by('created_at')
+        )
+    
+        return Response(
+            self._serialize_queue(request, orders),
+            headers={'X-Queue-Cursor': cursor}
+        )
     
+    def _serialize_queue(self, request, orders):
+        """Serialize queue orders in the full or compact (?compact=true) format"""
+        if request.query_params.get('compact') in ['true', '1']:
+            return CompactQueueSerializer(orders).data
+        
         # Use full OrderSerializer instead of OrderListSerializer to include items
-        serializer = OrderSerializer(orders, many=True, context={'request': request})
-        return Response(serializer.data)
+        return OrderSerializer(orders, many=True, context={'request': request}).data
+    
+    def _queue_changes(self, request, since):
+        """
+        Return orders that entered, changed within, or left the queue after a cursor.
+        
+        updated_at is stamped when the row is saved, not when the transaction
+        commits. On a database with concurrent writers (e.g. PostgreSQL) a
+        slow transaction can commit after a later-stamped one has already
+        been read, and its order is then behind the client's cursor. Clients
+        should reload the full queue (no ?since=) now and then, e.g. when the
+        screen is reopened; SQLite serializes writers, so it can't happen there.
+        """
+        try:
+            updated_at, order_id = _decode_queue_cursor(since)
+        except ValueError:
+            return Response(
+                {'error': 'Invalid cursor'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # orders = Order.objects.filter(
-        #     status__in=[Order.OrderStatus.RECEIVED, Order.OrderStatus.PREPARING]
-        # ).order_by('created_at')
+        # Keyset scan on the (updated_at, id) index
+        changed = list(
+            Order.objects.filter(
+                models.Q(updated_at__gt=updated_at) |
+                models.Q(updated_at=updated_at, id__gt=order_id)
+            ).order_by('updated_at', 'id')[:QUEUE_CHANGES_LIMIT + 1]
+        )
+        has_more = len(changed) > QUEUE_CHANGES_LIMIT
+        changed = changed[:QUEUE_CHANGES_LIMIT]
         
-        # serializer = OrderListSerializer(orders, many=True)
-        # return Response(serializer.data)
+        # Orders still in the queue are sent in full, the rest only by id
+        # (held scheduled orders count as not in the queue)
+        in_queue_ids = [order.id for order in changed if in_queue(order)]
+        removed = [order.id for order in changed if not in_queue(order)]
+        
+        orders = queue_orders().select_related(
+            'customer'
+        ).prefetch_related(
+            'items__menu_item'
+        ).filter(id__in=in_queue_ids)
+        
+        data = {
+            'cursor': _encode_queue_cursor(changed[-1]) if changed else since,
+            'has_more': has_more,
+            'removed': removed,
+        }
+        
+        # Compact format adds its customers/menu_items dictionaries next to orders
+        queue = self._serialize_queue(request, orders)
+        if isinstance(queue, dict):
+            data.update(queue)
+        else:
+            data['orders'] = queue
+        
+        return Response(data)
+    
+    @action(detail=False, methods=['post'])
+    def eta_quote(self, request):
+        """
+        Predict when a basket would be ready if ordered now.
+        POST /api/orders/eta_quote/
+        Body: {order_items: [{menu_item: 1, quantity: 2}], scheduled_for: (optional)}
+        Returns: {estimated_ready_at, wait_minutes, orders_ahead, stations}
+        """
+        serializer = EtaQuoteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        minutes = eta_engine.basket_minutes(serializer.validated_data['order_items'])
+        quote = eta_engine.quote(
+            minutes,
+            scheduled_for=serializer.validated_data.get('scheduled_for')
+        )
+        quote['estimated_ready_at'] = serialize_datetime(quote['estimated_ready_at'])
+        return Response(quote)
     
     @action(detail=True, methods=['post'], permission_classes=[IsBaristaOrAdmin])
     def update_status(self, request, pk=None):
         """
         Update order status (barista only).
         POST /api/orders/{id}/update_status/
-        Body: {status: "PREPARING" | "READY" | "COMPLETED"}
+        Body: {status: "PREPARING" | "READY" | "COMPLETED", expected_status: "RECEIVED" (optional)}
+        
+        Only legal transitions are accepted (see Order.TRANSITIONS).
+        expected_status is the status the barista's screen showed; if the order
+        has moved on since (e.g. another barista tapped it), returns 409 Conflict.
         """
         order = self.get_object()
         new_status = request.data.get('status')
+        expected_status = request.data.get('expected_status')
         
-        # Validate status value
-        if new_status not in dict(Order.OrderStatus.choices):
+        # Validate status values
+        valid_statuses = dict(Order.OrderStatus.choices)
+        if new_status not in valid_statuses or (
+            expected_status and expected_status not in valid_statuses
+        ):
             return Response(
                 {'error': 'Invalid status value'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update status
-        order.status = new_status
-        
-        # Set completed timestamp if order is completed
-        if new_status == Order.OrderStatus.COMPLETED:
-            order.completed_at = timezone.now()
-        
-        order.save()
+        with transaction.atomic():
+            # Conditional UPDATE - raises 400 for illegal moves, 409 on conflict
+            apply_status_transition(order, new_status, expected_status=expected_status)
+            
+            # Customer notification, committed together with the status change
+            enqueue_status_notifications([order])
+            
+            # Push the change (or removal from the queue) to barista screens
+            publish_queue_event(order)
+            
+            # Push the new status to the customer following this order
+            publish_order_status(order)
         
-        # Serializer will automatically send notification
         serializer = OrderSerializer(order, context={'request': request})
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'], permission_classes=[IsBaristaOrAdmin])
+    def bulk_update_status(self, request):
+        """
+        Update the status of several orders at once (barista only).
+        POST /api/orders/bulk_update_status/
+        Body: {updates: [{order_id: 1, status: "READY"}, ...]}
+        Returns: {results: [{order_id, status, updated} or {order_id, error}]}
+        
+        Each order goes through the transition table. Changes are written in
+        one transaction with one conditional UPDATE per order and one outbox
+        INSERT for their notifications. Orders that changed
+        underneath the caller are reported as conflicts.
+        """
+        serializer = BulkStatusUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        updates = serializer.validated_data['updates']
+        errors = {}
+        transitions = []
+        
+        with transaction.atomic():
+            orders = Order.objects.in_bulk(
+                [update['order_id'] for update in updates]
+            )
+            
+            # Check each requested move against the transition table
+            for update in updates:
+                order = orders.get(update['order_id'])
+                if order is None:
+                    errors[update['order_id']] = 'Order not found'
+                elif order.status == update['status']:
+                    continue
+                elif not Order.can_transition(order.status, update['status']):
+                    errors[order.id] = f'Cannot change order from {order.status} to {update["status"]}'
+                else:
+                    transitions.append((order, update['status']))
+            
+            changed = Order.transition_many(transitions)
+            changed_ids = {order.id for order in changed}
+            for order, new_status in transitions:
+                if order.id not in changed_ids:
+                    errors[order.id] = 'Order status was changed by someone else'
+            
+            if changed:
+                # Notifications go through the outbox (one INSERT for the batch)
+                enqueue_status_notifications(changed)
+                
+                # Push the changes once the transaction commits (queue
+                # deltas are serialized together, after the commit)
+                publish_queue_events(changed)
+                for order in changed:
+                    publish_order_status(order)
+        
+        results = []
+        for update in updates:
+            order_id = update['order_id']
+            if order_id in errors:
+                results.append({'order_id': order_id, 'error': errors[order_id]})
+            else:
+                results.append({
+                    'order_id': order_id,
+                    'status': orders[order_id].status,
+                    'updated': order_id in changed_ids,
+                })
+        
+        return Response({'results': results})
+    
     @action(detail=True, methods=['post'])
     def mark_favourite(self, request, pk=None):
         """
@@ -365,10 +796,11 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Toggle favourite status
+        # Toggle favourite status - single-column UPDATE so a status
+        # transition committed meanwhile isn't overwritten
         is_favourite = request.data.get('is_favourite', True)
+        Order.objects.filter(pk=order.pk).update(is_favourite=is_favourite)
         order.is_favourite = is_favourite
-        order.save()
         
         return Response({
             'message': 'Order favourite status updated',
@@ -400,36 +832,50 @@ class FavouriteOrderViewSet(viewsets.ModelViewSet):
         return FavouriteOrder.objects.filter(customer=self.request.user)
     
     @action(detail=True, methods=['post'])
+    @idempotent
     def reorder(self, request, pk=None):
         """
         Create new order from favourite template.
         POST /api/favourites/{id}/reorder/
         Body: {scheduled_for: "2024-01-01T12:00:00Z"} (optional)
+        Supports the Idempotency-Key header for safe retries.
         """
         favourite = self.get_object()
         template = favourite.template_order
         
-        # Create new order with same items as template
-        new_order = Order.objects.create(
-            customer=request.user,
-            total_price=template.total_price,
-            notes=template.notes,
-            scheduled_for=request.data.get('scheduled_for', None)
-        )
+        # Validate optional pickup time
+        serializer = ReorderSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        scheduled_for = serializer.validated_data.get('scheduled_for')
         
-        # Copy all order items from template
-        for item in template.items.all():
-            OrderItem.objects.create(
-                order=new_order,
-                menu_item=item.menu_item,
-                quantity=item.quantity,
-                price=item.price,
-                customizations=item.customizations
+        # Same items as template, at today's menu prices
+        # (rejects items that are no longer available)
+        try:
+            items = resolve_order_lines([
+                {
+                    'menu_item_id': item.menu_item_id,
+                    'quantity': item.quantity,
+                    'customizations': item.customizations,
+                }
+                for item in template.items.all()
+            ])
+        except ValidationError as error:
+            return Response(
+                {'error': 'Some items in this favourite cannot be ordered', 'items': error.detail},
+                status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Award loyalty points
-        new_order.customer.loyalty_points += new_order.calculate_points()
-        new_order.customer.save()
+        # Create new order (order, items and loyalty points in one transaction)
+        new_order = place_order(
+            request.user,
+            items,
+            notes=template.notes,
+            scheduled_for=scheduled_for
+        )
+        
+        # Push the new order to barista queue screens
+        publish_queue_event(new_order, created=True)
         
         # Return new order data
         serializer = OrderSerializer(new_order, context={'request': request})
@@ -448,11 +894,25 @@ class LoyaltyOfferViewSet(viewsets.ReadOnlyModelViewSet):
     - GET /api/loyalty-offers/ - List all active offers
     - GET /api/loyalty-offers/{id}/ - Get offer details
     - POST /api/loyalty-offers/{id}/redeem/ - Redeem an offer
+    
+    The list is served from the in-process offer cache (api.offers) and
+    flags each offer as "affordable" with the user's current points.
     """
     
     queryset = LoyaltyOffer.objects.filter(is_active=True)
     serializer_class = LoyaltyOfferSerializer
     
+    def list(self, request, *args, **kwargs):
+        """
+        List currently valid offers - no database query on the common path.
+        The balance comes from the already-authenticated user row.
+        """
+        offers = offer_cache.offers(points=request.user.loyalty_points)
+        page = self.paginate_queryset(offers)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(offers)
+    
     def get_queryset(self):
         """Return only currently valid offers"""
         now = timezone.now()
@@ -512,26 +972,38 @@ class LoyaltyOfferViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Create redemption record
-        redemption = LoyaltyRedemption.objects.create(
-            customer=user,
-            loyalty_offer=offer,
-            points_spent=offer.points_required
-        )
-        
-        # Deduct points from user
-        user.loyalty_points -= offer.points_required
-        user.save()
-        
-        # Create notification for successful redemption
-        Notification.objects.create(
-            user=user,
-            notification_type=Notification.NotificationType.PROMOTION,
-            title=f'🎉 {offer.title} Redeemed!',
-            message=f'You have successfully redeemed "{offer.title}". '
-                   f'Use code {redemption.redemption_code} at checkout. '
-                   f'Remaining points: {user.loyalty_points}'
-        )
+        try:
+            with transaction.atomic():
+                # Create redemption record
+                redemption = LoyaltyRedemption.objects.create(
+                    customer=user,
+                    loyalty_offer=offer,
+                    points_spent=offer.points_required
+                )
+                
+                # Conditional decrement + ledger entry - fails if a concurrent
+                # request spent the points first (rolls back the redemption)
+                loyalty.spend(user.pk, offer.points_required, redemption=redemption)
+                user.loyalty_points = loyalty.balance(user.pk)
+                
+                # Queue notification for successful redemption
+                enqueue_notification(
+                    user,
+                    Notification.NotificationType.PROMOTION,
+                    title=f'🎉 {offer.title} Redeemed!',
+                    message=f'You have successfully redeemed "{offer.title}". '
+                           f'Use code {redemption.redemption_code} at checkout. '
+                           f'Remaining points: {user.loyalty_points}'
+                )
+        except loyalty.InsufficientPoints:
+            return Response(
+                {
+                    'error': 'Insufficient loyalty points',
+                    'required': offer.points_required,
+                    'available': loyalty.balance(user.pk)
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         # Return redemption details
         return Response({
@@ -555,9 +1027,18 @@ class LoyaltyRedemptionViewSet(viewsets.ReadOnlyModelViewSet):
     Endpoints:
     - GET /api/loyalty-redemptions/ - List my redemptions
     - GET /api/loyalty-redemptions/{id}/ - Get redemption details
+    
+    Staff endpoints:
+    - GET /api/loyalty-redemptions/lookup/?code= - Check a customer's code
+    - POST /api/loyalty-redemptions/redeem_code/ - Apply a code (optionally to an order)
+    
+    Lists use cursor pagination (cursor / page_size / include_count).
     """
     
     serializer_class = LoyaltyRedemptionSerializer
+    pagination_class = RedemptionCursorPagination
+    # Ordering is fixed by the cursor (no ?ordering=)
+    filter_backends = [DjangoFilterBackend]
     
     def get_queryset(self):
         """Return only current user's redemptions"""
@@ -572,31 +1053,96 @@ class LoyaltyRedemptionViewSet(viewsets.ReadOnlyModelViewSet):
         """
         redemption = self.get_object()
         
-        if redemption.is_used:
+        serializer = UseRedemptionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Link to order if provided
+        order_id = serializer.validated_data.get('order_id')
+        if order_id and not Order.objects.filter(id=order_id, customer=request.user).exists():
+            order_id = None
+        
+        # Conditional UPDATE - a double-tap can't apply the redemption twice
+        if not loyalty.use_redemption(LoyaltyRedemption.objects.filter(pk=redemption.pk), order_id):
             return Response(
                 {'error': 'This redemption has already been used'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Mark as used
-        redemption.is_used = True
+        redemption.refresh_from_db()
+        return Response({
+            'message': 'Redemption marked as used',
+            'redemption': LoyaltyRedemptionSerializer(redemption).data
+        })
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsBaristaOrAdmin])
+    def lookup(self, request):
+        """
+        Check a code a customer shows at the counter (staff only).
+        GET /api/loyalty-redemptions/lookup/?code=AB12CD34
+        Served by the unique redemption_code index.
+        """
+        redemption = loyalty.find_redemption(request.query_params.get('code'))
+        if redemption is None:
+            return Response(
+                {'error': 'Redemption code not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response(LoyaltyRedemptionSerializer(redemption).data)
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsBaristaOrAdmin])
+    def redeem_code(self, request):
+        """
+        Apply a customer's redemption code (staff only).
+        POST /api/loyalty-redemptions/redeem_code/
+        Body: {code: "AB12CD34", order_id: 123 (optional)}
         
-        # Link to order if provided
-        order_id = request.data.get('order_id')
+        One conditional UPDATE marks the code used and attaches the order,
+        so a double-tap can't apply it twice. Returns 409 if already used.
+        """
+        serializer = RedeemCodeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        code = serializer.validated_data['code']
+        order_id = serializer.validated_data.get('order_id')
+        
+        redemptions = LoyaltyRedemption.objects.filter(redemption_code=code)
         if order_id:
-            try:
-                order = Order.objects.get(id=order_id, customer=request.user)
-                redemption.order = order
-            except Order.DoesNotExist:
-                pass
+            # The order must belong to the customer who owns the code
+            customer_id = Order.objects.filter(pk=order_id).values_list('customer_id', flat=True).first()
+            if customer_id is None:
+                return Response(
+                    {'error': 'Order not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            redemptions = redemptions.filter(customer_id=customer_id)
         
-        redemption.save()
+        if not loyalty.use_redemption(redemptions, order_id):
+            # Nothing updated - find out why
+            redemption = loyalty.find_redemption(code)
+            if redemption is None:
+                return Response(
+                    {'error': 'Redemption code not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            if redemption.is_used:
+                return Response(
+                    {'error': 'This redemption has already been used'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            return Response(
+                {'error': 'This code belongs to a different customer than the order'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         return Response({
-            'message': 'Redemption marked as used',
-            'redemption': LoyaltyRedemptionSerializer(redemption).data
+            'message': 'Redemption applied',
+            'redemption': LoyaltyRedemptionSerializer(loyalty.find_redemption(code)).data
         })
 
+
 # ============================================================================
 # NOTIFICATION VIEWSET
 # ============================================================================
@@ -610,9 +1156,15 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     - GET /api/notifications/{id}/ - Get notification details
     - POST /api/notifications/{id}/mark_read/ - Mark as read
     - POST /api/notifications/mark_all_read/ - Mark all as read
+    - GET /api/notifications/unread_count/ - Unread badge count
+    
+    Lists use cursor pagination (cursor / page_size / include_count).
     """
     
     serializer_class = NotificationSerializer
+    pagination_class = NotificationCursorPagination
+    # Ordering is fixed by the cursor (no ?ordering=)
+    filter_backends = [DjangoFilterBackend]
     
     def get_queryset(self):
         """Return only current user's notifications"""
@@ -625,8 +1177,7 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         POST /api/notifications/{id}/mark_read/
         """
         notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        unread.mark_read(notification)
         
         return Response({'message': 'Notification marked as read'})
     
@@ -636,14 +1187,21 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         Mark all user's notifications as read.
         POST /api/notifications/mark_all_read/
         """
-        count = Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        ).update(is_read=True)
+        count = unread.mark_all_read(request.user)
         
         return Response({
             'message': f'{count} notifications marked as read'
         })
+    
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """
+        Unread notification badge.
+        GET /api/notifications/unread_count/
+        Returns: {unread_count: 3}
+        Read from the user's counter (no query beyond authentication).
+        """
+        return Response({'unread_count': request.user.unread_notification_count})
 
 
 # ============================================================================